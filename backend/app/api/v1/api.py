@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 from app.api.v1.endpoints import customers
 from app.api.v1.endpoints import profile
+from app.api.v1.endpoints import analytics
+from app.api.v1.endpoints import model
 
 
 api_router = APIRouter()
@@ -8,4 +10,8 @@ api_router = APIRouter()
 # Daftarkan router customers
 api_router.include_router(customers.router, prefix="/customers", tags=["customers"])
 # Daftarkan router profile
-api_router.include_router(profile.router, prefix="/profile", tags=["profile"])
\ No newline at end of file
+api_router.include_router(profile.router, prefix="/profile", tags=["profile"])
+# Daftarkan router analytics
+api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+# Daftarkan router model (status & cache ML)
+api_router.include_router(model.router, prefix="/model", tags=["model"])
\ No newline at end of file
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends
+from sqlmodel import Session
+from app.db.session import get_session
+from app.services.analytics_service import analytics_service
+from app.services.feature_importance_service import feature_importance_service
+from app.models.feature_importance import FeatureImportanceRead, LABEL_ALL
+
+router = APIRouter()
+
+# =====================================================
+# GET /summary → Ringkasan Analytics (agregat SQL, cached)
+# =====================================================
+@router.get("/summary", response_model=dict)
+def read_analytics_summary(
+    session: Session = Depends(get_session)
+):
+    """
+    Ringkasan seluruh lead:
+    - jumlah per lead_status & prediction_label, tier skor
+    - histogram skor & kelompok umur
+    - funnel (total → contacted → interested → closed)
+    - breakdown per job / month / contact
+    """
+    return analytics_service.get_summary(session)
+
+
+
+# =====================================================
+# GET /feature-importance → Top Drivers (SHAP global)
+# =====================================================
+@router.get("/feature-importance", response_model=list[FeatureImportanceRead])
+def read_feature_importance(
+    prediction_label: str = LABEL_ALL,
+    limit: int = 10,
+    session: Session = Depends(get_session)
+):
+    """
+    Fitur paling berpengaruh di seluruh portfolio (rata-rata |SHAP|),
+    dari tabel agregat — tidak membaca shap_values_json per lead.
+    prediction_label: ALL / Potential / Non-Potential
+    """
+    return feature_importance_service.top_features(session, prediction_label, limit)
@@ -1,18 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+import os
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response, Query
+from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
-from app.db.session import get_session
+from app.core.config import settings
+from app.db.session import get_session, write_with_retry, is_lock_error
 from app.models.customer import (
     Customer,
     CustomerCreate,
     CustomerRead,
+    CustomerListItem,
+    CustomerFilter,
     CustomerUpdateStatus
 )
 from app.services.ml_service import ml_service
-import pandas as pd
-import io
+from app.services.upload_service import ingest_csv
+from app.services.job_service import job_service
+from app.services.explain_service import is_lazy, ensure_explanation, apply_shap
+from app.services.shap_storage import shap_storage
+from app.services.analytics_service import analytics_service
+from app.services.feature_importance_service import feature_importance_service
+from app.services.shadow_service import shadow_service
+from app.services.scoring_executor import scoring_executor, ScoringBusyError
+from app.services.prediction_batcher import prediction_batcher
+from app.services.export_service import export_service, EXPORT_FORMATS
+from app.services.upload_validation import MissingColumnsError, report_path
+from app.services.rescore_service import rescore_service
+from app.services.customer_query import (
+    apply_filters,
+    apply_sort,
+    encode_cursor,
+    list_columns
+)
+from app.models.job import UploadJob, UploadJobRead
+from app.models.rescore import RescoreJob, RescoreJobRead, RescoreRequest
 
 router = APIRouter()
 
+
+def to_customer_read(customer: Customer) -> CustomerRead:
+    """Customer DB -> CustomerRead (SHAP blob di-decode ke format JSON API)"""
+    return CustomerRead.model_validate(
+        customer, update={"shap_values_json": shap_storage.to_json(customer)}
+    )
+
 # =====================================================
 # POST /predict → Single Prediction + Save DB
 # =====================================================
@@ -23,41 +55,235 @@ def create_customer_prediction(
 ):
     """
     1. Menerima data nasabah
-    2. Melakukan Prediksi (ML)
+    2. Melakukan Prediksi (ML) — micro-batch di executor scoring (429 jika penuh)
     3. Menyimpan data + hasil prediksi ke Database
     """
 
     customer_data = customer_in.dict()
 
-    prediction = ml_service.predict_and_explain(customer_data)
+    # Mode lazy: simpan skor saja, SHAP + script dihitung saat detail dibuka.
+    # Request bersamaan digabung jadi satu batch scoring (prediction_batcher)
+    prediction = prediction_batcher.predict(customer_data, explain=not is_lazy())
 
     customer_db = Customer.from_orm(customer_in)
 
     if prediction:
         customer_db.prediction_score = prediction["score"]
         customer_db.prediction_label = prediction["label"]
-        customer_db.shap_values_json = prediction["shap_json"]
-        customer_db.recommendation_script = prediction["script"]
+        customer_db.model_version = prediction["model_version"]
+        apply_shap(customer_db, prediction)
+        customer_db.recommendation_script = prediction.get("script")
+
+    def save(session: Session):
+        # Lead + agregat SHAP global dalam satu transaksi (upsert tanpa lock)
+        session.add(customer_db)
+        feature_importance_service.apply(session, [prediction])
+
+    try:
+        write_with_retry(session, save, rows=1)
+    except Exception as e:
+        if not is_lock_error(e):
+            raise
+        # DB masih terkunci setelah retry: client diminta mencoba lagi (429)
+        raise ScoringBusyError("Database busy, retry later")
 
-    session.add(customer_db)
-    session.commit()
     session.refresh(customer_db)
+    analytics_service.invalidate()
+    # Shadow mode: model kandidat men-score lead yang sama di background
+    shadow_service.submit([customer_db.id], [customer_data])
 
-    return customer_db
+    return to_customer_read(customer_db)
 
 
 # =====================================================
 # GET / → List Customers (Dashboard)
 # =====================================================
-@router.get("/", response_model=list[CustomerRead])
+@router.get(
+    "/",
+    response_model=list[CustomerListItem],
+    response_model_exclude_unset=True
+)
 def read_customers(
-    offset: int = 0,
-    limit: int = 100,
+    response: Response,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    sort: str = "id_asc",
+    cursor: str | None = None,
+    fields: str | None = None,
+    filters: CustomerFilter = Depends(),
+    session: Session = Depends(get_session)
+):
+    """
+    List nasabah dengan filter (lead_status, prediction_label, rentang skor,
+    rentang created_at) dan sort (id_asc, id_desc, score_desc, score_asc).
+
+    Pagination:
+    - keyset: kirim `cursor` dari header X-Next-Cursor response sebelumnya
+      (biaya halaman dalam sama dengan halaman pertama)
+    - offset/limit lama tetap didukung (dipakai bila cursor kosong)
+
+    Response hanya berisi kolom ringan (tanpa SHAP & script — ambil lewat
+    GET /{customer_id}). `fields=id,job,prediction_score` untuk memilih kolom.
+    """
+    columns = list_columns(fields)
+    names = [column.key for column in columns]
+
+    # id & prediction_score dibutuhkan untuk cursor, walau tidak diminta
+    query_columns = list(columns)
+    for extra in (Customer.id, Customer.prediction_score):
+        if extra.key not in names:
+            query_columns.append(extra)
+
+    statement = apply_filters(select(*query_columns), filters)
+    statement = apply_sort(statement, sort, cursor)
+
+    if not cursor:
+        statement = statement.offset(offset)
+
+    rows = session.exec(statement.limit(limit)).all()
+
+    if rows and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1], sort)
+
+    # Kolom tambahan (untuk cursor) ada di akhir row, terpotong oleh zip
+    return [dict(zip(names, row)) for row in rows]
+
+
+# =====================================================
+# GET /export → Streaming Export CSV / Parquet (dialer, BI)
+# (didaftarkan sebelum /{customer_id} supaya path tidak bentrok)
+# =====================================================
+@router.get("/export")
+def export_customers(
+    format: str = "csv",
+    sort: str = "id_asc",
+    fields: str | None = None,
+    top_k: int = Query(default=settings.EXPORT_TOP_K, ge=0, le=20),
+    limit: int | None = Query(default=None, ge=1),
+    filters: CustomerFilter = Depends()
+):
+    """
+    Export lead ter-filter (filter & sort sama dengan GET /customers) sebagai
+    file CSV atau Parquet, termasuk skor, label, script dan top_k driver SHAP
+    (driver_1, driver_1_shap, ...) per lead.
+
+    Data dibaca dan dikirim per batch (EXPORT_BATCH_SIZE baris), jadi
+    memori API tetap kecil berapapun jumlah lead.
+    """
+    columns = export_service.validate(format, fields, sort)
+    filename = f"leads_{datetime.utcnow():%Y%m%d_%H%M%S}.{format}"
+
+    return StreamingResponse(
+        export_service.stream(format, columns, filters, sort, limit, top_k),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+# =====================================================
+# GET /jobs → Status Background Upload Job
+# (didaftarkan sebelum /{customer_id} supaya path tidak bentrok)
+# =====================================================
+@router.get("/jobs", response_model=list[UploadJobRead])
+def read_upload_jobs(
+    limit: int = 20,
+    session: Session = Depends(get_session)
+):
+    statement = select(UploadJob).order_by(UploadJob.id.desc()).limit(limit)
+    jobs = session.exec(statement).all()
+    return [job_service.to_read(job) for job in jobs]
+
+
+@router.get("/jobs/{job_id}", response_model=UploadJobRead)
+def read_upload_job(
+    job_id: int,
+    session: Session = Depends(get_session)
+):
+    """
+    Progress job upload:
+    - rows_done / rows_failed / potential
+    - throughput (baris per detik)
+    """
+    job = session.get(UploadJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_service.to_read(job)
+
+
+# =====================================================
+# GET /upload-errors/{report_id} → Laporan Baris Gagal Upload (CSV)
+# =====================================================
+@router.get("/upload-errors/{report_id}")
+def download_upload_error_report(report_id: str):
+    """
+    Semua baris yang gagal validasi saat upload (row, field, value, error).
+    report_id: `error_report_id` dari summary upload atau status job.
+    """
+    path = report_path(report_id)
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Error report not found")
+    return FileResponse(path, media_type="text/csv", filename=f"upload_errors_{report_id}.csv")
+
+
+# =====================================================
+# POST /rescore → Rescoring Lead Tersimpan (Makro / Model Berubah)
+# (didaftarkan sebelum /{customer_id} supaya path tidak bentrok)
+# =====================================================
+@router.post("/rescore", response_model=dict)
+def create_rescore_job(
+    request: RescoreRequest,
+    dry_run: bool = False,
+    session: Session = Depends(get_session)
+):
+    """
+    Rescore lead terbuka (lead_statuses, default NEW/CONTACTED) yang terdampak:
+    - nilai makro di body berbeda dengan yang tersimpan, dan/atau
+    - di-score versi model selain versi aktif (include_stale_model),
+      mis. setelah POST /model/versions/{version}/activate
+    Lead lain tidak disentuh. Job berjalan per chunk di background dan
+    dilanjutkan otomatis setelah restart (pantau lewat GET /customers/rescore/{job_id}).
+    dry_run=true: hanya jumlah lead yang akan di-rescore.
+    """
+    if not request.lead_statuses:
+        raise HTTPException(status_code=400, detail="lead_statuses tidak boleh kosong")
+    if not ml_service.ensure_loaded():
+        raise HTTPException(status_code=503, detail=ml_service.load_error)
+
+    if dry_run:
+        return {
+            "affected": rescore_service.count_affected(session, request),
+            "model_version": ml_service.model_version
+        }
+
+    job = rescore_service.create_job(session, request)
+    return {
+        "message": "Rescore job queued",
+        "job_id": job.id,
+        "status": job.status,
+        "affected": job.total_affected
+    }
+
+
+@router.get("/rescore", response_model=list[RescoreJobRead])
+def read_rescore_jobs(
+    limit: int = 20,
+    session: Session = Depends(get_session)
+):
+    statement = select(RescoreJob).order_by(RescoreJob.id.desc()).limit(limit)
+    jobs = session.exec(statement).all()
+    return [rescore_service.to_read(job) for job in jobs]
+
+
+@router.get("/rescore/{job_id}", response_model=RescoreJobRead)
+def read_rescore_job(
+    job_id: int,
     session: Session = Depends(get_session)
 ):
-    statement = select(Customer).offset(offset).limit(limit)
-    customers = session.exec(statement).all()
-    return customers
+    """Progress rescoring: rows_done / total_affected, rows_label_changed, throughput"""
+    job = session.get(RescoreJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Rescore job not found")
+    return rescore_service.to_read(job)
 
 
 # =====================================================
@@ -79,7 +305,10 @@ def read_customer_detail(
     customer = session.get(Customer, customer_id)
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
-    return customer
+
+    # SHAP + script belum ada (ingest mode lazy): hitung sekarang & simpan
+    customer = ensure_explanation(session, customer)
+    return to_customer_read(customer)
 
 
 # =====================================================
@@ -99,16 +328,25 @@ def update_customer_status(
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
 
-    customer.lead_status = status_update.lead_status
+    def save(session: Session):
+        # Diset di dalam write: rollback (retry) mengembalikan atribut customer
+        customer.lead_status = status_update.lead_status
+        if status_update.sales_notes:
+            customer.sales_notes = status_update.sales_notes
+        session.add(customer)
 
-    if status_update.sales_notes:
-        customer.sales_notes = status_update.sales_notes
+    try:
+        write_with_retry(session, save, rows=1)
+    except Exception as e:
+        if not is_lock_error(e):
+            raise
+        # Sama dengan /predict: DB masih terkunci setelah retry -> 429
+        raise ScoringBusyError("Database busy, retry later")
 
-    session.add(customer)
-    session.commit()
     session.refresh(customer)
+    analytics_service.invalidate()
 
-    return customer
+    return to_customer_read(customer)
 
 
 # =====================================================
@@ -117,71 +355,46 @@ def update_customer_status(
 @router.post("/upload", response_model=dict)
 async def upload_customers_csv(
     file: UploadFile = File(...),
+    background: bool = True,
     session: Session = Depends(get_session)
 ):
+    """
+    background=true (default): file diantrekan sebagai job, response langsung
+    berisi job_id (pantau lewat GET /customers/jobs/{job_id}).
+    background=false: diproses langsung di request (response berisi summary).
+
+    Kerja berat tidak dijalankan di event loop: salin file & DB di threadpool,
+    parsing + scoring di executor scoring. Antrean penuh -> 429 + Retry-After.
+    """
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File harus berformat CSV")
     
     try:
-        contents = await file.read()
-        
-        # --- PERBAIKAN 1: Auto-Detect Separator ---
-        # Coba baca 1 baris pertama decode ke string
-        first_line = contents.decode("utf-8").split('\n')[0]
-        separator = ';' if ';' in first_line else ','
-        
-        print(f"🔍 Terdeteksi separator: '{separator}'") # Debugging log
-        
-        df = pd.read_csv(io.BytesIO(contents), sep=separator)
-        
-        # --- PERBAIKAN 2: Normalisasi Nama Kolom ---
-        # Ganti literal '.' jadi '_' (escape dot), lalu lowercase
-        df.columns = df.columns.str.replace(r"\.", "_", regex=True)
-         # Paksa huruf kecil semua (Age -> age)
-        df.columns = df.columns.str.lower()
-        
-        customers_to_add = []
-        errors = [] # Simpan error biar ketahuan
-
-        for index, row in df.iterrows():
-            customer_data = row.to_dict()
-            
-            try:
-                # Lakukan Prediksi
-                prediction = ml_service.predict_and_explain(customer_data)
-                
-                # Buat Object Customer DB
-                # Pydantic akan validasi tipe data disini
-                customer_db = Customer(**customer_data)
-                
-                if prediction:
-                    customer_db.prediction_score = prediction['score']
-                    customer_db.prediction_label = prediction['label']
-                    customer_db.shap_values_json = prediction['shap_json']
-                    customer_db.recommendation_script = prediction['script']
-                    
-                customers_to_add.append(customer_db)
-                
-            except Exception as e:
-                error_msg = f"Row {index} Error: {str(e)}"
-                print(error_msg) # Print ke terminal
-                errors.append(error_msg)
-                continue
-
-        if customers_to_add:
-            session.add_all(customers_to_add)
-            session.commit()
-        
-        # --- PERBAIKAN 3: Response Jujur ---
+        if background:
+            job = await run_in_threadpool(
+                job_service.submit_upload, session, file.filename, file.file
+            )
+            return {
+                "message": "Batch upload queued",
+                "job_id": job.id,
+                "status": job.status
+            }
+
+        # --- Streaming Ingestion ---
+        # File dibaca per chunk dari spooled upload (bukan file.read() sekaligus):
+        # separator dideteksi dari byte awal, tiap chunk di-score + disimpan
+        # sebelum chunk berikutnya dibaca, jadi memori tetap datar.
+        summary = await scoring_executor.run(ingest_csv, session, file.file)
+        job_service.schedule_prewarm()
+
         return {
             "message": "Batch upload processed",
-            "summary": {
-                "total_processed": len(customers_to_add),
-                "total_failed": len(errors),
-                "potential": sum(1 for c in customers_to_add if c.prediction_label == 'Potential'),
-                "sample_error": errors[0] if errors else None # Tampilkan 1 error ke API response
-            }
+            "summary": summary
         }
-        
+
+    except ScoringBusyError:
+        raise
+    except MissingColumnsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Fatal Error: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,167 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlmodel import Session
+from app.db.session import get_session
+from app.services.ml_service import ml_service
+from app.services.shadow_service import shadow_service
+from app.services.scoring_executor import scoring_executor
+from app.services.prediction_batcher import prediction_batcher
+from app.services.job_service import job_service
+
+router = APIRouter()
+
+# =====================================================
+# GET /status → Status Load Artifacts ML
+# =====================================================
+@router.get("/status", response_model=dict)
+def read_model_status():
+    """
+    Status load model: not_loaded / loading / ready / error
+    (+ pesan error, versi model, explainer sudah dibuat atau belum)
+    """
+    return ml_service.state()
+
+
+# =====================================================
+# GET /ready → Readiness Probe (200 siap, 503 belum)
+# =====================================================
+@router.get("/ready", response_model=dict)
+def read_model_ready(response: Response):
+    state = ml_service.state()
+    if not state["ready"]:
+        response.status_code = 503
+    return state
+
+
+# =====================================================
+# GET /cache → Statistik Prediction Cache (LRU)
+# =====================================================
+@router.get("/cache", response_model=dict)
+def read_prediction_cache_stats():
+    """
+    Statistik cache prediksi MLService:
+    - size / max_size
+    - hits, misses, evictions, hit_rate
+    """
+    return {
+        "model_version": ml_service.model_version,
+        **ml_service.cache.stats()
+    }
+
+
+# =====================================================
+# GET /scoring → Kapasitas Executor Scoring & Antrean Upload
+# =====================================================
+@router.get("/scoring", response_model=dict)
+def read_scoring_stats():
+    """in_flight / capacity / rejected (429), job upload yang antre & statistik micro-batch"""
+    return {
+        **scoring_executor.stats(),
+        "pending_jobs": job_service.pending,
+        "max_pending_jobs": job_service.max_pending,
+        "predict_batching": prediction_batcher.stats()
+    }
+
+
+# =====================================================
+# GET /rules → Rule Script Rekomendasi (hasil compile)
+# =====================================================
+@router.get("/rules", response_model=dict)
+def read_recommendation_rules():
+    """Fitur model yang punya rule script + jumlah template"""
+    if not ml_service.ensure_loaded():
+        raise HTTPException(status_code=503, detail=ml_service.load_error)
+    return ml_service.active.rules.summary()
+
+
+# =====================================================
+# POST /rules/reload → Compile Ulang Rule dari Config (Admin)
+# =====================================================
+@router.post("/rules/reload", response_model=dict)
+def reload_recommendation_rules():
+    """Baca ulang RECOMMENDATION_RULES_PATH tanpa restart / reload model"""
+    if not ml_service.ensure_loaded():
+        raise HTTPException(status_code=503, detail=ml_service.load_error)
+    try:
+        return ml_service.reload_rules()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid recommendation rules: {e}")
+
+
+# =====================================================
+# GET /versions → Model Registry (ml_artifacts)
+# =====================================================
+@router.get("/versions", response_model=dict)
+def read_model_versions():
+    """Versi model yang tersedia + versi aktif & shadow"""
+    versions = ml_service.registry.versions()
+    return {
+        "active": ml_service.model_version,
+        "shadow": ml_service.shadow.version if ml_service.shadow else None,
+        "versions": [
+            {"version": version, "model_path": model_path}
+            for version, (model_path, _) in versions.items()
+        ]
+    }
+
+
+# =====================================================
+# POST /versions/{version}/activate → Hot Swap Model Aktif (Admin)
+# =====================================================
+@router.post("/versions/{version}/activate", response_model=dict)
+def activate_model_version(version: str):
+    """
+    Load versi baru lalu swap atomik. Request yang sedang berjalan selesai
+    dengan model lama; request berikutnya memakai versi baru.
+    """
+    try:
+        ml_service.activate(version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model load failed: {e}")
+    return ml_service.state()
+
+
+# =====================================================
+# POST /versions/{version}/shadow → Aktifkan Shadow Scoring (Admin)
+# =====================================================
+@router.post("/versions/{version}/shadow", response_model=dict)
+def enable_shadow_model(version: str):
+    """Model kandidat ikut men-score setiap batch di background (skor disimpan terpisah)"""
+    if version == ml_service.model_version:
+        raise HTTPException(status_code=400, detail="Shadow version must differ from the active model")
+    try:
+        ml_service.set_shadow(version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model load failed: {e}")
+    return shadow_service.stats()
+
+
+# =====================================================
+# DELETE /shadow → Matikan Shadow Scoring (Admin)
+# =====================================================
+@router.delete("/shadow", response_model=dict)
+def disable_shadow_model():
+    ml_service.set_shadow(None)
+    return shadow_service.stats()
+
+
+# =====================================================
+# GET /shadow → Statistik & Perbandingan Shadow
+# =====================================================
+@router.get("/shadow", response_model=dict)
+def read_shadow_stats(
+    version: str | None = None,
+    session: Session = Depends(get_session)
+):
+    """
+    Statistik antrean shadow + perbandingan skor aktif vs shadow
+    (default: versi shadow saat ini)
+    """
+    stats = shadow_service.stats()
+    version = version or stats["shadow_model_version"]
+    if version:
+        stats["comparison"] = shadow_service.compare(session, version)
+    return stats
@@ -0,0 +1,107 @@
+"""
+CLI operasional (tanpa menjalankan server API).
+
+Rescoring lead tersimpan setelah indikator makro / model aktif berubah,
+dijalankan di proses ini per chunk dengan checkpoint yang sama seperti
+POST /customers/rescore (bisa dihentikan lalu dilanjutkan dengan --resume).
+Model yang dipakai: MODEL_VERSION, samakan dengan versi aktif server.
+
+    cd backend
+    python -m app.cli rescore --euribor3m 3.2 --nr-employed 5100 --dry-run
+    python -m app.cli rescore --euribor3m 3.2 --nr-employed 5100
+    MODEL_VERSION=xgboost_v3 python -m app.cli rescore           # model baru saja
+    python -m app.cli rescore --resume 7
+"""
+import argparse
+import sys
+import time
+
+from sqlmodel import Session
+
+from app.db.session import create_db_and_tables, engine
+from app.models.job import JOB_COMPLETED
+from app.models.rescore import MACRO_FIELDS, DEFAULT_RESCORE_STATUSES, RescoreJob, RescoreRequest
+from app.services.ml_service import ml_service
+from app.services.rescore_service import rescore_service
+
+
+def _print_progress(started: float):
+    def progress(job: RescoreJob):
+        elapsed = time.perf_counter() - started
+        rate = job.rows_done / elapsed if elapsed > 0 else 0
+        print(
+            f"   {job.rows_done}/{job.total_affected} leads "
+            f"({job.rows_label_changed} label changed, {rate:.0f} leads/s)",
+            flush=True
+        )
+    return progress
+
+
+def rescore(args) -> int:
+    create_db_and_tables()
+
+    if not ml_service.ensure_loaded():
+        print(f"❌ ML artifacts not loaded: {ml_service.load_error}")
+        return 1
+
+    with Session(engine) as session:
+        if args.resume:
+            job = session.get(RescoreJob, args.resume)
+            if not job:
+                print(f"❌ Rescore job {args.resume} not found")
+                return 1
+        else:
+            request = RescoreRequest(
+                **{name: getattr(args, name) for name in MACRO_FIELDS},
+                lead_statuses=args.statuses.split(","),
+                include_stale_model=not args.no_stale_model
+            )
+            if args.dry_run:
+                affected = rescore_service.count_affected(session, request)
+                print(f"🔎 {affected} leads would be rescored (model {ml_service.model_version})")
+                return 0
+            job = rescore_service.create_job(session, request, enqueue=False)
+        job_id = job.id
+
+    print(f"🚀 Rescore job {job_id} started (model {ml_service.model_version})")
+    status = rescore_service.run_with_retry(job_id, progress=_print_progress(time.perf_counter()))
+    if status is None:
+        print(f"❌ Rescore job {job_id} is finished or running in another process")
+        return 1
+
+    with Session(engine) as session:
+        job = session.get(RescoreJob, job_id)
+    if status != JOB_COMPLETED:
+        print(f"❌ Rescore job {job_id} {status}: {job.error}")
+        return 1
+
+    print(f"✅ Rescore job {job_id} completed: {job.rows_done} leads, {job.rows_label_changed} label changed")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_rescore = commands.add_parser("rescore", help="Rescore stored open leads")
+    for name in MACRO_FIELDS:
+        parser_rescore.add_argument(f"--{name.replace('_', '-')}", dest=name, type=float)
+    parser_rescore.add_argument(
+        "--statuses", default=",".join(DEFAULT_RESCORE_STATUSES),
+        help="Lead statuses to rescore (comma separated)"
+    )
+    parser_rescore.add_argument(
+        "--no-stale-model", action="store_true",
+        help="Only rescore leads whose macro values changed"
+    )
+    parser_rescore.add_argument("--dry-run", action="store_true", help="Only count affected leads")
+    parser_rescore.add_argument("--resume", type=int, metavar="JOB_ID", help="Resume an unfinished job")
+
+    args = parser.parse_args(argv)
+    if args.command == "rescore":
+        return rescore(args)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
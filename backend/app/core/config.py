@@ -0,0 +1,124 @@
+from dotenv import load_dotenv
+import os
+import tempfile
+
+# Load environment variables
+load_dotenv()
+
+
+class Settings:
+    """Konfigurasi aplikasi (dibaca dari environment / file .env)"""
+
+    DATABASE_URL: str = os.getenv("DATABASE_URL")
+
+    # Database engine: log SQL (debug saja), pooling & tuning SQLite
+    SQL_ECHO: bool = os.getenv("SQL_ECHO", "false").lower() in ("1", "true", "yes")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+    # SQLite: detik menunggu lock write dilepas (busy timeout); setelah itu
+    # transaksi write diulang DB_LOCK_RETRIES kali dengan jeda awal (detik)
+    # DB_LOCK_RETRY_DELAY yang berlipat tiap percobaan
+    DB_BUSY_TIMEOUT: float = float(os.getenv("DB_BUSY_TIMEOUT", "30"))
+    DB_LOCK_RETRIES: int = int(os.getenv("DB_LOCK_RETRIES", "3"))
+    DB_LOCK_RETRY_DELAY: float = float(os.getenv("DB_LOCK_RETRY_DELAY", "0.5"))
+    # Jumlah baris per executemany saat bulk insert
+    DB_BULK_BATCH_SIZE: int = int(os.getenv("DB_BULK_BATCH_SIZE", "1000"))
+
+    # Upload CSV: jumlah baris per chunk yang di-score + disimpan sekaligus
+    CSV_CHUNK_SIZE: int = int(os.getenv("CSV_CHUNK_SIZE", "5000"))
+    # Jumlah byte awal file yang dibaca untuk mendeteksi separator
+    CSV_SNIFF_BYTES: int = int(os.getenv("CSV_SNIFF_BYTES", "65536"))
+
+    # Background job upload: jumlah worker thread & folder salinan file upload
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    UPLOAD_DIR: str = os.getenv(
+        "UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "smartconvert_uploads")
+    )
+    # Maksimal job upload yang antre/berjalan; lebih dari itu upload dijawab 429
+    MAX_PENDING_JOBS: int = int(os.getenv("MAX_PENDING_JOBS", "20"))
+    # Lease job (upload & rescore): worker yang mengklaim job memperbarui
+    # heartbeat tiap chunk; job RUNNING tanpa heartbeat selama JOB_LEASE_SECONDS
+    # dianggap ditinggal (proses mati) dan boleh diklaim worker lain
+    JOB_LEASE_SECONDS: int = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+    # Rescoring lead tersimpan (makro / model berubah): lead per chunk & jeda
+    # antar chunk (ms) supaya write lain tetap dapat giliran
+    RESCORE_CHUNK_SIZE: int = int(os.getenv("RESCORE_CHUNK_SIZE", "2000"))
+    RESCORE_PAUSE_MS: float = float(os.getenv("RESCORE_PAUSE_MS", "0"))
+
+    # Scoring di jalur request (predict, upload background=false): executor
+    # terbatas, worker + antrean; saat penuh API menjawab 429 + Retry-After
+    SCORING_WORKERS: int = int(os.getenv("SCORING_WORKERS", "2"))
+    SCORING_QUEUE_SIZE: int = int(os.getenv("SCORING_QUEUE_SIZE", "8"))
+    SCORING_RETRY_AFTER: int = int(os.getenv("SCORING_RETRY_AFTER", "1"))
+    # Micro-batching POST /predict: request satu-lead yang datang bersamaan
+    # digabung (maks PREDICT_BATCH_MAX_SIZE lead / PREDICT_BATCH_WAIT_MS)
+    PREDICT_BATCHING: bool = os.getenv("PREDICT_BATCHING", "true").lower() in ("1", "true", "yes")
+    PREDICT_BATCH_MAX_SIZE: int = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "64"))
+    PREDICT_BATCH_WAIT_MS: float = float(os.getenv("PREDICT_BATCH_WAIT_MS", "5"))
+
+
+    # SHAP: jumlah worker process (0 = in-process) & jumlah baris per shard
+    SHAP_WORKERS: int = int(os.getenv("SHAP_WORKERS", "0"))
+    SHAP_SHARD_SIZE: int = int(os.getenv("SHAP_SHARD_SIZE", "1000"))
+    # Sumber SHAP: "native" (XGBoost pred_contribs) atau "shap" (shap.TreeExplainer)
+    SHAP_BACKEND: str = os.getenv("SHAP_BACKEND", "native").lower()
+    # Inference: "native" (Booster.inplace_predict) atau "sklearn" (predict_proba)
+    INFERENCE_BACKEND: str = os.getenv("INFERENCE_BACKEND", "native").lower()
+
+
+    # Explainability: "eager" = SHAP + script dihitung saat ingest,
+    # "lazy" = hanya skor saat ingest, SHAP + script dihitung saat detail dibuka
+    EXPLAIN_MODE: str = os.getenv("EXPLAIN_MODE", "eager").lower()
+    # Mode lazy: jumlah lead skor tertinggi yang di-prewarm setelah upload
+    PREWARM_TOP_N: int = int(os.getenv("PREWARM_TOP_N", "200"))
+    # File JSON rule script rekomendasi (format DEFAULT_RULES di
+    # app/services/recommendation.py); kosong = rule bawaan
+    RECOMMENDATION_RULES_PATH: str = os.getenv("RECOMMENDATION_RULES_PATH")
+
+
+    # Cache ringkasan analytics (detik), juga di-invalidate saat ada write
+    ANALYTICS_CACHE_TTL: int = int(os.getenv("ANALYTICS_CACHE_TTL", "60"))
+
+
+    # Export lead (GET /customers/export): baris per batch dari DB & jumlah
+    # driver SHAP (fitur |SHAP| terbesar) per lead
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+    EXPORT_TOP_K: int = int(os.getenv("EXPORT_TOP_K", "3"))
+
+
+    # Format simpan SHAP per lead: "blob" (float32 array) atau "json" (format lama)
+    SHAP_STORAGE: str = os.getenv("SHAP_STORAGE", "blob").lower()
+
+
+    # LRU cache prediksi di MLService (jumlah entry, 0 = nonaktif)
+    PREDICTION_CACHE_SIZE: int = int(os.getenv("PREDICTION_CACHE_SIZE", "50000"))
+
+
+    # Artifacts ML: folder (default backend/ml_artifacts), format file model
+    # ("pickle" = .pkl, "ubjson" = .ubj, "json" = .json native XGBoost)
+    ML_ARTIFACTS_DIR: str = os.getenv("ML_ARTIFACTS_DIR")
+    MODEL_FORMAT: str = os.getenv("MODEL_FORMAT", "pickle").lower()
+    # Load model di background thread saat startup (readiness menyusul)
+    ML_PRELOAD: bool = os.getenv("ML_PRELOAD", "true").lower() in ("1", "true", "yes")
+
+
+    # Model registry: versi aktif saat startup (default xgboost_tuned_v2 di root
+    # ml_artifacts, versi lain di ml_artifacts/<versi>/) & versi kandidat shadow
+    MODEL_VERSION: str = os.getenv("MODEL_VERSION")
+    SHADOW_MODEL_VERSION: str = os.getenv("SHADOW_MODEL_VERSION")
+    # Maksimal batch shadow yang antre; lebih dari itu batch shadow dilewati
+    SHADOW_MAX_PENDING: int = int(os.getenv("SHADOW_MAX_PENDING", "8"))
+
+
+    # Observability: histogram timing per stage pipeline (GET /metrics, format
+    # Prometheus), header Server-Timing per request & sampling profiler per
+    # request (?profile=true, response diganti collapsed stacks)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    SERVER_TIMING: bool = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+    PROFILER_ENABLED: bool = os.getenv("PROFILER_ENABLED", "false").lower() in ("1", "true", "yes")
+    PROFILER_INTERVAL_MS: float = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+
+
+settings = Settings()
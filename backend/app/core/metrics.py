@@ -0,0 +1,215 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.core.config import settings
+
+# Bucket durasi stage (detik) & jumlah baris per batch
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1000, 2500, 5000, 10000)
+
+METRIC_PREFIX = "smartconvert"
+
+# Timing stage milik request yang sedang berjalan (Server-Timing), None = tidak dicatat
+_request_timings = ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    """Histogram kumulatif ala Prometheus (bucket tetap, satu lock, tanpa alokasi per observe)"""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # Bucket pertama dengan batas >= value (terakhir = +Inf)
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+class Metrics:
+    """
+    Metrik in-process untuk pipeline scoring:
+    - histogram durasi per stage (csv_parse, preprocess, predict, shap, ...)
+    - histogram jumlah baris per batch per stage
+    - counter (error per stage, dll)
+    Collector tambahan (cache, executor, ...) dibaca saat /metrics di-render.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # (nama metrik, labels) -> Histogram / nilai counter
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+        self._collectors = []
+
+    def _histogram(self, name: str, labels: tuple, buckets: tuple) -> Histogram:
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms.setdefault(key, Histogram(buckets))
+        return histogram
+
+    def observe_stage(self, stage: str, seconds: float, rows: int = None):
+        """Catat satu durasi stage (+ jumlah baris batch bila ada)"""
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, seconds))
+
+        if not self.enabled:
+            return
+
+        labels = (("stage", stage),)
+        with self._lock:
+            self._histogram("stage_duration_seconds", labels, LATENCY_BUCKETS).observe(seconds)
+            if rows is not None:
+                self._histogram("stage_rows", labels, ROW_BUCKETS).observe(rows)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    @contextmanager
+    def stage(self, stage: str, rows: int = None):
+        """
+        Ukur satu stage: `with metrics.stage("predict", rows=len(X)):`.
+        Exception dihitung di stage_errors_total lalu diteruskan.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc("stage_errors_total", stage=stage)
+            raise
+        finally:
+            self.observe_stage(stage, time.perf_counter() - started, rows)
+
+    def timed_iter(self, stage: str, iterable):
+        """Iterator yang mengukur waktu menghasilkan tiap item (mis. chunk CSV)"""
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            except Exception:
+                self.inc("stage_errors_total", stage=stage)
+                raise
+            self.observe_stage(stage, time.perf_counter() - started, len(item))
+            yield item
+
+    def register_collector(self, collector):
+        """
+        collector() -> list of (nama, tipe, help, [(labels dict, nilai)]),
+        dipanggil setiap /metrics (untuk statistik yang sudah ada di service lain)
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Semua metrik dalam format text exposition Prometheus"""
+        lines = []
+
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        seen = set()
+        for (name, labels), histogram in histograms:
+            full_name = f"{METRIC_PREFIX}_{name}"
+            if full_name not in seen:
+                seen.add(full_name)
+                lines.append(f"# TYPE {full_name} histogram")
+
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                cumulative += count
+                bucket_labels = _format_labels(labels + (("le", bound),))
+                lines.append(f"{full_name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{full_name}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{full_name}_count{_format_labels(labels)} {histogram.count}")
+
+        for (name, labels), value in counters:
+            full_name = f"{METRIC_PREFIX}_{name}"
+            if full_name not in seen:
+                seen.add(full_name)
+                lines.append(f"# TYPE {full_name} counter")
+            lines.append(f"{full_name}{_format_labels(labels)} {value}")
+
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+                continue
+
+            for name, kind, help_text, samples in families:
+                full_name = f"{METRIC_PREFIX}_{name}"
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    label_text = _format_labels(tuple(sorted(labels.items())))
+                    lines.append(f"{full_name}{label_text} {float(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+# =====================================================
+# Server-Timing (per request)
+# =====================================================
+
+@contextmanager
+def collect_timings(timings: list = None):
+    """
+    Kumpulkan timing stage di scope ini (dan thread yang menyalin context-nya,
+    mis. scoring_executor). Yield list (stage, detik).
+    """
+    timings = [] if timings is None else timings
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def current_timings():
+    """List timing request aktif (None jika Server-Timing tidak dicatat)"""
+    return _request_timings.get()
+
+
+def server_timing_header(timings: list, total: float) -> str:
+    """[(stage, detik)] -> 'preprocess;dur=1.2, predict;dur=0.4, total;dur=3.1' (ms)"""
+    durations = {}
+    for stage, seconds in timings:
+        durations[stage] = durations.get(stage, 0.0) + seconds
+
+    parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in durations.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+# Singleton
+metrics = Metrics(enabled=settings.METRICS_ENABLED)
@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Frame "menganggur" (thread menunggu lock / antrean / socket) tidak dihitung
+IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "thread.py")
+
+
+class SamplingProfiler:
+    """
+    Sampling profiler sederhana untuk satu request (tanpa dependency):
+    thread sampler membaca stack semua thread tiap `interval` detik lewat
+    sys._current_frames(). Hasilnya format "collapsed stack"
+    (fungsi;fungsi;fungsi jumlah_sample) yang bisa dibuka di speedscope /
+    flamegraph.pl. Semua thread di-sample karena scoring berjalan di
+    executor, bukan di thread request.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples = Counter()
+        self.total = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.started = None
+        self.seconds = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self.started
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = self._collapse(frame)
+                if stack:
+                    self.samples[f"{names.get(thread_id, thread_id)};{stack}"] += 1
+            self.total += 1
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        leaf = os.path.basename(frame.f_code.co_filename)
+        if leaf in IDLE_FILES:
+            return None
+
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def report(self) -> str:
+        header = (
+            f"# sampling profile: {self.total} ticks, interval {self.interval * 1000:.1f}ms, "
+            f"wall {self.seconds * 1000:.1f}ms (collapsed stacks, busy threads only)"
+        )
+        lines = [f"{stack} {count}" for stack, count in self.samples.most_common()]
+        return "\n".join([header] + lines) + "\n"
@@ -0,0 +1,27 @@
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+def bulk_insert(session: Session, model, rows: list, batch_size: int = None, returning=None):
+    """
+    Insert banyak baris (list of dict) lewat Core insert() executemany,
+    per batch — tanpa membuat object ORM per baris.
+    returning: kolom (mis. Customer.id) yang dikembalikan, urutan sama dengan rows.
+    Commit dilakukan oleh pemanggil.
+    """
+    batch_size = batch_size or settings.DB_BULK_BATCH_SIZE
+    statement = insert(model)
+    if returning is not None:
+        statement = statement.returning(returning, sort_by_parameter_order=True)
+
+    values = []
+    with metrics.stage("db_insert", rows=len(rows)):
+        for start in range(0, len(rows), batch_size):
+            result = session.execute(statement, rows[start:start + batch_size])
+            if returning is not None:
+                values.extend(result.scalars().all())
+
+    return values if returning is not None else None
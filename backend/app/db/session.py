@@ -1,20 +1,128 @@
+import time
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import OperationalError
 from sqlmodel import create_engine, Session, SQLModel
-from dotenv import load_dotenv
-import os
+from app.core.config import settings
+from app.core.metrics import metrics
 
-# Load environment variables
-load_dotenv()
+DATABASE_URL = settings.DATABASE_URL
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
 
-# Khusus SQLite: check_same_thread=False diperlukan untuk FastAPI
-connect_args = {"check_same_thread": False}
+engine_kwargs = {"echo": settings.SQL_ECHO}
 
-engine = create_engine(DATABASE_URL, echo=True, connect_args=connect_args)
+if IS_SQLITE:
+    # Khusus SQLite: check_same_thread=False diperlukan untuk FastAPI
+    # timeout: writer menunggu lock dilepas (busy timeout) sebelum "database is locked"
+    engine_kwargs["connect_args"] = {
+        "check_same_thread": False,
+        "timeout": settings.DB_BUSY_TIMEOUT
+    }
+
+if ":memory:" not in DATABASE_URL:
+    engine_kwargs.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True
+    )
+
+engine = create_engine(DATABASE_URL, **engine_kwargs)
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        # WAL: reader tidak diblok writer, NORMAL: fsync lebih jarang (aman di WAL)
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        # Nilai negatif = ukuran cache dalam KiB
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        cursor.close()
 
 def get_session():
     with Session(engine) as session:
         yield session
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
+def is_lock_error(error: Exception) -> bool:
+    """SQLite "database is locked" / busy: transaksi aman diulang"""
+    if not isinstance(error, OperationalError):
+        return False
+    message = str(error.orig if error.orig is not None else error).lower()
+    return "locked" in message or "busy" in message
+
+def write_with_retry(session: Session, write, rows: int = 0, retries: int = None):
+    """
+    write(session) lalu commit sebagai satu transaksi pendek. Jika lock tidak
+    didapat dalam busy timeout: rollback, tunggu (backoff), lalu write diulang
+    dari awal (write harus aman diulang). Setelah DB_LOCK_RETRIES percobaan
+    error diteruskan ke pemanggil. Return nilai dari write(session).
+    """
+    retries = settings.DB_LOCK_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            result = write(session)
+            with metrics.stage("db_commit", rows=rows):
+                session.commit()
+            return result
+        except OperationalError as e:
+            session.rollback()
+            if not is_lock_error(e) or attempt == retries:
+                raise
+            print(f"⚠️ Database locked, retrying write ({attempt + 1}/{retries})")
+            time.sleep(settings.DB_LOCK_RETRY_DELAY * 2 ** attempt)
+
+def add_missing_columns(bind):
+    """
+    Migrasi ringan (idempotent): create_all tidak menambah kolom ke tabel
+    yang sudah ada, jadi kolom model yang belum ada di DB ditambahkan dengan
+    ALTER TABLE ... ADD COLUMN. Return daftar "tabel.kolom" yang ditambahkan.
+    """
+    added = []
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in SQLModel.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            preparer = bind.dialect.identifier_preparer
+            ddl = (
+                f"ALTER TABLE {preparer.format_table(table)} "
+                f"ADD COLUMN {preparer.format_column(column)} "
+                f"{column.type.compile(dialect=bind.dialect)}"
+            )
+            # Kolom NOT NULL butuh DEFAULT untuk baris lama
+            default = column.default.arg if column.default is not None and column.default.is_scalar else None
+            if default is not None:
+                ddl += f" DEFAULT {_literal(default)}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            with bind.begin() as connection:
+                connection.execute(text(ddl))
+            added.append(f"{table.name}.{column.name}")
+
+    if added:
+        print(f"🛠️ DB migrated, added columns: {', '.join(added)}")
+    return added
+
+def _literal(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+def create_db_and_tables(bind=None):
+    bind = bind if bind is not None else engine
+    SQLModel.metadata.create_all(bind)
+    # Kolom baru dulu, baru index (index bisa memakai kolom baru)
+    add_missing_columns(bind)
+    # create_all tidak menambah index ke tabel yang sudah ada
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
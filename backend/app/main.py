@@ -1,7 +1,23 @@
-from fastapi import FastAPI
+import threading
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.db.session import create_db_and_tables
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+from app.core.config import settings
+from app.core.metrics import metrics, collect_timings, server_timing_header
+from app.core.profiler import SamplingProfiler
+from app.db.session import create_db_and_tables, engine
 from app.api.v1.api import api_router
+from app.services.job_service import job_service
+from app.services.rescore_service import rescore_service
+from app.services.ml_service import ml_service, STATUS_READY
+from app.services.shadow_service import shadow_service
+from app.services.scoring_executor import scoring_executor, ScoringBusyError
+from app.services.prediction_batcher import prediction_batcher
+from app.services.feature_importance_service import feature_importance_service
+from app.models.feature_importance import LABEL_ALL
 
 app = FastAPI(
     title="SmartConvert CRM API",
@@ -21,12 +37,121 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Header pagination keyset GET /customers & timing per stage
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
 
+# Middleware hanya dipasang jika dipakai (tanpa overhead saat dimatikan)
+if settings.SERVER_TIMING or settings.PROFILER_ENABLED:
+    @app.middleware("http")
+    async def timing_middleware(request: Request, call_next):
+        """
+        SERVER_TIMING: header Server-Timing berisi total waktu per stage
+        pipeline (preprocess, predict, shap, db_commit, ...) untuk request ini.
+        PROFILER_ENABLED + ?profile=true: request di-profile, response
+        diganti hasil sampling profiler (collapsed stacks, text/plain).
+        """
+        profiler = None
+        if settings.PROFILER_ENABLED and request.query_params.get("profile") in ("1", "true"):
+            profiler = SamplingProfiler(interval=settings.PROFILER_INTERVAL_MS / 1000)
+            profiler.start()
+
+        started = time.perf_counter()
+        with collect_timings() as timings:
+            response = await call_next(request)
+
+        if profiler is not None:
+            profiler.stop()
+            return PlainTextResponse(profiler.report())
+
+        if settings.SERVER_TIMING:
+            response.headers["Server-Timing"] = server_timing_header(
+                timings, time.perf_counter() - started
+            )
+        return response
+
+@app.exception_handler(ScoringBusyError)
+def scoring_busy_handler(request: Request, exc: ScoringBusyError):
+    """Backpressure: kapasitas scoring / antrean upload penuh -> 429"""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(settings.SCORING_RETRY_AFTER)}
+    )
+
+def preload_ml():
+    """Load artifacts ML di background; readiness lihat GET /api/v1/model/ready"""
+    if not ml_service.ensure_loaded():
+        return
+    # Baris agregat SHAP global untuk fitur model saat ini
+    with Session(engine) as session:
+        feature_importance_service.seed(
+            session,
+            ml_service.feature_columns,
+            [LABEL_ALL, "Potential", "Non-Potential"]
+        )
+
 @app.on_event("startup")
 def on_startup():
     # Membuat tabel database otomatis saat server nyala
     create_db_and_tables()
+    # Daftar fitur semua versi model (decode SHAP blob tanpa load model)
+    ml_service.registry.register_features()
+    # Model di-load tanpa menahan startup (request pertama juga memicu load)
+    if settings.ML_PRELOAD:
+        threading.Thread(target=preload_ml, name="ml-preload", daemon=True).start()
+    # Lanjutkan job upload yang belum selesai sebelum restart
+    job_service.resume_pending_jobs()
+    rescore_service.resume_pending_jobs()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    job_service.shutdown()
+    rescore_service.shutdown()
+    prediction_batcher.shutdown()
+    scoring_executor.shutdown()
+    shadow_service.shutdown()
+    ml_service.shutdown()
+
+def _service_metrics() -> list:
+    """Statistik yang sudah ada di service lain, dibaca saat /metrics"""
+    cache = ml_service.cache.stats()
+    scoring = scoring_executor.stats()
+    batching = prediction_batcher.stats()
+    return [
+        ("prediction_cache_hits_total", "counter", "Prediction cache hits",
+         [({}, cache["hits"])]),
+        ("prediction_cache_misses_total", "counter", "Prediction cache misses",
+         [({}, cache["misses"])]),
+        ("prediction_cache_evictions_total", "counter", "Prediction cache evictions",
+         [({}, cache["evictions"])]),
+        ("prediction_cache_entries", "gauge", "Prediction cache size",
+         [({}, cache["size"])]),
+        ("scoring_in_flight", "gauge", "Scoring tasks running or queued",
+         [({}, scoring["in_flight"])]),
+        ("scoring_completed_total", "counter", "Scoring tasks completed",
+         [({}, scoring["completed"])]),
+        ("scoring_rejected_total", "counter", "Scoring tasks rejected with 429",
+         [({}, scoring["rejected"])]),
+        ("predict_batches_total", "counter", "Micro-batches scored for /predict",
+         [({}, batching["batches"])]),
+        ("predict_batch_items_total", "counter", "Leads scored through micro-batches",
+         [({}, batching["items"])]),
+        ("upload_jobs_pending", "gauge", "Upload jobs queued or running",
+         [({}, job_service.pending)]),
+        ("model_ready", "gauge", "Active model loaded",
+         [({"model_version": ml_service.model_version or ""}, int(ml_service.status == STATUS_READY))]),
+    ]
+
+metrics.register_collector(_service_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def read_metrics():
+    """Metrik pipeline scoring dalam format text Prometheus"""
+    return PlainTextResponse(
+        await run_in_threadpool(metrics.render),
+        media_type="text/plain; version=0.0.4"
+    )
 
 @app.get("/")
 def root():
@@ -1,4 +1,5 @@
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 from datetime import datetime
 
@@ -26,20 +27,35 @@ class CustomerBase(SQLModel):
 
     # Status Lead (Workflow Sales)
     # Pilihan: 'NEW', 'CONTACTED', 'INTERESTED', 'CLOSED', 'REJECTED'
-    lead_status: str = Field(default="NEW") 
+    lead_status: str = Field(default="NEW", index=True)
     sales_notes: Optional[str] = None
 
 class Customer(CustomerBase, table=True):
+    # Index komposit untuk sorting + keyset pagination (prediction_score, id)
+    __table_args__ = (
+        Index("ix_customer_score_id", "prediction_score", "id"),
+        Index("ix_customer_status_score_id", "lead_status", "prediction_score", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     
     # Hasil AI
     prediction_score: Optional[float] = None
-    prediction_label: Optional[str] = None
+    prediction_label: Optional[str] = Field(default=None, index=True)
+    # Versi model yang menghasilkan skor (lihat app/services/model_registry.py)
+    model_version: Optional[str] = Field(default=None, index=True)
+    # Skor model kandidat (shadow mode) untuk perbandingan, diisi di background
+    shadow_score: Optional[float] = None
+    shadow_model_version: Optional[str] = None
     
     # Explainable AI (Disimpan sebagai JSON String)
     # Contoh: {"euribor3m": 0.5, "contact": 0.2}
     shap_values_json: Optional[str] = None 
+    # Format ringkas: array float32 urutan fitur model + versi daftar fitur
+    # (lihat app/services/shap_storage.py). Diisi jika SHAP_STORAGE=blob.
+    shap_values_blob: Optional[bytes] = None
+    shap_version: Optional[str] = None
     
     # Script Rekomendasi (Next Best Conversation)
     recommendation_script: Optional[str] = None
@@ -54,7 +70,49 @@ class CustomerRead(CustomerBase):
     prediction_label: Optional[str]
     shap_values_json: Optional[str]
     recommendation_script: Optional[str]
+    model_version: Optional[str] = None
+    shadow_score: Optional[float] = None
+    shadow_model_version: Optional[str] = None
     
+# Proyeksi ringan untuk list (GET /customers): tanpa shap_values_json &
+# recommendation_script. Semua Optional supaya bisa dipangkas lewat ?fields=
+class CustomerListItem(SQLModel):
+    id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    age: Optional[int] = None
+    job: Optional[str] = None
+    marital: Optional[str] = None
+    education: Optional[str] = None
+    default: Optional[str] = None
+    housing: Optional[str] = None
+    loan: Optional[str] = None
+    contact: Optional[str] = None
+    month: Optional[str] = None
+    day_of_week: Optional[str] = None
+    campaign: Optional[int] = None
+    pdays: Optional[int] = None
+    previous: Optional[int] = None
+    poutcome: Optional[str] = None
+    emp_var_rate: Optional[float] = None
+    cons_price_idx: Optional[float] = None
+    cons_conf_idx: Optional[float] = None
+    euribor3m: Optional[float] = None
+    nr_employed: Optional[float] = None
+    lead_status: Optional[str] = None
+    sales_notes: Optional[str] = None
+    prediction_score: Optional[float] = None
+    prediction_label: Optional[str] = None
+    model_version: Optional[str] = None
+
+# Filter query list customer (GET /customers, dipakai juga oleh fitur lain)
+class CustomerFilter(SQLModel):
+    lead_status: Optional[str] = None
+    prediction_label: Optional[str] = None
+    min_score: Optional[float] = None
+    max_score: Optional[float] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
 # Model khusus untuk update status (Patch)
 class CustomerUpdateStatus(SQLModel):
     lead_status: str
@@ -0,0 +1,33 @@
+from typing import Optional
+from sqlalchemy import UniqueConstraint
+from sqlmodel import Field, SQLModel
+
+# Baris agregat untuk semua label
+LABEL_ALL = "ALL"
+
+
+class FeatureImportance(SQLModel, table=True):
+    """
+    Agregat SHAP global per fitur (dan per prediction_label), di-update
+    incremental setiap hasil SHAP disimpan.
+    """
+    __tablename__ = "feature_importance"
+    __table_args__ = (
+        UniqueConstraint("feature", "prediction_label", name="uq_feature_importance_key"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    feature: str
+    prediction_label: str = Field(default=LABEL_ALL)
+
+    shap_sum: float = 0.0
+    shap_abs_sum: float = 0.0
+    count: int = 0
+
+
+class FeatureImportanceRead(SQLModel):
+    feature: str
+    prediction_label: str
+    count: int
+    mean_shap: float
+    mean_abs_shap: float
@@ -0,0 +1,43 @@
+from typing import Optional
+from sqlmodel import Field, SQLModel
+from datetime import datetime
+
+# Status job upload
+# Alur: QUEUED -> RUNNING -> COMPLETED / FAILED
+JOB_QUEUED = "QUEUED"
+JOB_RUNNING = "RUNNING"
+JOB_COMPLETED = "COMPLETED"
+JOB_FAILED = "FAILED"
+
+
+class UploadJobBase(SQLModel):
+    filename: str
+    status: str = Field(default=JOB_QUEUED, index=True)
+
+    # Progress (di-commit bersama tiap chunk, jadi aman untuk resume)
+    rows_done: int = 0
+    rows_failed: int = 0
+    potential: int = 0
+    sample_error: Optional[str] = None
+    # Laporan semua baris gagal (GET /customers/upload-errors/{error_report_id})
+    error_report_id: Optional[str] = None
+    error: Optional[str] = None
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class UploadJob(UploadJobBase, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # Lokasi salinan file upload di disk (dihapus setelah job selesai)
+    file_path: str
+    # Lease: proses pemilik job + heartbeat terakhir (lihat job_lease)
+    owner: Optional[str] = None
+    heartbeat_at: Optional[datetime] = None
+
+
+class UploadJobRead(UploadJobBase):
+    id: int
+    # Baris per detik (done + failed) sejak job mulai jalan
+    throughput: Optional[float] = None
@@ -0,0 +1,60 @@
+from typing import Optional
+from sqlmodel import Field, SQLModel
+from datetime import datetime
+
+from app.models.job import JOB_QUEUED
+
+# Indikator makro yang bisa di-update lewat rescoring
+MACRO_FIELDS = ["emp_var_rate", "cons_price_idx", "cons_conf_idx", "euribor3m", "nr_employed"]
+
+# Lead yang masih "terbuka" (skornya masih dipakai sales)
+DEFAULT_RESCORE_STATUSES = ["NEW", "CONTACTED"]
+
+
+class RescoreJobBase(SQLModel):
+    status: str = Field(default=JOB_QUEUED, index=True)
+
+    # Parameter: nilai makro baru (JSON {field: value}, kosong = tidak diubah),
+    # status lead yang di-rescore (dipisah koma) & versi model saat job dibuat
+    macro_json: Optional[str] = None
+    lead_statuses: str = ",".join(DEFAULT_RESCORE_STATUSES)
+    model_version: Optional[str] = None
+    # True: lead yang di-score versi model lain ikut di-rescore
+    include_stale_model: bool = True
+
+    # Progress + checkpoint (id terakhir yang selesai), di-commit bersama tiap chunk
+    total_affected: int = 0
+    rows_done: int = 0
+    rows_label_changed: int = 0
+    last_id: int = 0
+    error: Optional[str] = None
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class RescoreJob(RescoreJobBase, table=True):
+    __tablename__ = "rescore_job"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # Lease: proses pemilik job + heartbeat terakhir (lihat job_lease)
+    owner: Optional[str] = None
+    heartbeat_at: Optional[datetime] = None
+
+
+class RescoreJobRead(RescoreJobBase):
+    id: int
+    # Lead per detik sejak job mulai jalan
+    throughput: Optional[float] = None
+
+
+class RescoreRequest(SQLModel):
+    """Body POST /customers/rescore (semua field opsional)"""
+    emp_var_rate: Optional[float] = None
+    cons_price_idx: Optional[float] = None
+    cons_conf_idx: Optional[float] = None
+    euribor3m: Optional[float] = None
+    nr_employed: Optional[float] = None
+    lead_statuses: list[str] = DEFAULT_RESCORE_STATUSES
+    include_stale_model: bool = True
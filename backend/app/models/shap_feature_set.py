@@ -0,0 +1,16 @@
+from sqlmodel import Field, SQLModel
+from datetime import datetime
+
+
+class ShapFeatureSet(SQLModel, table=True):
+    """
+    Daftar fitur per shap_version (urutan nilai di vektor SHAP blob).
+    Disimpan saat model di-load, supaya blob versi lama / model yang belum
+    di-load di proses ini tetap bisa di-decode.
+    """
+    __tablename__ = "shap_feature_set"
+
+    version: str = Field(primary_key=True)
+    # JSON list nama fitur
+    features_json: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,171 @@
+import threading
+import time
+
+from sqlalchemy import case, func
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models.customer import Customer
+
+# Bucket skor (sama dengan chart "Lead Score Distribution" di frontend)
+SCORE_BUCKETS = [
+    (0.2, "0-20%"),
+    (0.4, "21-40%"),
+    (0.6, "41-60%"),
+    (0.8, "61-80%"),
+]
+SCORE_BUCKET_LAST = "81-100%"
+
+AGE_GROUPS = [
+    (25, "18-25"),
+    (35, "26-35"),
+    (45, "36-45"),
+    (55, "46-55"),
+    (65, "56-65"),
+]
+AGE_GROUP_LAST = "65+"
+
+# Urutan funnel workflow sales
+FUNNEL_STAGES = [
+    ("total", None),
+    ("contacted", ["CONTACTED", "INTERESTED", "CLOSED", "REJECTED"]),
+    ("interested", ["INTERESTED", "CLOSED"]),
+    ("closed", ["CLOSED"]),
+]
+
+BREAKDOWN_COLUMNS = ["job", "month", "contact"]
+
+
+def _bucket(column, buckets, last_label):
+    return case(
+        *[(column <= upper, label) for upper, label in buckets],
+        else_=last_label
+    )
+
+
+def _count_if(condition):
+    return func.sum(case((condition, 1), else_=0))
+
+
+class AnalyticsService:
+    """
+    Ringkasan analytics dihitung dengan agregat SQL (seluruh tabel) lalu
+    di-cache di memori. Cache di-invalidate setiap ada write (predict, upload,
+    update status) dan kedaluwarsa setelah ANALYTICS_CACHE_TTL detik
+    (untuk write dari worker process lain).
+    Ringkasan dihitung di luar lock; hasilnya hanya disimpan jika tidak ada
+    invalidate selama perhitungan (generation sama), jadi ringkasan yang
+    dihitung sebelum write ter-commit tidak di-cache sebagai data terbaru.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._summary = None
+        self._computed_at = 0.0
+        # Naik setiap invalidate
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._summary = None
+            self._generation += 1
+
+    def get_summary(self, session: Session) -> dict:
+        with self._lock:
+            fresh = time.monotonic() - self._computed_at < self.ttl
+            if self._summary is not None and fresh:
+                return self._summary
+            generation = self._generation
+            started_at = time.monotonic()
+
+        summary = self.compute_summary(session)
+
+        with self._lock:
+            if self._generation == generation:
+                self._summary = summary
+                # TTL dihitung dari awal perhitungan (snapshot data)
+                self._computed_at = started_at
+        return summary
+
+    def compute_summary(self, session: Session) -> dict:
+        score = Customer.prediction_score
+        is_potential = Customer.prediction_label == "Potential"
+
+        totals = session.exec(
+            select(
+                func.count(Customer.id),
+                _count_if(score > 0.7),
+                _count_if((score >= 0.4) & (score <= 0.7)),
+                _count_if(score < 0.4),
+                func.avg(score),
+                *[
+                    _count_if(Customer.lead_status.in_(statuses))
+                    for _, statuses in FUNNEL_STAGES[1:]
+                ]
+            )
+        ).one()
+        total, high, medium, low, avg_score, *funnel_counts = totals
+
+        return {
+            "total": total,
+            "average_score": avg_score,
+            "score_tiers": {"high": high or 0, "medium": medium or 0, "low": low or 0},
+            "by_lead_status": self._count_by(session, Customer.lead_status),
+            "by_prediction_label": self._count_by(session, Customer.prediction_label),
+            "score_histogram": self._histogram(
+                session,
+                _bucket(score, SCORE_BUCKETS, SCORE_BUCKET_LAST),
+                [label for _, label in SCORE_BUCKETS] + [SCORE_BUCKET_LAST],
+                score.is_not(None)
+            ),
+            "age_groups": self._histogram(
+                session,
+                _bucket(Customer.age, AGE_GROUPS, AGE_GROUP_LAST),
+                [label for _, label in AGE_GROUPS] + [AGE_GROUP_LAST]
+            ),
+            "loan_profile": self._count_by(
+                session, Customer.housing + "/" + Customer.loan
+            ),
+            "funnel": [
+                {"stage": stage, "count": count or 0}
+                for (stage, _), count in zip(FUNNEL_STAGES, [total] + funnel_counts)
+            ],
+            "breakdowns": {
+                name: self._breakdown(session, getattr(Customer, name), is_potential)
+                for name in BREAKDOWN_COLUMNS
+            }
+        }
+
+    def _count_by(self, session: Session, column) -> dict:
+        rows = session.exec(
+            select(column, func.count(Customer.id)).group_by(column)
+        ).all()
+        return {key: count for key, count in rows}
+
+    def _histogram(self, session: Session, bucket, labels: list, *where) -> list:
+        statement = select(bucket, func.count(Customer.id)).group_by(bucket)
+        for condition in where:
+            statement = statement.where(condition)
+        counts = dict(session.exec(statement).all())
+        return [{"name": label, "count": counts.get(label, 0)} for label in labels]
+
+    def _breakdown(self, session: Session, column, is_potential) -> list:
+        rows = session.exec(
+            select(
+                column,
+                func.count(Customer.id),
+                func.avg(Customer.prediction_score),
+                _count_if(is_potential)
+            )
+            .group_by(column)
+            .order_by(func.count(Customer.id).desc())
+        ).all()
+        return [
+            {"name": key, "count": count, "average_score": avg, "potential": potential or 0}
+            for key, count, avg, potential in rows
+        ]
+
+
+# Singleton
+analytics_service = AnalyticsService(ttl=settings.ANALYTICS_CACHE_TTL)
@@ -0,0 +1,138 @@
+import base64
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+from app.models.customer import Customer, CustomerFilter, CustomerListItem
+
+# Kolom yang boleh diminta di list (?fields=), default semuanya
+LIST_FIELDS = list(CustomerListItem.model_fields)
+
+# Sort key -> (kolom urut, arah). Semua sort memakai id sebagai tie-breaker
+SORT_KEYS = {
+    "id_asc": (None, "asc"),
+    "id_desc": (None, "desc"),
+    "score_desc": (Customer.prediction_score, "desc"),
+    "score_asc": (Customer.prediction_score, "asc"),
+}
+
+
+def apply_filters(statement, filters: CustomerFilter):
+    """Tambahkan WHERE sesuai CustomerFilter"""
+    if filters.lead_status:
+        statement = statement.where(Customer.lead_status == filters.lead_status)
+    if filters.prediction_label:
+        statement = statement.where(Customer.prediction_label == filters.prediction_label)
+    if filters.min_score is not None:
+        statement = statement.where(Customer.prediction_score >= filters.min_score)
+    if filters.max_score is not None:
+        statement = statement.where(Customer.prediction_score <= filters.max_score)
+    if filters.created_from:
+        statement = statement.where(Customer.created_at >= filters.created_from)
+    if filters.created_to:
+        statement = statement.where(Customer.created_at <= filters.created_to)
+    return statement
+
+
+def list_columns(fields: str = None) -> list:
+    """
+    Kolom Customer untuk SELECT list. fields: "id,job,prediction_score" (opsional).
+    id & kolom sort selalu ikut supaya cursor bisa dibuat.
+    """
+    if not fields:
+        names = LIST_FIELDS
+    else:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        invalid = [name for name in names if name not in LIST_FIELDS]
+        if invalid:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid fields: {', '.join(invalid)}"
+            )
+
+    return [getattr(Customer, name) for name in names]
+
+
+def encode_cursor(customer: Customer, sort: str) -> str:
+    """Cursor = sort key + nilai kunci baris terakhir ([id] atau [score, id])"""
+    column, _ = SORT_KEYS[sort]
+    key = [customer.id] if column is None else [customer.prediction_score, customer.id]
+    payload = {"sort": sort, "key": key}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def decode_cursor(cursor: str, sort: str) -> list:
+    """
+    Cursor -> nilai kunci, divalidasi terhadap sort yang diminta: cursor
+    dari sort lain / bentuk atau tipe nilai yang salah -> 400.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not isinstance(payload, dict) or not isinstance(payload.get("key"), list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get("sort") != sort:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cursor dibuat untuk sort '{payload.get('sort')}', bukan '{sort}'"
+        )
+
+    column, _ = SORT_KEYS[sort]
+    key = payload["key"]
+    expected = 1 if column is None else 2
+    if (
+        len(key) != expected
+        or not isinstance(key[-1], int) or isinstance(key[-1], bool)
+        or not all(_is_number(value) for value in key)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+def apply_sort(statement, sort: str, cursor: str = None):
+    """
+    ORDER BY sesuai sort key + keyset pagination (WHERE (score, id) < cursor).
+    Sort berdasarkan skor hanya memuat lead yang sudah punya skor.
+    """
+    if sort not in SORT_KEYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sort, pilih salah satu: {', '.join(SORT_KEYS)}"
+        )
+
+    column, direction = SORT_KEYS[sort]
+    descending = direction == "desc"
+
+    if column is not None:
+        statement = statement.where(column.is_not(None))
+
+    if cursor:
+        key = decode_cursor(cursor, sort)
+        if column is None:
+            last_id = key[0]
+            statement = statement.where(
+                Customer.id < last_id if descending else Customer.id > last_id
+            )
+        else:
+            last_value, last_id = key
+            if descending:
+                statement = statement.where(or_(
+                    column < last_value,
+                    and_(column == last_value, Customer.id < last_id)
+                ))
+            else:
+                statement = statement.where(or_(
+                    column > last_value,
+                    and_(column == last_value, Customer.id > last_id)
+                ))
+
+    order = [] if column is None else [column.desc() if descending else column.asc()]
+    order.append(Customer.id.desc() if descending else Customer.id.asc())
+    return statement.order_by(*order)
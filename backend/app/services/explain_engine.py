@@ -0,0 +1,146 @@
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+# Explainer milik tiap worker process (dibuat sekali di _init_worker)
+_worker_explainer = None
+
+
+def load_model_file(model_path: str):
+    """
+    Load model dari ml_artifacts: .pkl (pickle sklearn wrapper) atau format
+    native XGBoost (.ubj / .json) yang tidak butuh unpickle.
+    """
+    if model_path.endswith(".pkl"):
+        with open(model_path, "rb") as f:
+            return pickle.load(f)
+
+    import xgboost as xgb
+
+    model = xgb.XGBClassifier()
+    model.load_model(model_path)
+    return model
+
+
+def get_booster(model):
+    """Booster XGBoost di balik wrapper sklearn (None jika bukan model XGBoost)"""
+    if hasattr(model, "get_booster"):
+        return model.get_booster()
+
+    import xgboost as xgb
+
+    return model if isinstance(model, xgb.Booster) else None
+
+
+def iteration_range(model) -> tuple:
+    """Jumlah tree yang dipakai predict_proba (best_iteration bila early stopping)"""
+    try:
+        return (0, model.best_iteration + 1)
+    except AttributeError:
+        return (0, 0)
+
+
+class BoosterExplainer:
+    """
+    SHAP dari XGBoost langsung (Booster.predict pred_contribs=True), tanpa
+    paket shap. Nilainya sama dengan shap.TreeExplainer (log-odds); kolom
+    bias terakhir dibuang supaya bentuknya (n_rows, n_features).
+    """
+
+    def __init__(self, model):
+        self.booster = get_booster(model)
+        self.iteration_range = iteration_range(model)
+
+    def shap_values(self, X: np.ndarray) -> np.ndarray:
+        import xgboost as xgb
+
+        contribs = self.booster.predict(
+            xgb.DMatrix(X),
+            pred_contribs=True,
+            iteration_range=self.iteration_range,
+            validate_features=False
+        )
+        return contribs[:, :-1]
+
+
+def build_explainer(model, backend: str):
+    """backend "native" = BoosterExplainer, "shap" = shap.TreeExplainer"""
+    if backend == "native" and get_booster(model) is not None:
+        return BoosterExplainer(model)
+
+    import shap  # pip install shap
+
+    return shap.TreeExplainer(model)
+
+
+def _init_worker(model_path: str, backend: str):
+    """Initializer worker: load model + explainer sekali per process"""
+    global _worker_explainer
+
+    _worker_explainer = build_explainer(load_model_file(model_path), backend)
+
+
+def _worker_shap_values(X: np.ndarray) -> np.ndarray:
+    return _worker_explainer.shap_values(X)
+
+
+class ExplanationEngine:
+    """
+    Menghitung SHAP untuk matrix fitur yang sudah di-encode.
+    - workers > 0: baris dibagi per shard ke ProcessPoolExecutor (semua core)
+    - workers = 0, batch kecil, atau pool rusak: dihitung in-process
+    Pool baru dibuat saat pertama kali dibutuhkan.
+    """
+
+    def __init__(self, model_path: str, explainer, workers: int = 0, shard_size: int = 1000,
+                 backend: str = "shap"):
+        self.model_path = model_path
+        self.explainer = explainer
+        self.backend = backend
+        self.workers = workers
+        self.shard_size = shard_size
+        self.pool = None
+
+    def _get_pool(self):
+        if self.pool is None:
+            # spawn: worker tidak mewarisi thread/lock dari proses API
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_path, self.backend)
+            )
+        return self.pool
+
+    def shap_values(self, X: np.ndarray) -> np.ndarray:
+        """SHAP matrix (n_rows, n_features), urutan baris sama dengan X"""
+        if self.workers <= 0 or len(X) <= self.shard_size:
+            return self._shap_in_process(X)
+
+        shards = [
+            X[start:start + self.shard_size]
+            for start in range(0, len(X), self.shard_size)
+        ]
+        try:
+            results = list(self._get_pool().map(_worker_shap_values, shards))
+        except BrokenProcessPool as e:
+            print(f"⚠️ SHAP process pool broken, fallback in-process: {e}")
+            self.pool = None
+            return self._shap_in_process(X)
+
+        return np.vstack(results)
+
+    def _shap_in_process(self, X: np.ndarray) -> np.ndarray:
+        # Tetap per shard supaya memori sementara SHAP terkendali
+        return np.vstack([
+            self.explainer.shap_values(X[start:start + self.shard_size])
+            for start in range(0, len(X), self.shard_size)
+        ])
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
@@ -0,0 +1,123 @@
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.db.session import engine, write_with_retry, is_lock_error
+from app.models.customer import Customer
+from app.services.ml_service import ml_service
+from app.services.feature_importance_service import feature_importance_service
+from app.services.shap_storage import shap_storage, has_shap
+from app.services.scoring_executor import scoring_executor, ScoringBusyError
+from app.services.analytics_service import analytics_service
+
+
+def is_lazy() -> bool:
+    return settings.EXPLAIN_MODE == "lazy"
+
+
+def needs_explanation(customer: Customer) -> bool:
+    return customer.prediction_score is not None and not has_shap(customer)
+
+
+def apply_shap(customer: Customer, prediction: dict):
+    """Isi kolom SHAP customer sesuai format simpan (SHAP_STORAGE)"""
+    columns = shap_storage.to_columns(
+        prediction.get("shap_values"), prediction.get("shap_version")
+    )
+    for name, value in columns.items():
+        setattr(customer, name, value)
+
+
+def ensure_explanation(session: Session, customer: Customer) -> Customer:
+    """
+    Mode lazy: hitung SHAP + script saat detail pertama kali dibuka,
+    simpan ke DB, lalu dipakai ulang untuk view berikutnya.
+    SHAP dihitung di executor scoring (sama dengan /predict): concurrency
+    terbatas, executor penuh -> ScoringBusyError (429).
+    Penjelasan memakai model yang men-score lead (customer.model_version).
+    Versi itu sudah dihapus dari ml_artifacts (atau lead tanpa versi): lead
+    di-score ulang model aktif, skor / label / versi / SHAP disimpan bersama.
+    """
+    if not needs_explanation(customer):
+        return customer
+
+    # Blob dengan shap_version tak dikenal sudah pernah masuk agregat:
+    # dihitung ulang untuk ditampilkan, tapi tidak ditambahkan lagi
+    counted = customer.shap_values_blob is not None or customer.shap_values_json is not None
+
+    record = customer.model_dump()
+    try:
+        prediction = scoring_executor.run_sync(
+            ml_service.predict_and_explain, record, customer.model_version
+        )
+    except KeyError:
+        print(f"⚠️ Model {customer.model_version} retired, rescoring customer {customer.id}")
+        prediction = scoring_executor.run_sync(ml_service.predict_and_explain, record)
+    if not prediction:
+        return customer
+
+    rescored = prediction["model_version"] != customer.model_version
+
+    def save(session: Session):
+        # Diset di dalam write: rollback (retry) mengembalikan atribut customer
+        if rescored:
+            customer.prediction_score = prediction["score"]
+            customer.prediction_label = prediction["label"]
+            customer.model_version = prediction["model_version"]
+        apply_shap(customer, prediction)
+        customer.recommendation_script = prediction["script"]
+        session.add(customer)
+        if not counted:
+            feature_importance_service.apply(session, [prediction])
+
+    try:
+        write_with_retry(session, save, rows=1)
+    except Exception as e:
+        if not is_lock_error(e):
+            raise
+        raise ScoringBusyError("Database busy, retry later")
+    session.refresh(customer)
+
+    if rescored:
+        analytics_service.invalidate()
+    return customer
+
+
+def prewarm_top_leads(limit: int = None):
+    """
+    Hitung SHAP + script (batch) untuk N lead skor tertinggi yang belum punya
+    penjelasan — lead yang paling mungkin dibuka sales.
+    """
+    import pandas as pd
+
+    limit = limit or settings.PREWARM_TOP_N
+    if not ml_service.ensure_loaded():
+        return
+
+    with Session(engine) as session:
+        # Hanya lead model aktif (lead versi lain dijelaskan saat dibuka,
+        # dengan model yang men-score-nya)
+        statement = (
+            select(Customer)
+            .where(Customer.prediction_score.is_not(None))
+            .where(Customer.model_version == ml_service.model_version)
+            .where(Customer.shap_values_json.is_(None))
+            .where(Customer.shap_values_blob.is_(None))
+            .order_by(Customer.prediction_score.desc())
+            .limit(limit)
+        )
+        customers = session.exec(statement).all()
+        if not customers:
+            return
+
+        df = pd.DataFrame([c.model_dump() for c in customers])
+        predictions = ml_service.predict_and_explain_batch(df)
+
+        for customer, prediction in zip(customers, predictions):
+            if prediction:
+                apply_shap(customer, prediction)
+                customer.recommendation_script = prediction["script"]
+                session.add(customer)
+
+        feature_importance_service.apply(session, predictions)
+        session.commit()
+        print(f"✅ SHAP prewarm: {len(customers)} top leads explained")
@@ -0,0 +1,267 @@
+import csv
+import io
+import json
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import Boolean, DateTime, Float, Integer
+from sqlmodel import select
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.session import engine
+from app.models.customer import Customer, CustomerFilter
+from app.services.customer_query import apply_filters, apply_sort, list_columns
+from app.services.shap_storage import shap_storage, SHAP_DTYPE
+
+# Format export -> media type
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Kolom internal untuk menghitung driver SHAP (tidak ikut di-export)
+SHAP_COLUMNS = [Customer.shap_values_blob, Customer.shap_version, Customer.shap_values_json]
+
+
+def driver_names(top_k: int) -> list:
+    """Nama kolom driver: driver_1, driver_1_shap, driver_2, ..."""
+    names = []
+    for rank in range(1, top_k + 1):
+        names += [f"driver_{rank}", f"driver_{rank}_shap"]
+    return names
+
+
+def top_drivers(blobs: list, versions: list, jsons: list, top_k: int) -> tuple:
+    """
+    Top-k fitur dengan |SHAP| terbesar per baris (urut dari yang terbesar).
+    Baris blob dengan shap_version sama di-decode sebagai satu matrix, lalu
+    np.argpartition memilih k kolom tanpa sort penuh per baris.
+    Return (names, values): array (n_rows, top_k), None / NaN jika tidak ada SHAP.
+    """
+    n_rows = len(blobs)
+    names = np.full((n_rows, top_k), None, dtype=object)
+    values = np.full((n_rows, top_k), np.nan)
+
+    groups = {}
+    for index, (blob, version, legacy) in enumerate(zip(blobs, versions, jsons)):
+        if blob is not None:
+            groups.setdefault(version, []).append(index)
+        elif legacy is not None:
+            # Format lama {feature: value}: sedikit baris, cukup sort biasa
+            items = sorted(json.loads(legacy).items(), key=lambda kv: -abs(kv[1]))[:top_k]
+            for rank, (name, value) in enumerate(items):
+                names[index, rank] = name
+                values[index, rank] = value
+
+    for version, rows in groups.items():
+        try:
+            features = np.asarray(shap_storage.features(version), dtype=object)
+        except KeyError:
+            # shap_version tidak ada di shap_feature_set: driver dikosongkan
+            continue
+
+        matrix = np.frombuffer(
+            b"".join([blobs[index] for index in rows]), dtype=SHAP_DTYPE
+        ).reshape(len(rows), len(features))
+        k = min(top_k, len(features))
+
+        magnitude = np.abs(matrix)
+        top = np.argpartition(-magnitude, k - 1, axis=1)[:, :k]
+        # Urutkan k kandidat (bukan seluruh fitur) dari |SHAP| terbesar
+        order = np.argsort(-np.take_along_axis(magnitude, top, axis=1), axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+
+        names[rows, :k] = features[top]
+        values[rows, :k] = np.take_along_axis(matrix, top, axis=1)
+
+    return names, values
+
+
+def driver_columns(names: np.ndarray, values: np.ndarray) -> list:
+    """Kolom export driver_1, driver_1_shap, ... (list per kolom, None jika kosong)"""
+    columns = []
+    for rank in range(names.shape[1]):
+        shap = values[:, rank]
+        columns.append(names[:, rank].tolist())
+        columns.append(np.where(np.isnan(shap), None, np.round(shap, 6)).tolist())
+    return columns
+
+
+class _ChunkSink(io.RawIOBase):
+    """File-like tujuan ParquetWriter: byte ditampung lalu diambil per batch (drain)"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_schema(columns: list, top_k: int):
+    import pyarrow as pa
+
+    def arrow_type(column):
+        for sql_type, arrow in (
+            (Boolean, pa.bool_()),
+            (Integer, pa.int64()),
+            (Float, pa.float64()),
+            (DateTime, pa.timestamp("us")),
+        ):
+            if isinstance(column.type, sql_type):
+                return arrow
+        return pa.string()
+
+    fields = [(column.key, arrow_type(column)) for column in columns]
+    for rank in range(1, top_k + 1):
+        fields += [(f"driver_{rank}", pa.string()), (f"driver_{rank}_shap", pa.float32())]
+    return pa.schema(fields)
+
+
+class ExportService:
+    """
+    Export lead ter-filter sebagai CSV / Parquet secara streaming:
+    baris dibaca per batch dari DB (yield_per, server-side), driver SHAP top-k
+    dihitung per batch (vektor), lalu batch langsung dikirim ke client.
+    Memori sebesar satu batch, berapapun jumlah baris.
+    """
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+
+    def validate(self, fmt: str, fields: str = None, sort: str = "id_asc"):
+        """Cek parameter sebelum response streaming dimulai (error -> 400)"""
+        if fmt not in EXPORT_FORMATS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid format, pilih salah satu: {', '.join(EXPORT_FORMATS)}"
+            )
+        if fmt == "parquet":
+            try:
+                import pyarrow  # noqa: F401  pip install pyarrow
+            except ImportError:
+                raise HTTPException(status_code=400, detail="Export parquet butuh paket pyarrow")
+
+        columns = list_columns(fields) + [Customer.recommendation_script]
+        # Sort key divalidasi di sini (bukan di tengah stream)
+        apply_sort(select(Customer.id), sort)
+        return columns
+
+    def _batches(self, columns: list, filters: CustomerFilter, sort: str,
+                 limit: int, top_k: int):
+        """Per batch dari DB: list kolom (kolom export lalu driver_1, driver_1_shap, ...)"""
+        statement = apply_sort(apply_filters(select(*columns, *SHAP_COLUMNS), filters), sort)
+        if limit:
+            statement = statement.limit(limit)
+
+        n_columns = len(columns)
+        # Core (tanpa ORM) + yield_per: baris dibaca per batch dari cursor DB
+        with engine.connect() as connection:
+            result = connection.execution_options(yield_per=self.batch_size).execute(statement)
+            for rows in result.partitions():
+                with metrics.stage("export", rows=len(rows)):
+                    data = list(zip(*rows))
+                    if top_k:
+                        blobs, versions, jsons = data[n_columns:]
+                        data = data[:n_columns] + driver_columns(
+                            *top_drivers(blobs, versions, jsons, top_k)
+                        )
+                    else:
+                        data = data[:n_columns]
+                yield data
+
+    def _arrow_tables(self, schema, columns: list, filters: CustomerFilter, sort: str,
+                      limit: int, top_k: int):
+        """Batch DB sebagai pyarrow Table dengan schema tetap"""
+        import pyarrow as pa
+
+        for data in self._batches(columns, filters, sort, limit, top_k):
+            yield pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(data, schema)],
+                schema=schema
+            )
+
+    def stream_csv(self, columns: list, filters: CustomerFilter, sort: str,
+                   limit: int = None, top_k: int = 3):
+        """
+        CSV per batch. Dengan pyarrow: CSVWriter (C++, ~2x lebih cepat),
+        tanpa pyarrow: modul csv standar.
+        """
+        try:
+            import pyarrow.csv as pa_csv
+        except ImportError:
+            yield from self._stream_csv_plain(columns, filters, sort, limit, top_k)
+            return
+
+        schema = _arrow_schema(columns, top_k)
+        sink = _ChunkSink()
+        writer = pa_csv.CSVWriter(sink, schema)
+
+        try:
+            for table in self._arrow_tables(schema, columns, filters, sort, limit, top_k):
+                writer.write_table(table)
+                yield sink.drain()
+        finally:
+            writer.close()
+
+        # Header saja jika tidak ada baris
+        yield sink.drain()
+
+    def _stream_csv_plain(self, columns: list, filters: CustomerFilter, sort: str,
+                          limit: int, top_k: int):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([column.key for column in columns] + driver_names(top_k))
+
+        for data in self._batches(columns, filters, sort, limit, top_k):
+            writer.writerows(zip(*data))
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+        # Header saja jika tidak ada baris
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    def stream_parquet(self, columns: list, filters: CustomerFilter, sort: str,
+                       limit: int = None, top_k: int = 3):
+        """Satu row group Parquet per batch DB"""
+        import pyarrow.parquet as pq
+
+        schema = _arrow_schema(columns, top_k)
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema, compression="snappy")
+
+        try:
+            for table in self._arrow_tables(schema, columns, filters, sort, limit, top_k):
+                writer.write_table(table)
+                yield sink.drain()
+        finally:
+            writer.close()
+
+        # Footer Parquet
+        yield sink.drain()
+
+    def stream(self, fmt: str, columns: list, filters: CustomerFilter, sort: str,
+               limit: int = None, top_k: int = 3):
+        if fmt == "parquet":
+            return self.stream_parquet(columns, filters, sort, limit, top_k)
+        return self.stream_csv(columns, filters, sort, limit, top_k)
+
+
+# Singleton
+export_service = ExportService(batch_size=settings.EXPORT_BATCH_SIZE)
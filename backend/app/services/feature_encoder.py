@@ -0,0 +1,123 @@
+import numpy as np
+
+from app.models.customer import CustomerBase
+
+# Kolom turunan hasil feature engineering pdays (999 -> 0, lainnya -> 1)
+PDAYS_FEATURE = "pernah_dihubungi"
+PDAYS_NOT_CONTACTED = 999
+
+# Field kategorikal = field string di CustomerBase (job, marital, education, ...)
+CATEGORICAL_FIELDS = [
+    name for name, field in CustomerBase.model_fields.items()
+    if field.annotation is str
+]
+
+
+class FeatureEncoder:
+    """
+    Encoder fitur yang di-"compile" sekali dari model_features.json.
+
+    Setiap field mentah CustomerBase dipetakan langsung ke index kolom di matrix
+    NumPy (urutan sama dengan feature_columns), termasuk:
+    - rename underscore -> titik (emp_var_rate -> emp.var.rate)
+    - slot One-Hot (job_blue-collar, education_high.school, ...)
+    - pdays -> pernah_dihubungi
+
+    One-Hot mengikuti skema saat training (drop_first terhadap seluruh kategori):
+    slot bernilai 1 jika "<field>_<value>" ada di feature_columns. Hasilnya sama
+    dengan preprocess_data untuk batch yang memuat kategori referensinya.
+
+    Beda yang disengaja: untuk satu baris (POST /predict), get_dummies di
+    preprocess_data membuang satu-satunya level yang ada sehingga semua kolom
+    One-Hot 0; encoder tetap mengisi slot training, jadi skor satu lead sama
+    dengan skornya di dalam batch upload. Skor single-row lama bisa bergeser
+    (mis. 0.00044 -> 0.00030). Lihat tests/test_feature_encoder.py.
+    """
+
+    def __init__(self, feature_columns: list):
+        self.feature_columns = list(feature_columns)
+        self.n_features = len(self.feature_columns)
+
+        # (nama field mentah, nama alternatif, index kolom) untuk fitur numerik
+        self.numeric_slots = []
+        # field kategorikal -> {value: index kolom}
+        self.onehot_slots = {}
+        self.pdays_index = None
+
+        # Prefix terpanjang dicek duluan (day_of_week_ sebelum day_)
+        prefixes = sorted(CATEGORICAL_FIELDS, key=len, reverse=True)
+
+        for index, name in enumerate(self.feature_columns):
+            if name == PDAYS_FEATURE:
+                self.pdays_index = index
+                continue
+
+            field = next((p for p in prefixes if name.startswith(p + "_")), None)
+            if field is None:
+                # Model pakai titik (emp.var.rate), API/DB pakai underscore
+                self.numeric_slots.append((name.replace(".", "_"), name, index))
+                continue
+
+            value = name[len(field) + 1:]
+            slots = self.onehot_slots.setdefault(field, {})
+            slots[value] = index
+            # Value dengan titik kadang datang dengan underscore (high_school)
+            slots.setdefault(value.replace(".", "_"), index)
+
+    def _empty(self, n_rows: int) -> np.ndarray:
+        return np.zeros((n_rows, self.n_features), dtype=np.float32)
+
+    def encode_records(self, records: list) -> np.ndarray:
+        """Encode list of dict (mis. CustomerCreate.dict()) ke matrix (n, n_features)"""
+        matrix = self._empty(len(records))
+
+        for row, record in enumerate(records):
+            out = matrix[row]
+
+            for field, alias, index in self.numeric_slots:
+                value = record.get(field, record.get(alias))
+                if value is not None:
+                    out[index] = value
+
+            if self.pdays_index is not None:
+                pdays = record.get("pdays")
+                if pdays is not None:
+                    out[self.pdays_index] = 0 if pdays == PDAYS_NOT_CONTACTED else 1
+
+            for field, slots in self.onehot_slots.items():
+                index = slots.get(record.get(field))
+                if index is not None:
+                    out[index] = 1
+
+        return matrix
+
+    def encode_frame(self, df) -> np.ndarray:
+        """Encode DataFrame (kolom format API/DB) ke matrix (n, n_features), per kolom"""
+        matrix = self._empty(len(df))
+        columns = set(df.columns)
+
+        for field, alias, index in self.numeric_slots:
+            source = field if field in columns else alias if alias in columns else None
+            if source is not None:
+                matrix[:, index] = np.asarray(df[source], dtype=np.float32)
+
+        if self.pdays_index is not None and "pdays" in columns:
+            pdays = np.asarray(df["pdays"], dtype=np.float64)
+            matrix[:, self.pdays_index] = pdays != PDAYS_NOT_CONTACTED
+
+        for field, slots in self.onehot_slots.items():
+            if field not in columns:
+                continue
+            codes = np.fromiter(
+                (slots.get(value, -1) for value in df[field].to_numpy()),
+                dtype=np.int64,
+                count=len(df)
+            )
+            rows = np.nonzero(codes >= 0)[0]
+            matrix[rows, codes[rows]] = 1
+
+        return matrix
+
+    def encode_one(self, record: dict) -> np.ndarray:
+        """Shortcut untuk satu lead: matrix (1, n_features)"""
+        return self.encode_records([record])
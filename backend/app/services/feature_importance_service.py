@@ -0,0 +1,125 @@
+import numpy as np
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from app.models.feature_importance import (
+    FeatureImportance,
+    FeatureImportanceRead,
+    LABEL_ALL
+)
+from app.services.shap_storage import shap_storage
+
+_table = FeatureImportance.__table__
+
+
+def _insert(session: Session):
+    """INSERT dengan ON CONFLICT sesuai dialect DB (SQLite / PostgreSQL)"""
+    dialect = session.get_bind().dialect.name
+    return (postgresql if dialect == "postgresql" else sqlite).insert(_table)
+
+
+class FeatureImportanceService:
+    """
+    Menjaga tabel feature_importance (sum, sum |x|, count per fitur & label).
+    apply() dipanggil di transaksi yang sama dengan penyimpanan hasil SHAP,
+    jadi query "top drivers" cukup O(features), tidak perlu parse JSON per lead.
+    Write berupa satu upsert per key (tanpa SELECT / lock di proses), jadi aman
+    untuk beberapa thread & worker sekaligus.
+    """
+
+    def seed(self, session: Session, feature_columns: list, labels: list):
+        """Dipanggil saat startup supaya baris agregat sudah ada sebelum ada write"""
+        statement = _insert(session).on_conflict_do_nothing(
+            index_elements=["feature", "prediction_label"]
+        )
+        session.connection().execute(statement, [
+            {"feature": feature, "prediction_label": label, "shap_sum": 0.0, "shap_abs_sum": 0.0, "count": 0}
+            for label in labels for feature in feature_columns
+        ])
+        session.commit()
+
+    def apply(self, session: Session, predictions: list, sign: int = 1):
+        """
+        Tambahkan kontribusi SHAP dari predictions (hasil predict_and_explain*)
+        ke agregat. Urutan fitur diambil dari shap_version tiap prediksi, jadi
+        batch yang di-score sebelum/sesudah swap model tetap benar.
+        sign=-1: kurangi (SHAP lama lead yang di-rescore).
+        Commit dilakukan oleh pemanggil.
+        """
+        groups = {}
+        for prediction in predictions:
+            if prediction and prediction.get("shap_values") is not None:
+                key = (prediction["shap_version"], prediction["label"])
+                groups.setdefault(key, []).append(prediction["shap_values"])
+
+        if not groups:
+            return
+
+        # shap_version -> {label: (sum, sum |x|, count)}
+        deltas = {}
+        for (version, label), rows in groups.items():
+            matrix = np.asarray(rows, dtype=np.float64)
+            deltas.setdefault(version, {})[label] = (
+                sign * matrix.sum(axis=0), sign * np.abs(matrix).sum(axis=0), sign * len(rows)
+            )
+
+        params = []
+        for version, by_label in deltas.items():
+            feature_columns = shap_storage.features(version)
+
+            # Baris ALL = jumlah semua label
+            by_label[LABEL_ALL] = (
+                sum(d[0] for d in by_label.values()),
+                sum(d[1] for d in by_label.values()),
+                sum(d[2] for d in by_label.values())
+            )
+
+            params.extend(
+                {
+                    "feature": feature,
+                    "prediction_label": label,
+                    "shap_sum": float(shap_sum[index]),
+                    "shap_abs_sum": float(shap_abs_sum[index]),
+                    "count": count
+                }
+                for label, (shap_sum, shap_abs_sum, count) in by_label.items()
+                for index, feature in enumerate(feature_columns)
+            )
+
+        # INSERT ... ON CONFLICT DO UPDATE SET x = x + delta (atomic di DB):
+        # baris baru dibuat bila belum ada, tanpa SELECT lebih dulu
+        statement = _insert(session)
+        statement = statement.on_conflict_do_update(
+            index_elements=["feature", "prediction_label"],
+            set_={
+                "shap_sum": _table.c.shap_sum + statement.excluded.shap_sum,
+                "shap_abs_sum": _table.c.shap_abs_sum + statement.excluded.shap_abs_sum,
+                "count": _table.c.count + statement.excluded.count
+            }
+        )
+        session.connection().execute(statement, params)
+
+    def top_features(self, session: Session, label: str = LABEL_ALL, limit: int = 10) -> list:
+        """Fitur dengan rata-rata |SHAP| terbesar untuk label tertentu"""
+        rows = session.exec(
+            select(FeatureImportance)
+            .where(FeatureImportance.prediction_label == label)
+            .where(FeatureImportance.count > 0)
+        ).all()
+
+        items = [
+            FeatureImportanceRead(
+                feature=row.feature,
+                prediction_label=row.prediction_label,
+                count=row.count,
+                mean_shap=row.shap_sum / row.count,
+                mean_abs_shap=row.shap_abs_sum / row.count
+            )
+            for row in rows
+        ]
+        items.sort(key=lambda item: item.mean_abs_shap, reverse=True)
+        return items[:limit]
+
+
+# Singleton
+feature_importance_service = FeatureImportanceService()
@@ -0,0 +1,81 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, or_, update
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.models.job import JOB_QUEUED, JOB_RUNNING
+
+# Identitas proses ini sebagai pemilik lease (unik per start, juga antar host)
+OWNER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaseLostError(RuntimeError):
+    """Job sudah diklaim worker lain (lease kedaluwarsa), proses ini harus berhenti"""
+
+
+def _stale_before(now: datetime) -> datetime:
+    return now - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+
+
+def claim(session: Session, model, job_id: int) -> bool:
+    """
+    Klaim atomik: satu UPDATE bersyarat, hanya berhasil jika job masih QUEUED
+    atau RUNNING dengan heartbeat kedaluwarsa (pemilik lama mati). Dengan
+    beberapa worker/proses hanya satu yang mendapat rowcount 1.
+    Dipakai sebagai write di write_with_retry (commit oleh pemanggil).
+    """
+    now = datetime.utcnow()
+    table = model.__table__
+    statement = (
+        update(table)
+        .where(
+            table.c.id == job_id,
+            or_(
+                table.c.status == JOB_QUEUED,
+                (table.c.status == JOB_RUNNING) & or_(
+                    table.c.heartbeat_at.is_(None),
+                    table.c.heartbeat_at < _stale_before(now)
+                )
+            )
+        )
+        .values(
+            status=JOB_RUNNING,
+            owner=OWNER_ID,
+            heartbeat_at=now,
+            started_at=func.coalesce(table.c.started_at, now)
+        )
+    )
+    return session.connection().execute(statement).rowcount == 1
+
+
+def renew(session: Session, model, job_id: int):
+    """
+    Perbarui heartbeat di transaksi chunk yang sedang berjalan. Jika job bukan
+    milik proses ini lagi, LeaseLostError (transaksi harus di-rollback).
+    """
+    table = model.__table__
+    statement = (
+        update(table)
+        .where(
+            table.c.id == job_id,
+            table.c.status == JOB_RUNNING,
+            table.c.owner == OWNER_ID
+        )
+        .values(heartbeat_at=datetime.utcnow())
+    )
+    if session.connection().execute(statement).rowcount != 1:
+        raise LeaseLostError(f"Job {job_id} was claimed by another worker")
+
+
+def expires_in(job) -> Optional[float]:
+    """Detik sampai lease job RUNNING kedaluwarsa (None = bisa langsung diklaim)"""
+    if job.status != JOB_RUNNING or job.heartbeat_at is None:
+        return None
+    remaining = (job.heartbeat_at - _stale_before(datetime.utcnow())).total_seconds()
+    return remaining if remaining > 0 else None
+
@@ -0,0 +1,242 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.db.session import engine
+from app.models.job import (
+    UploadJob,
+    UploadJobRead,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_COMPLETED,
+    JOB_FAILED
+)
+from app.db.session import write_with_retry, is_lock_error
+from app.services import job_lease
+from app.services.job_lease import LeaseLostError
+from app.services.upload_service import iter_csv_chunks, score_chunk, save_chunk
+from app.services.upload_validation import ErrorReport
+from app.services.explain_service import is_lazy, prewarm_top_leads
+from app.services.analytics_service import analytics_service
+from app.services.shadow_service import shadow_service
+from app.services.scoring_executor import ScoringBusyError
+
+
+class JobService:
+    """
+    Background job untuk upload CSV besar.
+    - File upload disalin ke UPLOAD_DIR, job dicatat di DB (status QUEUED)
+    - Worker pool lokal (thread) memproses file per chunk
+    - Progress di-commit bersama data tiap chunk, jadi setelah restart job
+      bisa dilanjutkan dari baris terakhir (resume_pending_jobs)
+    - Job yang antre/berjalan dibatasi max_pending (upload baru -> 429)
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="upload-job"
+        )
+        self.max_pending = max_pending
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise ScoringBusyError("Upload queue is full, retry later")
+            self.pending += 1
+
+    def _release(self):
+        with self._lock:
+            self.pending -= 1
+
+    def _enqueue(self, job_id: int):
+        self.executor.submit(self._run_and_release, job_id)
+
+    def _run_and_release(self, job_id: int):
+        try:
+            # DB terkunci terlalu lama: job kembali QUEUED lalu dicoba lagi
+            for attempt in range(settings.DB_LOCK_RETRIES + 1):
+                if not self.run_job(job_id):
+                    break
+                time.sleep(settings.DB_LOCK_RETRY_DELAY * 2 ** attempt)
+        finally:
+            self._release()
+
+    def submit_upload(self, session: Session, filename: str, fileobj) -> UploadJob:
+        """Simpan file upload ke disk, buat job QUEUED, lalu antrekan ke worker"""
+        # Cek kapasitas dulu, sebelum file disalin
+        self._reserve()
+        try:
+            os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+            file_path = os.path.join(settings.UPLOAD_DIR, f"{uuid.uuid4().hex}.csv")
+
+            # Salin streaming dari spooled upload (tidak dibaca ke memori sekaligus)
+            fileobj.seek(0)
+            with open(file_path, "wb") as out:
+                shutil.copyfileobj(fileobj, out)
+
+            job = UploadJob(filename=filename, file_path=file_path)
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+        except Exception:
+            self._release()
+            raise
+
+        self._enqueue(job.id)
+        return job
+
+    def run_job(self, job_id: int) -> bool:
+        """
+        Proses (atau lanjutkan) job. Return True jika job dikembalikan ke
+        QUEUED karena database terkunci (boleh dicoba lagi).
+        Job diklaim atomik dulu (job_lease): worker/proses lain yang mencoba
+        job yang sama mendapat klaim gagal dan langsung berhenti.
+        """
+        with Session(engine) as session:
+            if not write_with_retry(session, lambda s: job_lease.claim(s, UploadJob, job_id)):
+                return False
+            job = session.get(UploadJob, job_id)
+
+            def save(session: Session, result: dict):
+                # Data chunk + progress job + heartbeat dalam satu transaksi pendek
+                job_lease.renew(session, UploadJob, job_id)
+                save_chunk(session, result)
+                job.rows_done += result["processed"]
+                job.rows_failed += result["failed"]
+                job.potential += result["potential"]
+                if job.sample_error is None:
+                    job.sample_error = result["sample_error"]
+                job.error_report_id = report.reserve(result["error_report"])
+                session.add(job)
+
+            status, error = JOB_COMPLETED, None
+            try:
+                # Resume: lewati baris yang sudah tercatat di job
+                skip_rows = job.rows_done + job.rows_failed
+                report = ErrorReport(job.error_report_id)
+
+                with open(job.file_path, "rb") as f:
+                    for chunk in iter_csv_chunks(f, skip_rows=skip_rows):
+                        # Validasi + scoring di luar transaksi write
+                        result = score_chunk(chunk)
+
+                        write_with_retry(
+                            session, lambda s: save(s, result), rows=result["processed"]
+                        )
+                        # Baris gagal ditulis setelah commit (retry tidak menduplikasi)
+                        report.write(result["error_report"])
+                        analytics_service.invalidate()
+                        if result["shadow_batch"]:
+                            shadow_service.submit(*result["shadow_batch"])
+
+            except LeaseLostError as e:
+                # Lease kedaluwarsa dan job sudah dilanjutkan worker lain
+                session.rollback()
+                print(f"⚠️ Upload job {job_id} stopped: {e}")
+                return False
+            except Exception as e:
+                session.rollback()
+                if is_lock_error(e):
+                    # Bukan kegagalan data: chunk terakhir tidak ter-commit,
+                    # job dilanjutkan dari checkpoint pada percobaan berikutnya
+                    print(f"⚠️ Upload job {job_id} requeued, database busy: {e}")
+                    status, error = JOB_QUEUED, f"Database busy, job will be retried: {e.orig}"
+                else:
+                    print(f"❌ Upload job {job_id} failed: {e}")
+                    status, error = JOB_FAILED, str(e)
+
+            def finish(session: Session):
+                # Diset di dalam write: rollback (retry) mengembalikan atribut job
+                job_lease.renew(session, UploadJob, job_id)
+                job.status = status
+                job.error = error
+                if status != JOB_QUEUED:
+                    job.finished_at = datetime.utcnow()
+                session.add(job)
+
+            try:
+                write_with_retry(session, finish)
+            except LeaseLostError as e:
+                session.rollback()
+                print(f"⚠️ Upload job {job_id} stopped: {e}")
+                return False
+
+            if status in (JOB_COMPLETED, JOB_FAILED) and os.path.exists(job.file_path):
+                os.remove(job.file_path)
+
+        if status == JOB_COMPLETED:
+            self.schedule_prewarm()
+        return status == JOB_QUEUED
+
+    def schedule_prewarm(self):
+        """Mode lazy: prewarm SHAP untuk top-N lead di background"""
+        if is_lazy():
+            self.executor.submit(prewarm_top_leads)
+
+    def _resume(self, job_id: int):
+        # Job lama tetap dilanjutkan walau melebihi max_pending
+        with self._lock:
+            self.pending += 1
+        self._enqueue(job_id)
+
+    def resume_pending_jobs(self):
+        """
+        Dipanggil saat startup: lanjutkan job QUEUED/RUNNING dari proses
+        sebelumnya. Aman dijalankan oleh beberapa worker sekaligus: tiap job
+        hanya berjalan di worker yang berhasil mengklaimnya. Job RUNNING yang
+        lease-nya masih aktif dicoba lagi setelah lease habis; jika pemiliknya
+        masih hidup (heartbeat jalan) klaim gagal dan job dibiarkan.
+        """
+        with Session(engine) as session:
+            statement = select(UploadJob).where(
+                UploadJob.status.in_([JOB_QUEUED, JOB_RUNNING])
+            )
+            pending = session.exec(statement).all()
+
+            for job in pending:
+                if not os.path.exists(job.file_path):
+                    job.status = JOB_FAILED
+                    job.error = "Upload file missing, job cannot be resumed"
+                    job.finished_at = datetime.utcnow()
+                    session.add(job)
+                    continue
+
+                delay = job_lease.expires_in(job)
+                if delay is None:
+                    self._resume(job.id)
+                else:
+                    timer = threading.Timer(delay + 1, self._resume, args=(job.id,))
+                    timer.daemon = True
+                    timer.start()
+
+            session.commit()
+
+    def to_read(self, job: UploadJob) -> UploadJobRead:
+        """UploadJob -> UploadJobRead (+ throughput baris/detik)"""
+        throughput = None
+        if job.started_at:
+            end = job.finished_at or datetime.utcnow()
+            elapsed = (end - job.started_at).total_seconds()
+            if elapsed > 0:
+                throughput = (job.rows_done + job.rows_failed) / elapsed
+
+        return UploadJobRead.model_validate(job, update={"throughput": throughput})
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton
+job_service = JobService(
+    max_workers=settings.JOB_WORKERS,
+    max_pending=settings.MAX_PENDING_JOBS
+)
@@ -1,48 +1,258 @@
-import pandas as pd
-import pickle
 import json
 import os
-import shap  # pip install shap
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.model_registry import (
+    MODEL_NAME,
+    MODEL_EXTENSIONS,
+    ModelBundle,
+    ModelRegistry
+)
+from app.services.prediction_cache import PredictionCache
+
+# pandas, shap & xgboost di-import saat dibutuhkan (bukan saat import modul),
+# supaya worker API bisa start dan melayani request ringan dengan cepat.
+
+# Status load artifacts (dilaporkan lewat GET /model/status)
+STATUS_NOT_LOADED = "not_loaded"
+STATUS_LOADING = "loading"
+STATUS_READY = "ready"
+STATUS_ERROR = "error"
+
+# Bundle lama di-shutdown setelah jeda ini (request yang masih memakainya selesai dulu)
+RETIRE_GRACE_SECONDS = 60
+# Versi lama (bukan aktif / shadow) yang disimpan untuk explain lead lama
+ARCHIVED_BUNDLE_LIMIT = 2
 
 class MLService:
     def __init__(self):
-        self.model = None
-        self.feature_columns = None
-        self.explainer = None
+        # Model aktif & kandidat shadow (ModelBundle). Swap = ganti referensi,
+        # request yang sedang berjalan tetap memakai bundle yang diambilnya.
+        self.active = None
+        self.shadow = None
+        # LRU cache hasil prediksi (key: baris fitur ter-encode + versi model)
+        self.cache = PredictionCache(max_size=settings.PREDICTION_CACHE_SIZE)
 
         self.base_path = os.path.dirname(os.path.abspath(__file__))
-        self.artifacts_path = os.path.join(self.base_path, "../../ml_artifacts")
-
-        self.load_artifacts()
+        self.artifacts_path = settings.ML_ARTIFACTS_DIR or os.path.join(self.base_path, "../../ml_artifacts")
+        self.registry = ModelRegistry(self.artifacts_path)
+
+        # Lazy init: artifacts di-load pada pemakaian pertama (ensure_loaded)
+        self.status = STATUS_NOT_LOADED
+        self.load_error = None
+        self.load_seconds = None
+        self._load_lock = threading.Lock()
+        # Swap model (activate / set_shadow) satu per satu
+        self._swap_lock = threading.Lock()
+        # versi -> ModelBundle versi lama (LRU, lihat bundle_for)
+        self._archived = OrderedDict()
+        self._archive_lock = threading.Lock()
+
+    # --- Atribut model aktif (kompatibel dengan pemakaian lama) ---
+
+    @property
+    def model(self):
+        return self.active.model if self.active else None
+
+    @property
+    def feature_columns(self):
+        return self.active.feature_columns if self.active else None
+
+    @property
+    def encoder(self):
+        return self.active.encoder if self.active else None
+
+    @property
+    def feature_version(self):
+        return self.active.feature_version if self.active else None
+
+    @property
+    def model_version(self):
+        return self.active.version if self.active else None
+
+    @property
+    def model_path(self):
+        return self.active.model_path if self.active else None
+
+    @property
+    def explainer(self):
+        return self.active.explainer if self.active else None
+
+    @property
+    def explain_engine(self):
+        return self.active.explain_engine if self.active else None
+
+    def ensure_loaded(self) -> bool:
+        """Load model + feature list sekali (thread-safe). True jika siap dipakai"""
+        if self.status == STATUS_READY:
+            return True
+
+        with self._load_lock:
+            if self.status != STATUS_READY:
+                self.load_artifacts()
+
+        return self.status == STATUS_READY
+
+    def ensure_explainer(self, bundle: ModelBundle) -> bool:
+        """Buat SHAP TreeExplainer + engine bundle pada panggilan explain pertama"""
+        try:
+            return bundle.ensure_explainer()
+        except Exception as e:
+            print(f"❌ Error initializing SHAP explainer: {e}")
+            self.load_error = f"SHAP explainer: {e}"
+            return False
 
     def load_artifacts(self):
-        """Load model, feature list, dan inisialisasi SHAP"""
+        """Load model aktif (+ shadow bila dikonfigurasi). Error dicatat di status/load_error"""
+        self.status = STATUS_LOADING
+        self.load_error = None
+        started = time.perf_counter()
+
         try:
-            # 1. Load Model
-            model_path = os.path.join(self.artifacts_path, "xgboost_tuned_v2.pkl")
-            with open(model_path, "rb") as f:
-                self.model = pickle.load(f)
+            bundle = self.registry.load(settings.MODEL_VERSION or MODEL_NAME)
+            self._swap_active(bundle)
+            self.status = STATUS_READY
+            print(f"✅ ML Artifacts loaded: {bundle.version} ({len(bundle.feature_columns)} features)")
 
-            # 2. Load feature columns
-            features_path = os.path.join(self.artifacts_path, "model_features.json")
-            with open(features_path, "r") as f:
-                self.feature_columns = json.load(f)
+        except Exception as e:
+            self.status = STATUS_ERROR
+            self.load_error = str(e)
+            print(f"❌ Error loading ML artifacts: {e}")
 
-            # NOTE: jangan ubah format nama fitur di sini — model disimpan dengan nama fitur
-            # yang sama seperti saat pelatihan (mengandung titik). Biarkan self.feature_columns
-            # seperti di model_features.json supaya reindex menghasilkan kolom yang cocok
-            # dengan model.
+        self.load_seconds = time.perf_counter() - started
 
-            # 3. Init SHAP Explainer (sekali saja)
-            self.explainer = shap.TreeExplainer(self.model)
+        if self.status == STATUS_READY and settings.SHADOW_MODEL_VERSION:
+            try:
+                self.set_shadow(settings.SHADOW_MODEL_VERSION)
+            except Exception as e:
+                print(f"⚠️ Shadow model not loaded: {e}")
 
-            print(f"✅ ML Artifacts loaded ({len(self.feature_columns)} features)")
-            print("✅ SHAP Explainer initialized")
+    def activate(self, version: str) -> ModelBundle:
+        """
+        Hot swap model aktif. Versi baru di-load penuh dulu (request tetap
+        dilayani model lama), lalu referensi diganti sekaligus.
+        KeyError jika versi tidak ada, error load lain diteruskan.
+        """
+        started = time.perf_counter()
+        shadow = self.shadow
+        # Promote shadow: bundle (dan explainer-nya) dipakai ulang
+        if shadow is not None and shadow.version == version:
+            bundle = shadow
+        else:
+            bundle = self.registry.load(version)
+
+        with self._swap_lock:
+            self._swap_active(bundle)
+            # Versi yang sekarang aktif tidak perlu di-shadow lagi
+            if self.shadow and self.shadow.version == version:
+                self.shadow = None
+
+        self.status = STATUS_READY
+        self.load_error = None
+        self.load_seconds = time.perf_counter() - started
+        print(f"🔁 Active model switched to {version}")
+        return bundle
+
+    def _swap_active(self, bundle: ModelBundle):
+        previous = self.active
+        self.active = bundle
+        # Hasil model lama tidak berlaku lagi (key cache memakai nama versi,
+        # jadi reload versi yang sama juga harus mengosongkan cache)
+        self.cache.clear()
+        if previous is not None and previous is not self.shadow:
+            self._retire(previous)
+
+    def set_shadow(self, version: str = None):
+        """Aktifkan model kandidat untuk shadow scoring (None = matikan)"""
+        bundle = self.registry.load(version) if version else None
+
+        with self._swap_lock:
+            previous = self.shadow
+            self.shadow = bundle
+
+        if previous is not None and previous is not self.active:
+            self._retire(previous)
+        return bundle
+
+    def _retire(self, bundle: ModelBundle):
+        """Shutdown pool SHAP bundle lama setelah request yang memakainya selesai"""
+        timer = threading.Timer(RETIRE_GRACE_SECONDS, bundle.shutdown)
+        timer.daemon = True
+        timer.start()
+
+    def bundle_for(self, version: str) -> ModelBundle:
+        """
+        Bundle versi tertentu, untuk explain lead dengan model yang men-score-nya.
+        Versi aktif / shadow dipakai langsung; versi lama di-load dari registry
+        dan disimpan (maksimal ARCHIVED_BUNDLE_LIMIT, LRU).
+        KeyError jika versi sudah tidak ada di ml_artifacts.
+        """
+        for bundle in (self.active, self.shadow):
+            if bundle is not None and bundle.version == version:
+                return bundle
+
+        with self._archive_lock:
+            bundle = self._archived.get(version)
+            if bundle is not None:
+                self._archived.move_to_end(version)
+                return bundle
+
+            bundle = self.registry.load(version)
+            self._archived[version] = bundle
+            while len(self._archived) > ARCHIVED_BUNDLE_LIMIT:
+                _, oldest = self._archived.popitem(last=False)
+                self._retire(oldest)
+            print(f"📦 Archived model {version} loaded for explanations")
+        return bundle
+
+    def shutdown(self):
+        for bundle in (self.active, self.shadow, *self._archived.values()):
+            if bundle is not None:
+                bundle.shutdown()
+
+    def export_native_model(self, fmt: str = "ubjson") -> str:
+        """Simpan model aktif ke format native XGBoost (.ubj / .json) di samping file aslinya"""
+        if not self.ensure_loaded():
+            raise RuntimeError(self.load_error or "ML artifacts not loaded")
+
+        bundle = self.active
+        path = os.path.splitext(bundle.model_path)[0] + MODEL_EXTENSIONS[fmt]
+        bundle.model.save_model(path)
+        return path
+
+    def shadow_scores(self, bundle: ModelBundle, records: list) -> list:
+        """Skor model shadow untuk list of dict (tanpa cache, tanpa SHAP)"""
+        with metrics.stage("shadow_predict", rows=len(records)):
+            X = bundle.encoder.encode_records(records)
+            return [float(p) for p in bundle.predict_scores(X)]
+
+    def state(self) -> dict:
+        """Status load untuk readiness endpoint"""
+        bundle = self.active
+        return {
+            "status": self.status,
+            "ready": self.status == STATUS_READY,
+            "error": self.load_error,
+            "model_version": bundle.version if bundle else None,
+            "model_path": bundle.model_path if bundle else None,
+            "model_format": settings.MODEL_FORMAT,
+            "n_features": len(bundle.feature_columns) if bundle else None,
+            "explainer_ready": bool(bundle and bundle.explainer is not None),
+            "shadow_model_version": self.shadow.version if self.shadow else None,
+            "load_seconds": self.load_seconds
+        }
 
-        except Exception as e:
-            print(f"❌ Error loading ML artifacts: {e}")
+    def preprocess_data(self, input_df: "pd.DataFrame") -> "pd.DataFrame":
+        """
+        Preprocessing versi pandas (referensi). Jalur prediksi memakai
+        self.encoder (FeatureEncoder) yang menghasilkan matrix yang sama.
+        """
+        import pandas as pd
 
-    def preprocess_data(self, input_df: pd.DataFrame) -> pd.DataFrame:
         df = input_df.copy()
 
         # --- A. Drop Duration (Anti Data Leakage) ---
@@ -97,118 +307,237 @@ class MLService:
 
     def predict(self, input_data: dict):
         """
-        PREDICT SAJA (TIDAK DIUBAH, backward compatible)
+        Skor + label satu lead (tanpa SHAP / script):
+        - Model di-load saat pertama dipakai (ensure_loaded); gagal load -> None
+        - Encode satu baris dengan compiled encoder (tanpa pandas)
+        - Skor diambil dari prediction cache bila input yang sama pernah
+          di-score model versi ini
+        - Error scoring -> None (dicatat di log)
         """
-        if not self.model:
+        if not self.ensure_loaded():
             return None
 
-        df = pd.DataFrame([input_data])
-        df_processed = self.preprocess_data(df)
+        bundle = self.active
+        with metrics.stage("preprocess", rows=1):
+            X = bundle.encoder.encode_one(input_data)
 
         try:
-            prob = self.model.predict_proba(df_processed)[0][1]
-            label = "Potential" if prob > 0.5 else "Non-Potential"
-
-            return {
-                "score": float(prob),
-                "label": label
-            }
+            return self._score_matrix(bundle, X)[0]
 
         except Exception as e:
             print(f"Prediction Error: {e}")
             return None
 
+    def predict_batch(self, input_df: "pd.DataFrame") -> list:
+        """
+        Versi batch dari predict: skor + label saja (tanpa SHAP / script).
+        Dipakai saat EXPLAIN_MODE=lazy.
+        """
+        if not self.ensure_loaded():
+            return [None] * len(input_df)
+
+        if input_df.empty:
+            return []
+
+        bundle = self.active
+        with metrics.stage("preprocess", rows=len(input_df)):
+            X = bundle.encoder.encode_frame(input_df)
+        return self._score_matrix(bundle, X)
+
+    def predict_records(self, records: list) -> list:
+        """Versi list of dict dari predict_batch (dipakai micro-batching /predict)"""
+        if not self.ensure_loaded():
+            return [None] * len(records)
+
+        if not records:
+            return []
+
+        bundle = self.active
+        with metrics.stage("preprocess", rows=len(records)):
+            X = bundle.encoder.encode_records(records)
+        return self._score_matrix(bundle, X)
+
+    def _score_matrix(self, bundle: ModelBundle, X) -> list:
+        """
+        Skor + label untuk matrix fitur. Baris yang sudah ada di cache tidak
+        di-predict ulang; hanya baris unik yang miss yang masuk predict_proba.
+        """
+        keys = self.cache.keys_for(X, bundle.version)
+        entries = [self.cache.get(key) for key in keys]
+
+        # Baris miss, duplikat di dalam batch cukup dihitung sekali
+        pending = {}
+        for index, (key, entry) in enumerate(zip(keys, entries)):
+            if entry is None:
+                pending.setdefault(key, index)
+
+        if pending:
+            rows = list(pending.values())
+            with metrics.stage("predict", rows=len(rows)):
+                probs = bundle.predict_scores(X[rows])
+            for key, prob in zip(pending, probs):
+                entry = {
+                    "score": float(prob),
+                    "label": "Potential" if prob > 0.5 else "Non-Potential",
+                    "shap_values": None,
+                    "script": None
+                }
+                self.cache.put(key, entry)
+                pending[key] = entry
+
+            entries = [entry or pending[key] for key, entry in zip(keys, entries)]
+
+        return [
+            {"score": e["score"], "label": e["label"], "model_version": bundle.version}
+            for e in entries
+        ]
+
     # ==============================
     # === BAGIAN BARU (REVISI) ===
     # ==============================
 
     def generate_recommendation(self, row_data: dict, top_features: list) -> str:
         """
-        Rule-Based Recommendation Script berbasis SHAP
-        """
-        script = "Halo Bapak/Ibu, "
-
-        top_feature_name = top_features[0][0]
-
-        if "euribor3m" in top_feature_name:
-            script += (
-                "saat ini kondisi suku bunga pasar sedang sangat mendukung. "
-                "Ini momen tepat untuk mengunci nilai deposito Anda."
-            )
-        elif "nr_employed" in top_feature_name:
-            script += (
-                "melihat kondisi ekonomi yang sedang aktif, "
-                "kami memiliki penawaran investasi yang aman."
-            )
-        elif "contact" in top_feature_name:
-            script += (
-                "kami menghubungi melalui seluler karena ada kemudahan "
-                "akses prioritas untuk Anda."
-            )
-        elif "poutcome_success" in top_feature_name:
-            script += (
-                "terima kasih atas kepercayaan Anda sebelumnya. "
-                "Kami memiliki penawaran eksklusif lanjutan."
-            )
-        else:
-            script += (
-                "kami melihat profil finansial Anda sangat cocok "
-                "untuk program Deposito Berjangka premium kami."
-            )
-
-        script += " Apakah boleh saya jelaskan simulasinya sebentar?"
-        return script
-
-    def predict_and_explain(self, input_data: dict):
+        Rule-Based Recommendation Script berbasis SHAP (top_features: [(nama, nilai)]).
+        Rule ada di app/services/recommendation.py (bisa diganti lewat
+        RECOMMENDATION_RULES_PATH); jalur batch memakai RuleTable.scripts_for.
+        """
+        if not self.ensure_loaded():
+            return None
+        return self.active.rules.script_for(top_features[0][0])
+
+    def reload_rules(self) -> dict:
+        """Compile ulang rule rekomendasi (file RECOMMENDATION_RULES_PATH) tanpa reload model"""
+        for bundle in (self.active, self.shadow):
+            if bundle is not None:
+                bundle.load_rules()
+        # Script di cache dibuat dengan rule lama
+        self.cache.clear()
+        return self.active.rules.summary() if self.active else {}
+
+    def predict_and_explain(self, input_data: dict, model_version: str = None):
         """
         SUPER FUNCTION:
         - Prediksi
         - SHAP Explainability
         - Recommendation Script
+        model_version: explain dengan versi model tertentu (bundle_for,
+        KeyError jika versi tidak ada lagi); None = model aktif.
         """
-        if not self.model or not self.explainer:
+        if not self.ensure_loaded():
+            return None
+        bundle = self.bundle_for(model_version) if model_version else self.active
+        if not self.ensure_explainer(bundle):
             return None
 
-        # 1. Preprocess
-        df = pd.DataFrame([input_data])
-        df_processed = self.preprocess_data(df)
-
-        # 2. Predict
-        prob = self.model.predict_proba(df_processed)[0][1]
-        label = "Potential" if prob > 0.5 else "Non-Potential"
-
-        # 3. SHAP values
-        shap_values = self.explainer.shap_values(df_processed)
-
-        feature_importance = dict(
-            zip(df_processed.columns, shap_values[0])
-        )
-
-        # Urutkan kontribusi positif
-        sorted_features = sorted(
-            feature_importance.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
-
-        top_3_positive = [f for f in sorted_features if f[1] > 0][:3]
+        # 1. Encode (compiled encoder, tanpa pandas)
+        with metrics.stage("preprocess", rows=1):
+            X = bundle.encoder.encode_one(input_data)
 
-        # 4. Generate script
-        script = self.generate_recommendation(
-            input_data,
-            top_3_positive if top_3_positive else [("general", 0)]
+        # 2-4. Predict + SHAP + script (atau langsung dari cache)
+        result = self._explain_matrix(bundle, X)[0]
+        result["shap_json"] = json.dumps(
+            {k: float(v) for k, v in zip(bundle.feature_columns, result["shap_values"])}
         )
+        return result
 
+    def _build_explanation(self, bundle: ModelBundle, prob, label: str, shap_row, script: str) -> dict:
+        """
+        Susun hasil akhir (skor, label, vektor SHAP, script) untuk satu baris.
+        Format simpan SHAP (JSON / blob) ditentukan oleh shap_storage.
+        """
         return {
-    "score": float(prob),
-    "label": label,
-    "shap_json": json.dumps(
-        {k: float(v) for k, v in feature_importance.items()}
-    ),
-    "script": script
-}
-
+            "score": float(prob),
+            "label": label,
+            "script": script,
+            # Vektor SHAP mentah (urutan feature_columns) + versi daftar fitur
+            "shap_values": shap_row,
+            "shap_version": bundle.feature_version,
+            "model_version": bundle.version
+        }
 
+    def predict_and_explain_batch(self, input_df: "pd.DataFrame") -> list:
+        """
+        Versi batch dari predict_and_explain (untuk upload CSV):
+        - encode seluruh DataFrame sekali (compiled encoder)
+        - satu kali predict_proba untuk semua baris
+        - SHAP lewat explain_engine (dibagi per shard ke worker process bila aktif)
+        Return: list hasil dengan urutan sama seperti baris input_df
+        """
+        if not self.ensure_loaded():
+            return [None] * len(input_df)
+        bundle = self.active
+        if not self.ensure_explainer(bundle):
+            return [None] * len(input_df)
+
+        if input_df.empty:
+            return []
+
+        # 1. Encode (sekali untuk seluruh frame)
+        with metrics.stage("preprocess", rows=len(input_df)):
+            X = bundle.encoder.encode_frame(input_df)
+
+        # 2-4. Predict + SHAP + script untuk baris yang tidak ada di cache
+        return self._explain_matrix(bundle, X)
+
+    def predict_and_explain_records(self, records: list) -> list:
+        """Versi list of dict dari predict_and_explain_batch (micro-batching /predict)"""
+        if not self.ensure_loaded():
+            return [None] * len(records)
+        bundle = self.active
+        if not self.ensure_explainer(bundle):
+            return [None] * len(records)
+
+        if not records:
+            return []
+
+        with metrics.stage("preprocess", rows=len(records)):
+            X = bundle.encoder.encode_records(records)
+        return self._explain_matrix(bundle, X)
+
+    def _explain_matrix(self, bundle: ModelBundle, X) -> list:
+        """
+        Skor + SHAP + script untuk matrix fitur. Baris yang sudah lengkap di
+        cache dilewati; sisanya (unik) diproses dengan satu predict, satu
+        panggilan explain_engine dan satu lookup rule table.
+        """
+        keys = self.cache.keys_for(X, bundle.version)
+        entries = [self.cache.get(key, need_shap=True) for key in keys]
+
+        # Baris miss, duplikat di dalam batch cukup dihitung sekali
+        pending = {}
+        for index, (key, entry) in enumerate(zip(keys, entries)):
+            if entry is None:
+                pending.setdefault(key, index)
+
+        if pending:
+            rows = list(pending.values())
+            X_miss = X[rows]
+
+            # Predict (satu panggilan) + SHAP (sharded) + script (rule table, vektor)
+            n_rows = len(rows)
+            with metrics.stage("predict", rows=n_rows):
+                probs = bundle.predict_scores(X_miss)
+            with metrics.stage("shap", rows=n_rows):
+                shap_matrix = bundle.explain_engine.shap_values(X_miss)
+            with metrics.stage("recommendation", rows=n_rows):
+                scripts = bundle.rules.scripts_for(shap_matrix)
+
+            for key, prob, shap_row, script in zip(pending, probs, shap_matrix, scripts):
+                entry = self._build_explanation(
+                    bundle,
+                    prob,
+                    "Potential" if prob > 0.5 else "Non-Potential",
+                    shap_row,
+                    script
+                )
+                self.cache.put(key, entry)
+                pending[key] = entry
+
+            entries = [entry or pending[key] for key, entry in zip(keys, entries)]
+
+        # Copy supaya pemanggil tidak mengubah entry di cache
+        return [dict(entry) for entry in entries]
 
 # Singleton
 ml_service = MLService()
@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.explain_engine import (
+    ExplanationEngine,
+    build_explainer,
+    get_booster,
+    iteration_range,
+    load_model_file
+)
+from app.services.feature_encoder import FeatureEncoder
+from app.services.recommendation import RuleTable
+from app.services.shap_storage import shap_storage
+
+# Model lama (root ml_artifacts): <MODEL_NAME>.pkl + model_features.json
+MODEL_NAME = "xgboost_tuned_v2"
+FEATURES_FILE = "model_features.json"
+# Model versi baru: ml_artifacts/<versi>/model.<ext> + model_features.json
+VERSION_MODEL_STEM = "model"
+
+# MODEL_FORMAT -> ekstensi file model
+MODEL_EXTENSIONS = {
+    "pickle": ".pkl",
+    "ubjson": ".ubj",
+    "json": ".json",
+}
+
+
+class ModelBundle:
+    """
+    Satu versi model siap pakai: model, daftar fitur, encoder & (lazy) SHAP.
+    Request memegang referensi bundle dari awal sampai akhir, jadi swap model
+    aktif tidak mengganggu request yang sedang berjalan.
+    """
+
+    def __init__(self, version: str, model_path: str, features_path: str):
+        self.version = version
+        self.model_path = model_path
+        self.features_path = features_path
+
+        self.model = None
+        # Booster XGBoost (jalur inference native tanpa wrapper sklearn)
+        self.booster = None
+        self.iteration_range = (0, 0)
+        self.feature_columns = None
+        self.encoder = None
+        self.feature_version = None
+        self.rules = None
+        self.explainer = None
+        self.explain_engine = None
+        self._lock = threading.Lock()
+
+    def load(self) -> "ModelBundle":
+        # 1. Load Model (pickle atau format native XGBoost UBJSON/JSON)
+        self.model = load_model_file(self.model_path)
+        booster = get_booster(self.model)
+        # inplace_predict mengembalikan probabilitas kelas positif untuk binary:logistic
+        if booster is not None and self.model.get_params().get("objective") == "binary:logistic":
+            self.booster = booster
+            self.iteration_range = iteration_range(self.model)
+
+        # 2. Load feature columns
+        # NOTE: jangan ubah format nama fitur — model disimpan dengan nama fitur
+        # yang sama seperti saat pelatihan (mengandung titik).
+        with open(self.features_path, "r") as f:
+            self.feature_columns = json.load(f)
+
+        # 3. Compile encoder fitur (raw field -> index kolom) sekali saja
+        self.encoder = FeatureEncoder(self.feature_columns)
+        # Versi daftar fitur (kunci urutan vektor SHAP yang disimpan)
+        self.feature_version = shap_storage.register(self.feature_columns)
+        # 4. Compile rule script rekomendasi (index fitur -> template)
+        self.load_rules()
+        return self
+
+    def load_rules(self):
+        self.rules = RuleTable(self.feature_columns)
+
+    def predict_scores(self, X: np.ndarray) -> np.ndarray:
+        """
+        Probabilitas kelas positif untuk matrix fitur ter-encode.
+        INFERENCE_BACKEND=native: Booster.inplace_predict langsung dari array
+        float32 (tanpa validasi wrapper sklearn / konversi DMatrix).
+        """
+        if self.booster is not None and settings.INFERENCE_BACKEND == "native":
+            return self.booster.inplace_predict(
+                np.ascontiguousarray(X, dtype=np.float32),
+                iteration_range=self.iteration_range,
+                validate_features=False
+            )
+        return self.model.predict_proba(X)[:, 1]
+
+    def ensure_explainer(self) -> bool:
+        """Buat SHAP explainer + engine pada panggilan explain pertama"""
+        if self.explainer is not None:
+            return True
+
+        with self._lock:
+            if self.explainer is None:
+                # SHAP_BACKEND=native: pred_contribs XGBoost, "shap": TreeExplainer
+                explainer = build_explainer(self.model, settings.SHAP_BACKEND)
+
+                # Engine SHAP batch (process pool, fallback in-process)
+                self.explain_engine = ExplanationEngine(
+                    self.model_path,
+                    explainer,
+                    workers=settings.SHAP_WORKERS,
+                    shard_size=settings.SHAP_SHARD_SIZE,
+                    backend=settings.SHAP_BACKEND
+                )
+                self.explainer = explainer
+                print(f"✅ SHAP Explainer initialized ({self.version}, {type(explainer).__name__})")
+
+        return True
+
+    def shutdown(self):
+        if self.explain_engine:
+            self.explain_engine.shutdown()
+
+
+class ModelRegistry:
+    """
+    Daftar versi model di ml_artifacts:
+    - <MODEL_NAME>.<ext> + model_features.json di root  -> versi MODEL_NAME
+    - <versi>/model.<ext> + <versi>/model_features.json  -> versi <versi>
+    File model dipilih sesuai MODEL_FORMAT, fallback ke format lain yang ada.
+    """
+
+    def __init__(self, artifacts_path: str):
+        self.artifacts_path = artifacts_path
+
+    def _find_model(self, folder: str, stem: str):
+        preferred = MODEL_EXTENSIONS.get(settings.MODEL_FORMAT)
+        if preferred is None:
+            raise ValueError(f"Unknown MODEL_FORMAT: {settings.MODEL_FORMAT}")
+
+        extensions = [preferred] + [e for e in MODEL_EXTENSIONS.values() if e != preferred]
+        for extension in extensions:
+            path = os.path.join(folder, stem + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def versions(self) -> dict:
+        """versi -> (path model, path model_features.json)"""
+        found = {}
+        if not os.path.isdir(self.artifacts_path):
+            return found
+
+        legacy_model = self._find_model(self.artifacts_path, MODEL_NAME)
+        legacy_features = os.path.join(self.artifacts_path, FEATURES_FILE)
+        if legacy_model and os.path.exists(legacy_features):
+            found[MODEL_NAME] = (legacy_model, legacy_features)
+
+        for entry in sorted(os.listdir(self.artifacts_path)):
+            folder = os.path.join(self.artifacts_path, entry)
+            if not os.path.isdir(folder):
+                continue
+            model_path = self._find_model(folder, VERSION_MODEL_STEM)
+            features_path = os.path.join(folder, FEATURES_FILE)
+            if model_path and os.path.exists(features_path):
+                found[entry] = (model_path, features_path)
+
+        return found
+
+    def register_features(self):
+        """
+        Simpan daftar fitur semua versi di ml_artifacts ke shap_feature_set
+        (tanpa load model), supaya SHAP blob versi mana pun bisa di-decode.
+        """
+        for version, (_, features_path) in self.versions().items():
+            try:
+                with open(features_path, "r") as f:
+                    shap_storage.register(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Feature list of model {version} not registered: {e}")
+
+    def load(self, version: str) -> ModelBundle:
+        """Load satu versi (KeyError jika versi tidak ada di ml_artifacts)"""
+        paths = self.versions().get(version)
+        if paths is None:
+            raise KeyError(f"Model version '{version}' not found in {self.artifacts_path}")
+
+        return ModelBundle(version, *paths).load()
@@ -0,0 +1,184 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from app.core.config import settings
+from app.core.metrics import metrics, collect_timings, current_timings
+from app.services.ml_service import ml_service
+from app.services.scoring_executor import scoring_executor, ScoringBusyError
+
+
+class PredictionBatcher:
+    """
+    Micro-batching untuk POST /predict. Request satu-lead yang datang
+    bersamaan dikumpulkan oleh satu thread collector, lalu di-score sebagai
+    satu matrix (satu encode + satu predict + satu SHAP) di executor scoring.
+    Hasil dibagikan lagi ke tiap request lewat Future.
+    - Tidak ada batch yang sedang di-score: lead langsung di-flush (beban
+      rendah tidak menambah latency)
+    - Ada batch berjalan: lead dikumpulkan sampai batch itu selesai, max_size
+      lead, atau max_wait_ms sejak lead pertama
+    - Executor scoring penuh: semua request di batch itu mendapat 429
+    """
+
+    def __init__(self, max_size: int, max_wait_ms: float):
+        self.max_size = max(max_size, 1)
+        self.max_wait = max_wait_ms / 1000
+        # (record, explain, Future, waktu masuk, timing request) yang menunggu di-flush
+        self._queue = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        # Batch yang sedang di-score di executor
+        self._running = 0
+
+        self.batches = 0
+        self.items = 0
+
+    def predict(self, record: dict, explain: bool):
+        """Skor (+ SHAP & script bila explain) satu lead; memblok sampai batch selesai"""
+        if not settings.PREDICT_BATCHING:
+            score = ml_service.predict_and_explain if explain else ml_service.predict
+            return scoring_executor.run_sync(score, record)
+
+        return self.submit(record, explain).result()
+
+    def submit(self, record: dict, explain: bool) -> Future:
+        future = Future()
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._collect, name="predict-batcher", daemon=True
+                )
+                self._thread.start()
+            self._queue.append(
+                (record, explain, future, time.perf_counter(), current_timings())
+            )
+            self._cond.notify()
+        return future
+
+    def _collect(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+
+                # Selama masih ada batch berjalan, kumpulkan lead lain
+                # sampai batch penuh atau waktu habis
+                deadline = time.monotonic() + self.max_wait
+                while self._running and len(self._queue) < self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._queue[:self.max_size]
+                del self._queue[:self.max_size]
+                self._running += 1
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: list):
+        try:
+            scoring_executor.submit(self._score, batch).add_done_callback(self._batch_done)
+        except ScoringBusyError as e:
+            self._batch_done()
+            for item in batch:
+                item[2].set_exception(e)
+
+    def _batch_done(self, future: Future = None):
+        with self._cond:
+            self._running -= 1
+            self._cond.notify()
+
+    def _score(self, batch: list):
+        """
+        Score batch; apa pun yang gagal di luar scoring (timing, zip hasil,
+        dll.) diteruskan ke semua Future yang belum selesai, jadi request
+        tidak pernah menunggu selamanya.
+        """
+        try:
+            self._score_batch(batch)
+            error = RuntimeError("Prediction batch returned no result")
+        except Exception as e:
+            print(f"Prediction Error (batch of {len(batch)}): {e}")
+            error = e
+
+        for item in batch:
+            if not item[2].done():
+                item[2].set_exception(error)
+
+    def _score_batch(self, batch: list):
+        with self._cond:
+            self.batches += 1
+            self.items += len(batch)
+
+        started = time.perf_counter()
+        for _, _, _, queued_at, timings in batch:
+            wait = started - queued_at
+            metrics.observe_stage("batch_wait", wait)
+            if timings is not None:
+                timings.append(("batch_wait", wait))
+
+        for explain in (False, True):
+            items = [item for item in batch if item[1] == explain]
+            if not items:
+                continue
+
+            records = [item[0] for item in items]
+            # Timing stage batch ini dibagikan ke Server-Timing tiap request di dalamnya
+            with collect_timings() as batch_timings:
+                try:
+                    if explain:
+                        results = ml_service.predict_and_explain_records(records)
+                    else:
+                        results = ml_service.predict_records(records)
+                except Exception as e:
+                    results = None
+                    error = e
+
+            for item in items:
+                if item[4] is not None:
+                    item[4].extend(batch_timings)
+
+            if results is None:
+                # Sama seperti ml_service.predict: skor gagal -> None,
+                # explain gagal -> error diteruskan ke request
+                print(f"Prediction Error (batch of {len(records)}): {error}")
+                for item in items:
+                    if explain:
+                        item[2].set_exception(error)
+                    else:
+                        item[2].set_result(None)
+                continue
+
+            for item, result in zip(items, results):
+                item[2].set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.PREDICT_BATCHING,
+            "max_size": self.max_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "average_batch_size": (self.items / self.batches) if self.batches else None
+        }
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            pending, self._queue = self._queue, []
+            self._cond.notify_all()
+
+        for item in pending:
+            item[2].set_exception(ScoringBusyError("Scoring is shutting down"))
+
+
+# Singleton
+prediction_batcher = PredictionBatcher(
+    max_size=settings.PREDICT_BATCH_MAX_SIZE,
+    max_wait_ms=settings.PREDICT_BATCH_WAIT_MS
+)
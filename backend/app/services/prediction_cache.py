@@ -0,0 +1,84 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    LRU cache hasil prediksi, key = hash baris fitur ter-encode + versi model.
+    Entry: score, label, shap_values, script (shap_values None jika baru di-score).
+    max_size = 0 -> cache nonaktif.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def keys_for(self, X: np.ndarray, model_version: str) -> list:
+        """Key per baris matrix fitur (float32, urutan feature_columns)"""
+        prefix = model_version.encode()
+        return [
+            prefix + hashlib.blake2b(row.tobytes(), digest_size=16).digest()
+            for row in np.ascontiguousarray(X, dtype=np.float32)
+        ]
+
+    def get(self, key: bytes, need_shap: bool = False):
+        """Entry untuk key (dipindah ke posisi terbaru), None jika miss"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (need_shap and entry["shap_values"] is None):
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: bytes, entry: dict):
+        if not self.enabled:
+            return
+
+        # Baris SHAP dari batch adalah view ke matrix batch: disalin supaya
+        # entry tidak menahan seluruh matrix di memori
+        shap_values = entry.get("shap_values")
+        if isinstance(shap_values, np.ndarray):
+            entry = {**entry, "shap_values": shap_values.copy()}
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None
+            }
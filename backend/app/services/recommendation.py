@@ -0,0 +1,115 @@
+import json
+
+import numpy as np
+
+from app.core.config import settings
+
+# Rule default (sama dengan if/elif generate_recommendation versi lama):
+# rule pertama yang "match"-nya ada di nama fitur pendorong utama dipakai.
+DEFAULT_RULES = {
+    "greeting": "Halo Bapak/Ibu, ",
+    "closing": " Apakah boleh saya jelaskan simulasinya sebentar?",
+    "rules": [
+        {
+            "match": "euribor3m",
+            "template": (
+                "saat ini kondisi suku bunga pasar sedang sangat mendukung. "
+                "Ini momen tepat untuk mengunci nilai deposito Anda."
+            )
+        },
+        {
+            "match": "nr_employed",
+            "template": (
+                "melihat kondisi ekonomi yang sedang aktif, "
+                "kami memiliki penawaran investasi yang aman."
+            )
+        },
+        {
+            "match": "contact",
+            "template": (
+                "kami menghubungi melalui seluler karena ada kemudahan "
+                "akses prioritas untuk Anda."
+            )
+        },
+        {
+            "match": "poutcome_success",
+            "template": (
+                "terima kasih atas kepercayaan Anda sebelumnya. "
+                "Kami memiliki penawaran eksklusif lanjutan."
+            )
+        },
+    ],
+    # Dipakai jika tidak ada rule yang cocok / tidak ada kontribusi SHAP positif
+    "default": (
+        "kami melihat profil finansial Anda sangat cocok "
+        "untuk program Deposito Berjangka premium kami."
+    )
+}
+
+
+def load_rules() -> dict:
+    """Rule dari RECOMMENDATION_RULES_PATH (JSON, format DEFAULT_RULES) atau default"""
+    if not settings.RECOMMENDATION_RULES_PATH:
+        return DEFAULT_RULES
+
+    with open(settings.RECOMMENDATION_RULES_PATH, "r") as f:
+        custom = json.load(f)
+    return {**DEFAULT_RULES, **custom}
+
+
+class RuleTable:
+    """
+    Rule rekomendasi yang di-"compile" untuk satu daftar fitur model:
+    index fitur -> id template, script lengkap (greeting + isi + closing)
+    dibuat sekali dan dipakai bersama oleh semua lead.
+    """
+
+    def __init__(self, feature_columns: list, rules: dict = None):
+        rules = rules or load_rules()
+        self.feature_columns = list(feature_columns)
+
+        self.rules = rules["rules"]
+        bodies = [rule["template"] for rule in self.rules] + [rules["default"]]
+        self.scripts = [rules["greeting"] + body + rules["closing"] for body in bodies]
+        self.default_id = len(bodies) - 1
+
+        self.template_ids = np.array(
+            [self._match(name) for name in self.feature_columns], dtype=np.int64
+        )
+
+    def _match(self, feature_name: str) -> int:
+        # Rule pertama yang cocok menang (urutan sama seperti if/elif)
+        for template_id, rule in enumerate(self.rules):
+            if rule["match"] in feature_name:
+                return template_id
+        return self.default_id
+
+    def script_for(self, feature_name: str) -> str:
+        """Script untuk satu nama fitur pendorong (jalur lama generate_recommendation)"""
+        return self.scripts[self._match(feature_name)]
+
+    def scripts_for(self, shap_matrix: np.ndarray) -> list:
+        """
+        Script per baris SHAP matrix (satu operasi vektor untuk seluruh batch):
+        template dari fitur dengan kontribusi positif terbesar.
+        """
+        shap_matrix = np.asarray(shap_matrix)
+        if len(shap_matrix) == 0:
+            return []
+
+        # Top-1 per baris: argmax (tie-break = fitur pertama, sama dengan sorted() lama)
+        top = np.argmax(shap_matrix, axis=1)
+        positive = shap_matrix[np.arange(len(shap_matrix)), top] > 0
+        template_ids = np.where(positive, self.template_ids[top], self.default_id)
+        return [self.scripts[template_id] for template_id in template_ids]
+
+    def summary(self) -> dict:
+        return {
+            "templates": len(self.scripts),
+            "features_with_rule": int((self.template_ids != self.default_id).sum()),
+            "rules": {
+                name: int(template_id)
+                for name, template_id in zip(self.feature_columns, self.template_ids)
+                if template_id != self.default_id
+            }
+        }
@@ -0,0 +1,360 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import bindparam, func, or_, update
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.session import engine, write_with_retry, is_lock_error
+from app.models.customer import Customer, CustomerBase
+from app.models.job import JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED, JOB_FAILED
+from app.models.rescore import MACRO_FIELDS, RescoreJob, RescoreJobRead, RescoreRequest
+from app.services.ml_service import ml_service
+from app.services.explain_service import is_lazy, prewarm_top_leads
+from app.services.analytics_service import analytics_service
+from app.services.feature_importance_service import feature_importance_service
+from app.services.shap_storage import shap_storage
+from app.services import job_lease
+from app.services.job_lease import LeaseLostError
+
+_table = Customer.__table__
+
+# Kolom yang dibaca per chunk: input model + hasil lama (untuk agregat SHAP)
+FEATURE_COLUMNS = [getattr(Customer, name) for name in CustomerBase.model_fields]
+RESULT_COLUMNS = [
+    Customer.prediction_label, Customer.shap_values_blob,
+    Customer.shap_values_json, Customer.shap_version
+]
+
+
+class RescoreService:
+    """
+    Rescoring lead yang sudah tersimpan saat indikator makro berubah atau
+    model aktif diganti (tanpa upload ulang).
+    - Hanya lead terbuka (lead_status, default NEW/CONTACTED) yang nilai
+      makronya berbeda atau di-score versi model lain yang dipilih; lead
+      lain tidak disentuh
+    - Diproses per chunk (keyset id); hasil ditulis dengan bulk UPDATE
+      dan checkpoint (last_id + progress) di-commit bersama tiap chunk,
+      jadi setelah restart job dilanjutkan dari chunk berikutnya
+    - Satu worker: satu job berjalan pada satu waktu, transaksi pendek per
+      chunk sehingga API tetap melayani request selama rescoring
+    """
+
+    def __init__(self, chunk_size: int, pause_ms: float):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rescore")
+        self.chunk_size = chunk_size
+        self.pause = pause_ms / 1000
+        self._stop = threading.Event()
+
+    # --- Seleksi lead ---
+
+    def _selection(self, macro: dict, statuses: list, model_version: str, include_stale_model: bool):
+        """WHERE untuk lead yang perlu di-rescore (None jika tidak ada yang berubah)"""
+        changed = [getattr(Customer, name) != value for name, value in macro.items()]
+        if include_stale_model and model_version:
+            changed.append(Customer.model_version.is_(None))
+            changed.append(Customer.model_version != model_version)
+        if not changed:
+            return None
+        return [Customer.lead_status.in_(statuses), or_(*changed)]
+
+    def _job_selection(self, job: RescoreJob):
+        return self._selection(
+            json.loads(job.macro_json or "{}"),
+            job.lead_statuses.split(","),
+            job.model_version,
+            job.include_stale_model
+        )
+
+    def count_affected(self, session: Session, request: RescoreRequest) -> int:
+        """Jumlah lead yang akan di-rescore (dry run)"""
+        where = self._selection(
+            self._macro(request), request.lead_statuses,
+            ml_service.model_version, request.include_stale_model
+        )
+        if where is None:
+            return 0
+        return session.exec(select(func.count(Customer.id)).where(*where)).one()
+
+    @staticmethod
+    def _macro(request: RescoreRequest) -> dict:
+        return {
+            name: getattr(request, name)
+            for name in MACRO_FIELDS
+            if getattr(request, name) is not None
+        }
+
+    # --- Job ---
+
+    def create_job(self, session: Session, request: RescoreRequest, enqueue: bool = True) -> RescoreJob:
+        """
+        Buat job QUEUED (dengan jumlah lead terdampak) lalu antrekan ke worker.
+        enqueue=False: job dijalankan sendiri oleh pemanggil (CLI, run_with_retry)
+        """
+        if not ml_service.ensure_loaded():
+            raise RuntimeError(ml_service.load_error or "ML artifacts not loaded")
+
+        macro = self._macro(request)
+        job = RescoreJob(
+            macro_json=json.dumps(macro) if macro else None,
+            lead_statuses=",".join(request.lead_statuses),
+            model_version=ml_service.model_version,
+            include_stale_model=request.include_stale_model,
+            total_affected=self.count_affected(session, request)
+        )
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+
+        if enqueue:
+            self.executor.submit(self.run_with_retry, job.id)
+        return job
+
+    def run_with_retry(self, job_id: int, progress=None) -> Optional[str]:
+        """
+        run_job; DB terkunci terlalu lama -> job kembali QUEUED lalu dicoba
+        lagi (backoff, maksimal DB_LOCK_RETRIES kali). Return status akhir.
+        """
+        for attempt in range(settings.DB_LOCK_RETRIES + 1):
+            status = self.run_job(job_id, progress)
+            if status != JOB_QUEUED or self._stop.is_set():
+                break
+            time.sleep(settings.DB_LOCK_RETRY_DELAY * 2 ** attempt)
+        return status
+
+    def run_job(self, job_id: int, progress=None) -> Optional[str]:
+        """
+        Jalankan (atau lanjutkan) job sampai selesai. progress(job) dipanggil
+        setelah tiap chunk (dipakai CLI). Job diklaim atomik dulu (job_lease):
+        return None jika job sedang dijalankan proses lain (atau sudah selesai),
+        jadi agregat feature_importance tidak pernah diterapkan dua kali.
+        Selain itu return status akhir (COMPLETED / FAILED / QUEUED = dilanjutkan
+        nanti: shutdown atau database terkunci).
+        """
+        with Session(engine) as session:
+            if not write_with_retry(session, lambda s: job_lease.claim(s, RescoreJob, job_id)):
+                return None
+            job = session.get(RescoreJob, job_id)
+
+            status, error = JOB_COMPLETED, None
+            try:
+                if not ml_service.ensure_loaded():
+                    raise RuntimeError(ml_service.load_error or "ML artifacts not loaded")
+
+                where = self._job_selection(job)
+                macro = json.loads(job.macro_json or "{}")
+
+                while where is not None and not self._stop.is_set():
+                    if ml_service.model_version != job.model_version:
+                        raise RuntimeError(
+                            f"Active model changed to {ml_service.model_version} during rescore; "
+                            "start a new rescore job"
+                        )
+
+                    done = self._rescore_chunk(session, job, where, macro)
+                    if not done:
+                        break
+                    if progress:
+                        progress(job)
+                    if self.pause:
+                        time.sleep(self.pause)
+
+                if self._stop.is_set():
+                    # Shutdown: job kembali QUEUED, dilanjutkan saat startup
+                    status = JOB_QUEUED
+
+            except LeaseLostError as e:
+                # Lease kedaluwarsa dan job sudah dilanjutkan proses lain
+                session.rollback()
+                print(f"⚠️ Rescore job {job_id} stopped: {e}")
+                return None
+            except Exception as e:
+                session.rollback()
+                if is_lock_error(e):
+                    # Chunk terakhir tidak ter-commit, lanjut dari checkpoint
+                    print(f"⚠️ Rescore job {job_id} requeued, database busy: {e}")
+                    status, error = JOB_QUEUED, f"Database busy, job will be retried: {e.orig}"
+                else:
+                    print(f"❌ Rescore job {job_id} failed: {e}")
+                    status, error = JOB_FAILED, str(e)
+
+            def finish(session: Session):
+                job_lease.renew(session, RescoreJob, job_id)
+                job.status = status
+                job.error = error
+                if status != JOB_QUEUED:
+                    job.finished_at = datetime.utcnow()
+                session.add(job)
+
+            try:
+                write_with_retry(session, finish)
+            except LeaseLostError as e:
+                session.rollback()
+                print(f"⚠️ Rescore job {job_id} stopped: {e}")
+                return None
+
+        if status == JOB_COMPLETED and is_lazy():
+            prewarm_top_leads()
+        return status
+
+    def _rescore_chunk(self, session: Session, job: RescoreJob, where: list, macro: dict) -> int:
+        """Rescore satu chunk setelah checkpoint; return jumlah lead (0 = selesai)"""
+        import pandas as pd
+
+        statement = (
+            select(Customer.id, *FEATURE_COLUMNS, *RESULT_COLUMNS)
+            .where(*where)
+            .where(Customer.id > job.last_id)
+            .order_by(Customer.id)
+            .limit(self.chunk_size)
+        )
+        # Baca di koneksi terpisah: transaksi baca selesai sebelum write dimulai
+        # (SQLite tidak bisa menaikkan snapshot baca lama menjadi write)
+        with engine.connect() as connection:
+            rows = connection.execute(statement).all()
+        if not rows:
+            return 0
+
+        n_features = len(FEATURE_COLUMNS)
+        df = pd.DataFrame(
+            [row[1:n_features + 1] for row in rows],
+            columns=[column.key for column in FEATURE_COLUMNS]
+        )
+        for name, value in macro.items():
+            df[name] = value
+
+        # Sama dengan ingest: mode eager -> skor + SHAP + script, lazy -> skor saja
+        if is_lazy():
+            predictions = ml_service.predict_batch(df)
+        else:
+            predictions = ml_service.predict_and_explain_batch(df)
+        if any(prediction is None for prediction in predictions):
+            raise RuntimeError("Scoring failed for rescore chunk")
+
+        params = []
+        old_explanations = []
+        label_changed = 0
+        for row, prediction in zip(rows, predictions):
+            old_label, old_blob, old_json, old_version = row[n_features + 1:]
+            if old_label != prediction["label"]:
+                label_changed += 1
+
+            # SHAP lama dikeluarkan dari agregat feature_importance
+            old_shap = self._stored_shap(old_blob, old_json, old_version)
+            if old_shap is not None and old_label is not None:
+                old_explanations.append(
+                    {"shap_values": old_shap, "shap_version": old_version, "label": old_label}
+                )
+
+            params.append({
+                "b_id": row[0],
+                "b_score": prediction["score"],
+                "b_label": prediction["label"],
+                "b_model_version": prediction["model_version"],
+                # Mode lazy: SHAP + script lama dikosongkan, dihitung ulang saat dibuka
+                "b_recommendation_script": prediction.get("script"),
+                **{
+                    f"b_{name}": value
+                    for name, value in shap_storage.to_columns(
+                        prediction.get("shap_values"), prediction.get("shap_version")
+                    ).items()
+                }
+            })
+
+        values = {
+            "prediction_score": bindparam("b_score"),
+            "prediction_label": bindparam("b_label"),
+            "model_version": bindparam("b_model_version"),
+            "recommendation_script": bindparam("b_recommendation_script"),
+            "shap_values_json": bindparam("b_shap_values_json"),
+            "shap_values_blob": bindparam("b_shap_values_blob"),
+            "shap_version": bindparam("b_shap_version"),
+            # Nilai makro baru sama untuk semua baris (literal, bukan per baris)
+            **macro
+        }
+        statement = update(_table).where(_table.c.id == bindparam("b_id")).values(**values)
+
+        def save(session: Session):
+            # Hanya pemilik lease yang menulis; checkpoint ikut transaksi yang
+            # sama dengan hasil chunk (atribut job dimuat ulang setelah rollback)
+            job_lease.renew(session, RescoreJob, job.id)
+            session.connection().execute(statement, params)
+            feature_importance_service.apply(session, old_explanations, sign=-1)
+            feature_importance_service.apply(session, predictions)
+
+            job.last_id = rows[-1][0]
+            job.rows_done += len(rows)
+            job.rows_label_changed += label_changed
+            session.add(job)
+
+        with metrics.stage("rescore_update", rows=len(params)):
+            write_with_retry(session, save, rows=len(params))
+
+        analytics_service.invalidate()
+        return len(rows)
+
+    @staticmethod
+    def _stored_shap(blob: bytes, legacy: str, version: str):
+        """SHAP tersimpan (blob / JSON SHAP_STORAGE=json) sebagai array urut fitur versinya"""
+        decoded = shap_storage.decode(blob, version)
+        if decoded is not None:
+            return decoded[1]
+        if legacy is None or version is None:
+            return None
+        try:
+            features = shap_storage.features(version)
+        except KeyError:
+            return None
+        values = json.loads(legacy)
+        return [values.get(feature, 0.0) for feature in features]
+
+    def resume_pending_jobs(self):
+        """
+        Dipanggil saat startup: lanjutkan job QUEUED/RUNNING dari proses
+        sebelumnya. Tiap job hanya berjalan di proses yang berhasil
+        mengklaimnya (worker API lain / CLI --resume mendapat klaim gagal).
+        Job RUNNING dengan lease aktif dicoba lagi setelah lease habis.
+        """
+        with Session(engine) as session:
+            pending = session.exec(
+                select(RescoreJob)
+                .where(RescoreJob.status.in_([JOB_QUEUED, JOB_RUNNING]))
+                .order_by(RescoreJob.id)
+            ).all()
+
+        for job in pending:
+            delay = job_lease.expires_in(job)
+            if delay is None:
+                self.executor.submit(self.run_with_retry, job.id)
+            else:
+                timer = threading.Timer(delay + 1, self.executor.submit, args=(self.run_with_retry, job.id))
+                timer.daemon = True
+                timer.start()
+
+    def to_read(self, job: RescoreJob) -> RescoreJobRead:
+        """RescoreJob -> RescoreJobRead (+ throughput lead/detik)"""
+        throughput = None
+        if job.started_at:
+            end = job.finished_at or datetime.utcnow()
+            elapsed = (end - job.started_at).total_seconds()
+            if elapsed > 0:
+                throughput = job.rows_done / elapsed
+
+        return RescoreJobRead.model_validate(job, update={"throughput": throughput})
+
+    def shutdown(self):
+        self._stop.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton
+rescore_service = RescoreService(
+    chunk_size=settings.RESCORE_CHUNK_SIZE,
+    pause_ms=settings.RESCORE_PAUSE_MS
+)
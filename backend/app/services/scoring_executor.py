@@ -0,0 +1,85 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from app.core.config import settings
+
+
+class ScoringBusyError(Exception):
+    """Kapasitas scoring / antrean upload penuh (API menjawab 429)"""
+
+
+class ScoringExecutor:
+    """
+    Executor terbatas untuk kerja CPU di jalur request (encode, predict, SHAP,
+    parsing CSV). Event loop & threadpool FastAPI tidak ikut tertahan, jadi
+    request baca (GET /customers, analytics) tetap cepat saat ada upload.
+    - workers: scoring yang berjalan bersamaan
+    - queue_size: scoring yang boleh menunggu; lebih dari itu ScoringBusyError
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scoring")
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Antrekan fn; ScoringBusyError jika semua slot terpakai (tanpa menunggu)"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ScoringBusyError("Scoring capacity exhausted, retry later")
+
+        with self._lock:
+            self.in_flight += 1
+
+        try:
+            # Context pemanggil ikut dibawa (timing stage untuk Server-Timing)
+            context = contextvars.copy_context()
+            future = self.executor.submit(context.run, fn, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: Future = None):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def run_sync(self, fn, *args, **kwargs):
+        """Untuk endpoint sync (threadpool): tunggu hasil fn dari executor scoring"""
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def run(self, fn, *args, **kwargs):
+        """Untuk endpoint async: await hasil fn tanpa memblok event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton
+scoring_executor = ScoringExecutor(
+    workers=settings.SCORING_WORKERS,
+    queue_size=settings.SCORING_QUEUE_SIZE
+)
@@ -0,0 +1,119 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import bindparam, case, func, update
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.db.session import engine
+from app.models.customer import Customer
+from app.services.ml_service import ml_service
+
+_table = Customer.__table__
+
+
+class ShadowService:
+    """
+    Shadow scoring: model kandidat (ml_service.shadow) men-score baris yang
+    sama dengan model aktif di background thread, lalu hasilnya disimpan di
+    Customer.shadow_score / shadow_model_version untuk dibandingkan.
+    - Request tidak menunggu shadow (latency tetap satu model)
+    - Antrean dibatasi SHADOW_MAX_PENDING batch; jika penuh batch dilewati
+    - Dipanggil setelah commit, supaya baris sudah terlihat oleh UPDATE shadow
+    """
+
+    def __init__(self, max_pending: int):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self._slots = threading.BoundedSemaphore(max(max_pending, 1))
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.rows = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def enabled(self) -> bool:
+        return ml_service.shadow is not None
+
+    def submit(self, customer_ids: list, records: list) -> bool:
+        """Antrekan shadow scoring untuk customer_ids (records = data mentah, urutan sama)"""
+        bundle = ml_service.shadow
+        if bundle is None or not customer_ids:
+            return False
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.skipped += 1
+            return False
+
+        self.executor.submit(self._run, bundle, list(customer_ids), list(records))
+        return True
+
+    def _run(self, bundle, customer_ids: list, records: list):
+        try:
+            scores = ml_service.shadow_scores(bundle, records)
+            params = [
+                {"b_id": customer_id, "b_score": score}
+                for customer_id, score in zip(customer_ids, scores)
+            ]
+            statement = (
+                update(_table)
+                .where(_table.c.id == bindparam("b_id"))
+                .values(shadow_score=bindparam("b_score"), shadow_model_version=bundle.version)
+            )
+            with Session(engine) as session:
+                session.connection().execute(statement, params)
+                session.commit()
+
+            with self._lock:
+                self.batches += 1
+                self.rows += len(params)
+
+        except Exception as e:
+            print(f"⚠️ Shadow scoring failed ({bundle.version}): {e}")
+            with self._lock:
+                self.errors += 1
+
+        finally:
+            self._slots.release()
+
+    def compare(self, session: Session, version: str) -> dict:
+        """Ringkasan skor aktif vs shadow untuk baris yang di-score versi shadow"""
+        shadow_label = case((Customer.shadow_score > 0.5, "Potential"), else_="Non-Potential")
+        total, avg_score, avg_shadow, mean_abs_diff, agree = session.exec(
+            select(
+                func.count(Customer.id),
+                func.avg(Customer.prediction_score),
+                func.avg(Customer.shadow_score),
+                func.avg(func.abs(Customer.shadow_score - Customer.prediction_score)),
+                func.sum(case((Customer.prediction_label == shadow_label, 1), else_=0))
+            )
+            .where(Customer.shadow_model_version == version)
+            .where(Customer.prediction_score.is_not(None))
+        ).one()
+
+        return {
+            "shadow_model_version": version,
+            "compared": total,
+            "average_score": avg_score,
+            "average_shadow_score": avg_shadow,
+            "mean_abs_diff": mean_abs_diff,
+            "label_agreement": (agree / total) if total else None
+        }
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled(),
+            "shadow_model_version": ml_service.shadow.version if ml_service.shadow else None,
+            "batches": self.batches,
+            "rows": self.rows,
+            "skipped": self.skipped,
+            "errors": self.errors
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton
+shadow_service = ShadowService(max_pending=settings.SHADOW_MAX_PENDING)
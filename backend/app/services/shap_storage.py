@@ -0,0 +1,138 @@
+import hashlib
+import json
+
+import numpy as np
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.db.session import engine
+from app.models.shap_feature_set import ShapFeatureSet
+
+SHAP_DTYPE = np.float32
+
+
+def feature_version(feature_columns: list) -> str:
+    """Versi daftar fitur (hash isi model_features.json), kunci urutan vektor SHAP"""
+    payload = json.dumps(list(feature_columns)).encode()
+    return hashlib.sha1(payload).hexdigest()[:12]
+
+
+class ShapStorage:
+    """
+    Format penyimpanan SHAP per lead:
+    - "blob" (default): array float32 urutan tetap + shap_version
+      (nama fitur tidak diulang di setiap baris)
+    - "json": format lama {feature: value}
+    Baris lama (JSON) tetap terbaca; blob di-decode ke bentuk JSON yang sama
+    di batas API.
+    Daftar fitur per shap_version disimpan di tabel shap_feature_set (cache
+    di memori), jadi decode tidak bergantung pada model yang sedang di-load.
+    """
+
+    def __init__(self):
+        # shap_version -> daftar fitur (cache tabel shap_feature_set)
+        self._features = {}
+
+    def register(self, feature_columns: list) -> str:
+        """Simpan daftar fitur (idempotent); return shap_version"""
+        version = feature_version(feature_columns)
+        if version in self._features:
+            return version
+
+        try:
+            with Session(engine) as session:
+                if session.get(ShapFeatureSet, version) is None:
+                    session.add(ShapFeatureSet(
+                        version=version, features_json=json.dumps(list(feature_columns))
+                    ))
+                    session.commit()
+        except IntegrityError:
+            # Proses lain menyimpan versi yang sama lebih dulu
+            pass
+        except SQLAlchemyError as e:
+            # Mis. tabel belum dibuat: tetap bisa dipakai di proses ini
+            print(f"⚠️ SHAP feature set {version} not persisted: {e}")
+
+        self._features[version] = list(feature_columns)
+        return version
+
+    def _lookup(self, version: str):
+        """Daftar fitur dari cache, lalu dari DB; None jika versi tidak dikenal"""
+        if version is None:
+            return None
+        features = self._features.get(version)
+        if features is not None:
+            return features
+
+        try:
+            with Session(engine) as session:
+                row = session.get(ShapFeatureSet, version)
+        except SQLAlchemyError:
+            return None
+        if row is None:
+            return None
+
+        features = json.loads(row.features_json)
+        self._features[version] = features
+        return features
+
+    def features(self, version: str) -> list:
+        """Daftar fitur untuk shap_version (urutan nilai di vektor SHAP); KeyError jika tidak dikenal"""
+        features = self._lookup(version)
+        if features is None:
+            raise KeyError(f"Unknown shap_version: {version}")
+        return features
+
+    def to_columns(self, shap_values, version: str) -> dict:
+        """Vektor SHAP -> nilai kolom Customer (shap_values_json / blob / version)"""
+        if shap_values is None:
+            return {"shap_values_json": None, "shap_values_blob": None, "shap_version": None}
+
+        if settings.SHAP_STORAGE == "json":
+            features = self.features(version)
+            return {
+                "shap_values_json": json.dumps(
+                    {k: float(v) for k, v in zip(features, shap_values)}
+                ),
+                "shap_values_blob": None,
+                "shap_version": version
+            }
+
+        return {
+            "shap_values_json": None,
+            "shap_values_blob": np.asarray(shap_values, dtype=SHAP_DTYPE).tobytes(),
+            "shap_version": version
+        }
+
+    def decode(self, blob: bytes, version: str):
+        """Blob -> (daftar fitur, array SHAP); None jika versi fitur tidak dikenal"""
+        if blob is None:
+            return None
+        features = self._lookup(version)
+        if features is None:
+            return None
+        return features, np.frombuffer(blob, dtype=SHAP_DTYPE)
+
+    def to_json(self, customer) -> str:
+        """SHAP customer dalam format JSON API, dari kolom JSON lama atau blob"""
+        if customer.shap_values_json is not None:
+            return customer.shap_values_json
+
+        decoded = self.decode(customer.shap_values_blob, customer.shap_version)
+        if decoded is None:
+            return None
+
+        features, values = decoded
+        return json.dumps({k: float(v) for k, v in zip(features, values)})
+
+
+def has_shap(customer) -> bool:
+    """SHAP tersimpan dan bisa dibaca (blob dengan shap_version tak dikenal dianggap kosong)"""
+    if customer.shap_values_json is not None:
+        return True
+    return shap_storage.decode(customer.shap_values_blob, customer.shap_version) is not None
+
+
+# Singleton
+shap_storage = ShapStorage()
@@ -0,0 +1,187 @@
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.bulk import bulk_insert
+from app.db.session import write_with_retry
+from app.models.customer import Customer
+from app.services.ml_service import ml_service
+from app.services.explain_service import is_lazy
+from app.services.analytics_service import analytics_service
+from app.services.feature_importance_service import feature_importance_service
+from app.services.shadow_service import shadow_service
+from app.services.shap_storage import shap_storage
+from app.services.upload_validation import validate_chunk, format_error, ErrorReport
+
+
+def sniff_separator(fileobj) -> str:
+    """Deteksi separator (';' atau ',') dari beberapa byte pertama saja"""
+    head = fileobj.read(settings.CSV_SNIFF_BYTES)
+    fileobj.seek(0)
+
+    if isinstance(head, bytes):
+        head = head.decode("utf-8", errors="ignore")
+
+    first_line = head.split('\n')[0]
+    return ';' if ';' in first_line else ','
+
+
+def normalize_columns(df: "pd.DataFrame") -> "pd.DataFrame":
+    """emp.var.rate -> emp_var_rate, Age -> age"""
+    # Ganti literal '.' jadi '_' (escape dot), lalu lowercase
+    df.columns = df.columns.str.replace(r"\.", "_", regex=True).str.lower()
+    return df
+
+
+def iter_csv_chunks(fileobj, chunk_size: int = None, skip_rows: int = 0):
+    """
+    Baca CSV secara streaming per chunk (DataFrame) dengan kolom sudah dinormalisasi.
+    Memori hanya sebesar satu chunk, berapapun ukuran file.
+    skip_rows: lewati N baris data pertama (resume job), index baris tetap global.
+    """
+    import pandas as pd
+
+    separator = sniff_separator(fileobj)
+    print(f"🔍 Terdeteksi separator: '{separator}'") # Debugging log
+
+    reader = pd.read_csv(
+        fileobj,
+        sep=separator,
+        chunksize=chunk_size or settings.CSV_CHUNK_SIZE,
+        skiprows=range(1, skip_rows + 1) if skip_rows else None
+    )
+    # Waktu baca + parse tiap chunk tercatat sebagai stage csv_parse
+    for chunk in metrics.timed_iter("csv_parse", reader):
+        if skip_rows:
+            chunk.index += skip_rows
+        yield normalize_columns(chunk)
+
+
+# Kolom tabel customer (selain id)
+CUSTOMER_COLUMNS = [name for name in Customer.__table__.columns.keys() if name != "id"]
+
+
+def _customer_defaults() -> dict:
+    """Default field Customer (lead_status, created_at, ...) untuk insert Core"""
+    return {
+        name: field.get_default(call_default_factory=True)
+        for name, field in Customer.model_fields.items()
+        if name != "id" and not field.is_required()
+    }
+
+
+def _is_missing(value) -> bool:
+    # value != value -> NaN dari pandas
+    return value is None or value != value
+
+
+def score_chunk(df: "pd.DataFrame") -> dict:
+    """
+    Validasi chunk (per kolom) lalu score baris valid (batch ML), tanpa
+    menyentuh DB — transaksi write (save_chunk) dimulai setelah kerja berat selesai.
+    Return ringkasan chunk: processed, failed, potential, error_report
+    (DataFrame row/field/value/error), sample_error, rows & predictions
+    (untuk save_chunk), shadow_batch (diisi save_chunk)
+    """
+    # Baris tidak valid tidak ikut di-score maupun disimpan
+    with metrics.stage("validate", rows=len(df)):
+        df, error_report = validate_chunk(df)
+    failed = error_report["row"].nunique()
+    if failed:
+        print(f"⚠️ {failed} invalid rows in chunk ({len(error_report)} errors)")
+
+    # encode + predict_proba (+ SHAP bila mode eager) sekali untuk seluruh chunk
+    if is_lazy():
+        predictions = ml_service.predict_batch(df)
+    else:
+        predictions = ml_service.predict_and_explain_batch(df)
+    records = df.to_dict(orient="records")
+
+    defaults = _customer_defaults()
+    rows_to_add = []
+    saved_predictions = []
+
+    for customer_data, prediction in zip(records, predictions):
+        row = dict(defaults)
+        for name in CUSTOMER_COLUMNS:
+            if name in customer_data and not _is_missing(customer_data[name]):
+                row[name] = customer_data[name]
+
+        if prediction:
+            row["prediction_score"] = prediction['score']
+            row["prediction_label"] = prediction['label']
+            row["model_version"] = prediction['model_version']
+            # Mode lazy: SHAP + script diisi nanti (detail / prewarm)
+            row.update(shap_storage.to_columns(
+                prediction.get('shap_values'), prediction.get('shap_version')
+            ))
+            row["recommendation_script"] = prediction.get('script')
+
+        rows_to_add.append(row)
+        saved_predictions.append(prediction)
+
+    return {
+        "processed": len(rows_to_add),
+        "failed": failed,
+        "potential": sum(1 for row in rows_to_add if row.get("prediction_label") == 'Potential'),
+        "error_report": error_report,
+        "sample_error": format_error(error_report),
+        "rows": rows_to_add,
+        "predictions": saved_predictions,
+        "shadow_batch": None
+    }
+
+
+def save_chunk(session: Session, result: dict):
+    """
+    Bulk insert hasil score_chunk + agregat SHAP (commit oleh pemanggil,
+    supaya progress job bisa ikut di transaksi yang sama). Aman diulang
+    setelah rollback (write_with_retry).
+    """
+    rows = result["rows"]
+    if not rows:
+        return
+
+    # id baris baru hanya diambil bila shadow scoring aktif
+    if shadow_service.enabled():
+        ids = bulk_insert(session, Customer, rows, returning=Customer.id)
+        result["shadow_batch"] = (ids, rows)
+    else:
+        bulk_insert(session, Customer, rows)
+    # Agregat SHAP global ikut transaksi yang sama
+    feature_importance_service.apply(session, result["predictions"])
+
+
+def ingest_csv(session: Session, fileobj) -> dict:
+    """
+    Streaming ingestion: baca -> validasi -> score -> simpan per chunk, lalu
+    chunk berikutnya. Semua baris gagal dicatat di laporan error (error_report_id).
+    Return summary untuk response API.
+    """
+    total_processed = 0
+    total_failed = 0
+    potential = 0
+    sample_error = None
+    report = ErrorReport()
+
+    for chunk in iter_csv_chunks(fileobj):
+        result = score_chunk(chunk)
+        write_with_retry(session, lambda s: save_chunk(s, result), rows=result["processed"])
+        analytics_service.invalidate()
+        if result["shadow_batch"]:
+            shadow_service.submit(*result["shadow_batch"])
+        total_processed += result["processed"]
+        total_failed += result["failed"]
+        potential += result["potential"]
+        report.write(result["error_report"])
+        if sample_error is None:
+            sample_error = result["sample_error"]
+
+    return {
+        "total_processed": total_processed,
+        "total_failed": total_failed,
+        "potential": potential,
+        "sample_error": sample_error, # Tampilkan 1 error ke API response
+        # Laporan lengkap: GET /customers/upload-errors/{error_report_id}
+        "error_report_id": report.report_id
+    }
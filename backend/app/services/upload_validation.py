@@ -0,0 +1,178 @@
+import os
+import re
+import uuid
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.customer import CustomerBase
+
+# Nilai kategori yang diterima (dataset Bank Marketing + nama bulan/hari lengkap).
+# Titik boleh ditulis underscore (high_school), sama seperti FeatureEncoder.
+ALLOWED_VALUES = {
+    "job": [
+        "admin.", "blue-collar", "entrepreneur", "housemaid", "management", "retired",
+        "self-employed", "services", "student", "technician", "unemployed", "unknown"
+    ],
+    "marital": ["divorced", "married", "single", "unknown"],
+    "education": [
+        "basic.4y", "basic.6y", "basic.9y", "high.school", "illiterate",
+        "professional.course", "university.degree", "unknown"
+    ],
+    "default": ["no", "yes", "unknown"],
+    "housing": ["no", "yes", "unknown"],
+    "loan": ["no", "yes", "unknown"],
+    "contact": ["cellular", "telephone"],
+    "month": ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"],
+    "day_of_week": ["mon", "tue", "wed", "thu", "fri", "sat", "sun"],
+    "poutcome": ["failure", "nonexistent", "success"],
+}
+
+# Rentang wajar nilai numerik (inklusif)
+NUMERIC_RANGES = {
+    "age": (17, 100),
+    "campaign": (1, 100),
+    "pdays": (0, 999),
+    "previous": (0, 100),
+    "emp_var_rate": (-10, 10),
+    "cons_price_idx": (50, 150),
+    "cons_conf_idx": (-100, 100),
+    "euribor3m": (-5, 20),
+    "nr_employed": (0, 10000),
+}
+
+# Field wajib CustomerBase & tipenya (int / float / str)
+FIELD_TYPES = {
+    name: field.annotation
+    for name, field in CustomerBase.model_fields.items()
+    if field.is_required()
+}
+
+REPORT_COLUMNS = ["row", "field", "value", "error"]
+REPORT_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class MissingColumnsError(ValueError):
+    """Kolom wajib tidak ada di header CSV (seluruh file ditolak)"""
+
+
+def _allowed(values: list) -> list:
+    return sorted(set(values) | {value.replace(".", "_") for value in values})
+
+
+ALLOWED_SETS = {field: _allowed(values) for field, values in ALLOWED_VALUES.items()}
+
+
+def validate_chunk(df: "pd.DataFrame") -> tuple:
+    """
+    Validasi satu chunk CSV sekaligus per kolom (tanpa object per baris):
+    - kolom wajib ada (MissingColumnsError jika tidak)
+    - nilai kosong, tipe numerik & bilangan bulat (dikonversi ke dtype field)
+    - kategori yang diizinkan (ALLOWED_VALUES) & rentang numerik (NUMERIC_RANGES)
+    Return (df baris valid dengan dtype sudah dikonversi, DataFrame error
+    [row, field, value, error] — satu baris per kesalahan, index baris asli).
+    """
+    import pandas as pd
+
+    missing_columns = [name for name in FIELD_TYPES if name not in df.columns]
+    if missing_columns:
+        raise MissingColumnsError(f"CSV missing required columns: {', '.join(missing_columns)}")
+
+    invalid = np.zeros(len(df), dtype=bool)
+    problems = []
+    coerced = {}
+
+    def flag(field: str, mask, message: str, values):
+        mask = np.asarray(mask, dtype=bool)
+        if mask.any():
+            invalid[mask] = True
+            problems.append(pd.DataFrame({
+                "row": df.index[mask],
+                "field": field,
+                "value": np.asarray(values)[mask],
+                "error": message
+            }))
+
+    for name, kind in FIELD_TYPES.items():
+        column = df[name]
+        empty = column.isna().to_numpy()
+        if kind is str:
+            empty = empty | (column.astype(str).str.strip() == "").to_numpy()
+        flag(name, empty, "missing value", column)
+
+        if kind is str:
+            if name in ALLOWED_SETS:
+                flag(name, ~empty & ~column.isin(ALLOWED_SETS[name]).to_numpy(),
+                     "invalid category", column)
+            continue
+
+        numbers = pd.to_numeric(column, errors="coerce")
+        not_number = numbers.isna().to_numpy() & ~empty
+        flag(name, not_number, "not a number", column)
+
+        values = numbers.to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        if kind is int:
+            flag(name, present & (values != np.round(values)), "must be an integer", column)
+
+        if name in NUMERIC_RANGES:
+            low, high = NUMERIC_RANGES[name]
+            flag(name, present & ((values < low) | (values > high)),
+                 f"out of range [{low}, {high}]", column)
+        coerced[name] = numbers
+
+    valid = df.loc[~invalid].copy()
+    for name, numbers in coerced.items():
+        values = numbers[~invalid]
+        valid[name] = values.astype(np.int64) if FIELD_TYPES[name] is int else values.astype(np.float64)
+
+    if problems:
+        report = pd.concat(problems, ignore_index=True).sort_values(["row", "field"], kind="stable")
+    else:
+        report = pd.DataFrame(columns=REPORT_COLUMNS)
+    return valid, report
+
+
+def format_error(report: "pd.DataFrame") -> str:
+    """Satu baris laporan -> pesan singkat (sample_error di summary / job)"""
+    if report.empty:
+        return None
+    first = report.iloc[0]
+    return f"Row {first['row']} Error: {first['field']} {first['error']} ({first['value']!r})"
+
+
+def report_path(report_id: str) -> str:
+    """Lokasi file laporan error; None jika id tidak valid"""
+    if not REPORT_ID_PATTERN.match(report_id or ""):
+        return None
+    return os.path.join(settings.UPLOAD_DIR, "error_reports", f"{report_id}.csv")
+
+
+class ErrorReport:
+    """
+    Laporan error upload (CSV: row, field, value, error), ditulis per chunk.
+    File baru dibuat saat error pertama; report_id dipakai untuk download
+    (GET /customers/upload-errors/{report_id}). Resume job: report_id lama
+    dipakai lagi dan baris baru ditambahkan.
+    Baris chunk ditulis setelah chunk ter-commit, jadi write yang diulang
+    (database terkunci) tidak menulis baris yang sama dua kali.
+    """
+
+    def __init__(self, report_id: str = None):
+        self.report_id = report_id
+
+    def reserve(self, report: "pd.DataFrame") -> str:
+        """report_id untuk chunk ini (dibuat tanpa menulis file) supaya bisa ikut di-commit"""
+        if self.report_id is None and not report.empty:
+            self.report_id = uuid.uuid4().hex
+        return self.report_id
+
+    def write(self, report: "pd.DataFrame"):
+        if report.empty:
+            return
+
+        path = report_path(self.reserve(report))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        new_file = not os.path.exists(path)
+        report[REPORT_COLUMNS].to_csv(path, mode="a", header=new_file, index=False)
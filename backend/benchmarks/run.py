@@ -0,0 +1,327 @@
+"""
+Benchmark suite: scoring (MLService), upload end-to-end & list endpoint.
+
+Data sintetis (benchmarks/synthetic_data.py), DB SQLite sementara, model dari
+ml_artifacts (atau ML_ARTIFACTS_DIR). Hasil (rows/sec, p50/p95, peak RSS)
+disimpan sebagai JSON supaya bisa dibandingkan antar commit.
+
+    cd backend
+    python -m benchmarks.run                                   # 1k + 10k
+    python -m benchmarks.run --sizes 1000,10000,100000 --output benchmarks/results/main.json
+    python -m benchmarks.run --compare benchmarks/results/main.json --fail-on-regression
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.synthetic_data import write_csv
+
+# Metrik yang dibandingkan di --compare: (nama, True jika makin besar makin baik)
+COMPARED_METRICS = [("rows_per_sec", True), ("p50_ms", False), ("p95_ms", False)]
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS proses sejauh ini (kumulatif, bukan per tahap)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KiB, macOS: byte
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def latency_stats(samples: list, rows: int = None) -> dict:
+    """p50/p95/mean (ms) dari list durasi (detik) + rows/sec"""
+    values = np.asarray(samples) * 1000
+    total = float(np.sum(samples))
+    return {
+        "calls": len(samples),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "mean_ms": round(float(values.mean()), 3),
+        "rows_per_sec": round((rows or len(samples)) / total, 1) if total else None,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def throughput(seconds: float, rows: int) -> dict:
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+# =====================================================
+# Benchmark per komponen
+# =====================================================
+
+def bench_preprocess(ml_service, df) -> dict:
+    """preprocess_data (pandas, referensi) vs FeatureEncoder + cek parity"""
+    processed, pandas_seconds = timed(ml_service.preprocess_data, df)
+    encoded, encoder_seconds = timed(ml_service.encoder.encode_frame, df)
+
+    reference = processed.to_numpy(dtype=np.float32)
+    return {
+        "preprocess_data": throughput(pandas_seconds, len(df)),
+        "encode_frame": throughput(encoder_seconds, len(df)),
+        "encoder_parity_max_abs_diff": float(np.abs(reference - encoded).max())
+    }
+
+
+def bench_single(fn, records: list) -> dict:
+    """Latency satu lead per panggilan (predict / predict_and_explain)"""
+    # Warm-up (lazy init explainer, alokasi pertama) tidak ikut diukur
+    fn(records[0])
+
+    samples = []
+    for record in records:
+        _, seconds = timed(fn, record)
+        samples.append(seconds)
+    return latency_stats(samples)
+
+
+def bench_contrib_parity(ml_service, df) -> dict:
+    """SHAP native (pred_contribs) vs shap.TreeExplainer pada matrix yang sama"""
+    try:
+        import shap
+    except ImportError:
+        return {"skipped": "shap not installed"}
+
+    from app.services.explain_engine import BoosterExplainer
+
+    X = ml_service.encoder.encode_frame(df)
+    native, native_seconds = timed(BoosterExplainer(ml_service.model).shap_values, X)
+    reference, shap_seconds = timed(shap.TreeExplainer(ml_service.model).shap_values, X)
+    return {
+        "rows": len(X),
+        "max_abs_diff": float(np.abs(np.asarray(reference) - native).max()),
+        "native_seconds": round(native_seconds, 3),
+        "shap_seconds": round(shap_seconds, 3)
+    }
+
+
+def bench_upload(client, path: str, rows: int) -> dict:
+    """POST /customers/upload?background=false end-to-end (parse, score, SHAP, insert)"""
+    with open(path, "rb") as f:
+        response, seconds = timed(
+            lambda: client.post(
+                "/api/v1/customers/upload?background=false",
+                files={"file": (os.path.basename(path), f, "text/csv")}
+            )
+        )
+    response.raise_for_status()
+    summary = response.json()["summary"]
+    return {**throughput(seconds, rows), "processed": summary["total_processed"]}
+
+
+def bench_list(client, pages: int, sort: str, limit: int = 100) -> dict:
+    """Jalan halaman GET /customers dengan keyset cursor (X-Next-Cursor)"""
+    samples = []
+    cursor = None
+    for _ in range(pages):
+        params = {"limit": limit, "sort": sort}
+        if cursor:
+            params["cursor"] = cursor
+        response, seconds = timed(lambda: client.get("/api/v1/customers/", params=params))
+        response.raise_for_status()
+        samples.append(seconds)
+
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    return latency_stats(samples, rows=len(samples) * limit)
+
+
+def bench_deep_offset(client, offset: int, calls: int = 20, limit: int = 100) -> dict:
+    """Halaman dalam lewat offset lama (pembanding keyset)"""
+    samples = []
+    for _ in range(calls):
+        _, seconds = timed(
+            lambda: client.get("/api/v1/customers/", params={"limit": limit, "offset": offset})
+        )
+        samples.append(seconds)
+    return {"offset": offset, **latency_stats(samples, rows=calls * limit)}
+
+
+def reset_tables(engine):
+    """Kosongkan data lead antar ukuran (skema & index tetap)"""
+    from sqlalchemy import delete
+    from sqlmodel import Session
+
+    from app.models.customer import Customer
+    from app.models.feature_importance import FeatureImportance
+
+    with Session(engine) as session:
+        session.exec(delete(Customer))
+        session.exec(delete(FeatureImportance))
+        session.commit()
+
+
+# =====================================================
+# Runner
+# =====================================================
+
+def run(sizes: list, calls: int, pages: int, workdir: str) -> dict:
+    # Settings dibaca saat import app -> environment di-set dulu
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["ML_PRELOAD"] = "false"
+    os.environ.setdefault("PREDICTION_CACHE_SIZE", "0")
+    os.environ.setdefault("PREDICT_BATCHING", "false")
+
+    from fastapi.testclient import TestClient
+
+    from app.db.session import engine
+    from app.main import app
+    from app.services.ml_service import ml_service
+    from app.services.upload_service import iter_csv_chunks
+
+    if not ml_service.ensure_loaded():
+        raise SystemExit(f"❌ ML artifacts not available: {ml_service.load_error}")
+
+    results = {"sizes": {}}
+
+    with TestClient(app) as client:
+        # Latency per lead (tidak tergantung ukuran file)
+        sample_path = write_csv(max(calls, 1), os.path.join(workdir, "sample.csv"), seed=7)
+        with open(sample_path, "rb") as f:
+            sample = next(iter_csv_chunks(f, chunk_size=calls))
+        records = sample.to_dict(orient="records")
+
+        results["predict"] = bench_single(ml_service.predict, records)
+        results["predict_and_explain"] = bench_single(ml_service.predict_and_explain, records)
+        results["contrib_parity"] = bench_contrib_parity(ml_service, sample)
+
+        for size in sizes:
+            print(f"⏱️  {size} rows ...")
+            path = write_csv(size, os.path.join(workdir, f"leads_{size}.csv"))
+            with open(path, "rb") as f:
+                df = next(iter_csv_chunks(f, chunk_size=size))
+
+            _, batch_seconds = timed(ml_service.predict_and_explain_batch, df)
+            reset_tables(engine)
+
+            results["sizes"][str(size)] = {
+                **bench_preprocess(ml_service, df),
+                "predict_and_explain_batch": throughput(batch_seconds, size),
+                "upload": bench_upload(client, path, size)
+            }
+
+        # List dijalankan pada data ukuran terbesar (hasil upload terakhir)
+        largest = max(sizes)
+        results["list"] = {
+            "rows_in_table": largest,
+            "keyset_id_asc": bench_list(client, pages, "id_asc"),
+            "keyset_score_desc": bench_list(client, pages, "score_desc"),
+            "deep_offset": bench_deep_offset(client, max(largest - 100, 0))
+        }
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """{"a": {"b": {"p95_ms": 1}}} -> {"a.b.p95_ms": 1} (hanya metrik yang dibandingkan)"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif any(name.endswith("." + metric) for metric, _ in COMPARED_METRICS):
+            flat[name] = value
+    return flat
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Cetak perbandingan dengan baseline; return daftar metrik yang regresi"""
+    now = flatten(current["results"])
+    before = flatten(baseline["results"])
+    higher_better = dict(COMPARED_METRICS)
+    regressions = []
+
+    print(f"\n📊 vs baseline {baseline['meta'].get('commit')} ({baseline['meta'].get('created_at')})")
+    for name in sorted(now.keys() & before.keys()):
+        old, new = before[name], now[name]
+        if not old or new is None:
+            continue
+
+        change = (new - old) / old
+        better = higher_better[name.rsplit(".", 1)[1]]
+        regressed = change < -threshold if better else change > threshold
+        if regressed:
+            regressions.append(name)
+
+        flag = "❌" if regressed else "  "
+        print(f"{flag} {name:<60} {old:>12.2f} -> {new:>12.2f} ({change:+.1%})")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SmartConvert benchmark suite")
+    parser.add_argument("--sizes", default="1000,10000", help="jumlah baris CSV, pisah koma")
+    parser.add_argument("--calls", type=int, default=300, help="panggilan single-lead")
+    parser.add_argument("--pages", type=int, default=100, help="halaman GET /customers")
+    parser.add_argument("--output", default="benchmarks/results/latest.json")
+    parser.add_argument("--compare", help="JSON baseline untuk dibandingkan")
+    parser.add_argument("--threshold", type=float, default=0.2, help="batas regresi (0.2 = 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    workdir = tempfile.mkdtemp(prefix="smartconvert_bench_")
+    try:
+        results = run(sizes, args.calls, args.pages, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sizes": sizes,
+            "calls": args.calls
+        },
+        "results": results
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Benchmark saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions and args.fail_on_regression:
+            raise SystemExit(f"❌ {len(regressions)} metric(s) regressed more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app.db.session membaca DATABASE_URL saat import: DB SQLite sementara untuk test
+os.environ.setdefault(
+    "DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="smartconvert_test_"), "test.db")
+)
+os.environ.setdefault("ML_PRELOAD", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def lead() -> dict:
+    """Satu lead valid (input model, format CustomerCreate)"""
+    return {
+        "age": 41, "job": "admin.", "marital": "married", "education": "university.degree",
+        "default": "no", "housing": "yes", "loan": "no", "contact": "cellular",
+        "month": "may", "day_of_week": "mon", "campaign": 1, "pdays": 999,
+        "previous": 0, "poutcome": "nonexistent", "emp_var_rate": -1.8,
+        "cons_price_idx": 92.893, "cons_conf_idx": -46.2, "euribor3m": 1.299,
+        "nr_employed": 5099.1
+    }
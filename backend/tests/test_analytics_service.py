@@ -0,0 +1,36 @@
+from app.services.analytics_service import AnalyticsService
+
+
+class FakeAnalytics(AnalyticsService):
+    def __init__(self, on_compute=None):
+        super().__init__(ttl=60)
+        self.calls = 0
+        self.on_compute = on_compute
+
+    def compute_summary(self, session):
+        self.calls += 1
+        if self.on_compute:
+            self.on_compute(self)
+        return {"total": self.calls}
+
+
+def test_summary_is_cached():
+    analytics = FakeAnalytics()
+
+    assert analytics.get_summary(None) == {"total": 1}
+    assert analytics.get_summary(None) == {"total": 1}
+
+    analytics.invalidate()
+    assert analytics.get_summary(None) == {"total": 2}
+
+
+def test_summary_invalidated_during_compute_is_not_cached():
+    # Write ter-commit (invalidate) saat ringkasan lama sedang dihitung
+    analytics = FakeAnalytics(on_compute=lambda service: service.invalidate())
+
+    assert analytics.get_summary(None) == {"total": 1}
+    assert analytics._summary is None
+
+    analytics.on_compute = None
+    assert analytics.get_summary(None) == {"total": 2}
+    assert analytics.get_summary(None) == {"total": 2}
@@ -0,0 +1,40 @@
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import select
+
+from app.models.customer import Customer
+from app.services.customer_query import apply_sort, decode_cursor, encode_cursor
+
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+@pytest.mark.parametrize("sort, key", [
+    ("id_asc", [7]),
+    ("id_desc", [7]),
+    ("score_desc", [0.25, 7]),
+    ("score_asc", [0.25, 7]),
+])
+def test_cursor_round_trip(sort, key):
+    customer = Customer(id=7, prediction_score=0.25)
+    assert decode_cursor(encode_cursor(customer, sort), sort) == key
+
+
+@pytest.mark.parametrize("cursor", [
+    "WzFd",                                           # [1] (format tanpa sort)
+    raw_cursor({"sort": "id_asc", "key": [1]}),       # sort lain
+    raw_cursor({"sort": "score_desc", "key": [1]}),   # jumlah nilai salah
+    raw_cursor({"sort": "score_desc", "key": ["x", 1]}),
+    raw_cursor({"sort": "score_desc", "key": [0.5, 1.5]}),
+    raw_cursor({"sort": "score_desc", "key": [0.5, True]}),
+    raw_cursor({"sort": "score_desc", "key": "0.5,1"}),
+    "not-base64!",
+])
+def test_invalid_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        apply_sort(select(Customer.id), "score_desc", cursor)
+    assert error.value.status_code == 400
@@ -0,0 +1,73 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from app.main import app
+from app.api.v1.endpoints import customers as customers_endpoint
+from app.db.session import create_db_and_tables, engine
+from app.models.customer import Customer
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def tables():
+    create_db_and_tables()
+
+
+def add_customers(lead: dict, count: int):
+    with Session(engine) as session:
+        for index in range(count):
+            session.add(Customer(**lead, prediction_score=0.1 * index))
+        session.commit()
+
+
+@pytest.mark.parametrize("limit", [0, -1, 1001])
+def test_list_rejects_out_of_range_limit(limit):
+    response = client.get("/api/v1/customers/", params={"limit": limit})
+    assert response.status_code == 422
+
+
+def test_list_rejects_negative_offset():
+    response = client.get("/api/v1/customers/", params={"offset": -1})
+    assert response.status_code == 422
+
+
+def test_list_pages_with_cursor(lead):
+    add_customers(lead, 3)
+
+    first = client.get("/api/v1/customers/", params={"limit": 2, "fields": "id"})
+    assert first.status_code == 200
+    assert len(first.json()) == 2
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get("/api/v1/customers/", params={"limit": 2, "fields": "id", "cursor": cursor})
+    assert second.status_code == 200
+    assert [row["id"] for row in second.json()] > [row["id"] for row in first.json()]
+
+
+def test_update_status(lead):
+    add_customers(lead, 1)
+    customer_id = client.get("/api/v1/customers/", params={"sort": "id_desc", "limit": 1}).json()[0]["id"]
+
+    response = client.patch(
+        f"/api/v1/customers/{customer_id}/status",
+        json={"lead_status": "CONTACTED", "sales_notes": "Called"}
+    )
+    assert response.status_code == 200
+    assert (response.json()["lead_status"], response.json()["sales_notes"]) == ("CONTACTED", "Called")
+
+
+def test_update_status_on_locked_database_is_429(lead, monkeypatch):
+    add_customers(lead, 1)
+    customer_id = client.get("/api/v1/customers/", params={"sort": "id_desc", "limit": 1}).json()[0]["id"]
+
+    def locked(session, write, rows=0, retries=None):
+        raise OperationalError("UPDATE", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(customers_endpoint, "write_with_retry", locked)
+    response = client.patch(f"/api/v1/customers/{customer_id}/status", json={"lead_status": "CONTACTED"})
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
@@ -0,0 +1,84 @@
+import pytest
+from sqlmodel import Session
+
+import app.main  # noqa: F401  semua model terdaftar di metadata
+from app.db.session import create_db_and_tables, engine
+from app.models.customer import Customer
+from app.services import explain_service
+from app.services.shap_storage import shap_storage
+from app.services.scoring_executor import ScoringBusyError, ScoringExecutor
+
+
+def test_lazy_explanation_is_rejected_when_scoring_is_full(monkeypatch):
+    executor = ScoringExecutor(workers=1, queue_size=0)
+    monkeypatch.setattr(explain_service, "scoring_executor", executor)
+    # Satu-satunya slot sedang dipakai scoring lain
+    assert executor._slots.acquire(blocking=False)
+
+    customer = Customer(age=30, prediction_score=0.5)
+    try:
+        with pytest.raises(ScoringBusyError):
+            explain_service.ensure_explanation(None, customer)
+    finally:
+        executor._slots.release()
+        executor.shutdown()
+
+
+@pytest.fixture
+def explained(monkeypatch):
+    """predict_and_explain tiruan: versi v1 masih ada, versi lain sudah dihapus"""
+    create_db_and_tables()
+    version = shap_storage.register(["explain_a", "explain_b"])
+    calls = []
+
+    def predict_and_explain(record, model_version=None):
+        calls.append(model_version)
+        if model_version not in (None, "explain_v1"):
+            raise KeyError(model_version)
+        return {
+            "score": 0.3 if model_version else 0.9,
+            "label": "Non-Potential" if model_version else "Potential",
+            "model_version": model_version or "explain_v2",
+            "shap_values": [0.1, 0.2], "shap_version": version, "script": "Call"
+        }
+
+    monkeypatch.setattr(explain_service.ml_service, "predict_and_explain", predict_and_explain)
+    return calls
+
+
+def stored_lead(lead: dict, model_version: str) -> Customer:
+    with Session(engine) as session:
+        customer = Customer(
+            **lead, prediction_score=0.31, prediction_label="Non-Potential", model_version=model_version
+        )
+        session.add(customer)
+        session.commit()
+        session.refresh(customer)
+        return customer
+
+
+def test_lead_is_explained_with_its_own_model(lead, explained):
+    customer_id = stored_lead(lead, "explain_v1").id
+
+    with Session(engine) as session:
+        customer = explain_service.ensure_explanation(session, session.get(Customer, customer_id))
+
+    assert explained == ["explain_v1"]
+    # Skor tersimpan tidak diubah, SHAP dari model yang sama
+    assert (customer.prediction_score, customer.model_version) == (0.31, "explain_v1")
+    assert shap_storage.decode(customer.shap_values_blob, customer.shap_version) is not None
+
+
+def test_lead_of_retired_model_is_rescored(lead, explained):
+    customer_id = stored_lead(lead, "explain_v0").id
+
+    with Session(engine) as session:
+        explain_service.ensure_explanation(session, session.get(Customer, customer_id))
+
+    assert explained == ["explain_v0", None]
+    with Session(engine) as session:
+        customer = session.get(Customer, customer_id)
+        assert (customer.prediction_score, customer.prediction_label, customer.model_version) == (
+            0.9, "Potential", "explain_v2"
+        )
+        assert customer.recommendation_script == "Call"
@@ -0,0 +1,123 @@
+"""
+Parity FeatureEncoder (jalur prediksi) terhadap MLService.preprocess_data
+(versi pandas referensi), memakai daftar fitur model xgboost_tuned_v2.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.feature_encoder import CATEGORICAL_FIELDS, FeatureEncoder
+from app.services.ml_service import MLService
+from app.services.upload_validation import ALLOWED_VALUES
+
+# ml_artifacts/model_features.json (xgboost_tuned_v2)
+TRAINING_FEATURES = [
+    "age", "campaign", "previous", "emp.var.rate", "cons.price.idx", "cons.conf.idx",
+    "euribor3m", "nr.employed", "pernah_dihubungi",
+    "job_blue-collar", "job_entrepreneur", "job_housemaid", "job_management", "job_retired",
+    "job_self-employed", "job_services", "job_student", "job_technician", "job_unemployed",
+    "marital_married", "marital_single",
+    "education_basic.6y", "education_basic.9y", "education_high.school", "education_illiterate",
+    "education_professional.course", "education_university.degree",
+    "default_yes", "housing_yes", "loan_yes", "contact_telephone",
+    "month_aug", "month_dec", "month_jul", "month_jun", "month_mar", "month_may", "month_nov",
+    "month_oct", "month_sep",
+    "day_of_week_mon", "day_of_week_thu", "day_of_week_tue", "day_of_week_wed",
+    "poutcome_nonexistent", "poutcome_success",
+]
+
+
+def preprocess(df: pd.DataFrame) -> np.ndarray:
+    reference = SimpleNamespace(feature_columns=TRAINING_FEATURES)
+    return MLService.preprocess_data(reference, df).to_numpy(dtype=np.float32)
+
+
+def all_levels_frame(seed: int = 0) -> pd.DataFrame:
+    """Setiap nilai kategori muncul minimal sekali (termasuk kategori referensi)"""
+    rng = np.random.default_rng(seed)
+    n_rows = max(len(values) for values in ALLOWED_VALUES.values())
+    data = {
+        field: [values[row % len(values)] for row in range(n_rows)]
+        for field, values in ALLOWED_VALUES.items()
+    }
+    data.update({
+        "age": rng.integers(18, 90, n_rows),
+        "campaign": rng.integers(1, 10, n_rows),
+        "pdays": np.where(np.arange(n_rows) % 3 == 0, 999, rng.integers(0, 30, n_rows)),
+        "previous": rng.integers(0, 5, n_rows),
+        "emp_var_rate": rng.uniform(-3.4, 1.4, n_rows).round(1),
+        "cons_price_idx": rng.uniform(92.2, 94.8, n_rows).round(3),
+        "cons_conf_idx": rng.uniform(-50.8, -26.9, n_rows).round(1),
+        "euribor3m": rng.uniform(0.6, 5.0, n_rows).round(3),
+        "nr_employed": rng.uniform(4963.6, 5228.1, n_rows).round(1),
+    })
+    return pd.DataFrame(data)
+
+
+@pytest.fixture(scope="module")
+def encoder():
+    return FeatureEncoder(TRAINING_FEATURES)
+
+
+def test_categorical_fields_cover_dataset():
+    assert set(ALLOWED_VALUES) <= set(CATEGORICAL_FIELDS)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_encode_frame_matches_preprocess_data(encoder, seed):
+    df = all_levels_frame(seed)
+    np.testing.assert_array_equal(encoder.encode_frame(df), preprocess(df))
+
+
+def test_encode_records_matches_encode_frame(encoder):
+    df = all_levels_frame()
+    records = df.to_dict(orient="records")
+    np.testing.assert_array_equal(encoder.encode_records(records), encoder.encode_frame(df))
+
+
+def test_every_category_level_sets_its_slot(encoder):
+    """Tiap level non-referensi di training mengisi tepat satu slot One-Hot"""
+    df = all_levels_frame()
+    matrix = encoder.encode_frame(df)
+    for field, values in ALLOWED_VALUES.items():
+        for row, value in enumerate(df[field]):
+            name = f"{field}_{value}"
+            if name in TRAINING_FEATURES:
+                assert matrix[row, TRAINING_FEATURES.index(name)] == 1, name
+
+
+def test_underscore_category_values_match_dotted(encoder):
+    df = all_levels_frame()
+    underscored = df.assign(education=df["education"].str.replace(".", "_", regex=False))
+    np.testing.assert_array_equal(encoder.encode_frame(underscored), encoder.encode_frame(df))
+
+
+def test_single_row_uses_training_one_hot_slots(encoder):
+    """
+    Perubahan perilaku yang disengaja (dibanding jalur pandas lama):
+    untuk SATU baris, get_dummies(drop_first=True) di preprocess_data membuang
+    satu-satunya level yang ada, jadi semua kolom One-Hot bernilai 0 (lead
+    diperlakukan seperti kategori referensi). FeatureEncoder memakai slot
+    training, jadi lead yang sama mendapat encoding (dan skor) yang sama baik
+    di-score sendiri (/predict) maupun di dalam batch (upload). Skor single-row
+    yang tersimpan sebelum encoder dipakai bisa sedikit berbeda.
+    """
+    batch = all_levels_frame()
+    row = batch.iloc[[1]].reset_index(drop=True)
+    one_hot = [
+        index for index, name in enumerate(TRAINING_FEATURES)
+        if any(name.startswith(field + "_") for field in CATEGORICAL_FIELDS)
+    ]
+
+    legacy = preprocess(row)[0]
+    encoded = encoder.encode_one(row.iloc[0].to_dict())[0]
+
+    assert not legacy[one_hot].any()
+    assert encoded[one_hot].sum() > 0
+    # Encoding satu lead = encoding lead yang sama di dalam batch
+    np.testing.assert_array_equal(encoded, encoder.encode_frame(batch)[1])
+    # Kolom non-kategorikal tidak berubah
+    numeric = [index for index in range(len(TRAINING_FEATURES)) if index not in one_hot]
+    np.testing.assert_array_equal(encoded[numeric], legacy[numeric])
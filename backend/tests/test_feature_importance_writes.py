@@ -0,0 +1,95 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, func, select
+
+from app.main import app
+from app.api.v1.endpoints import customers as customers_endpoint
+from app.db.session import create_db_and_tables, engine
+from app.models.customer import Customer
+from app.models.feature_importance import FeatureImportance, LABEL_ALL
+from app.services import explain_service
+from app.services.feature_importance_service import feature_importance_service
+from app.services.shap_storage import shap_storage
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def tables():
+    create_db_and_tables()
+
+
+@pytest.fixture
+def prediction():
+    version = shap_storage.register(["fiw_a", "fiw_b"])
+    return {
+        "score": 0.8, "label": "Potential", "model_version": "test",
+        "shap_values": [0.5, -0.25], "shap_version": version, "script": "Call now"
+    }
+
+
+def aggregate_count() -> int:
+    with Session(engine) as session:
+        row = session.exec(
+            select(FeatureImportance)
+            .where(FeatureImportance.feature == "fiw_a")
+            .where(FeatureImportance.prediction_label == LABEL_ALL)
+        ).first()
+        return row.count if row else 0
+
+
+def customer_count() -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count(Customer.id))).one()
+
+
+def test_predict_saves_lead_and_aggregate_together(lead, prediction, monkeypatch):
+    monkeypatch.setattr(customers_endpoint.prediction_batcher, "predict", lambda record, explain: prediction)
+    monkeypatch.setattr(customers_endpoint.shadow_service, "submit", lambda *args: None)
+
+    before = aggregate_count()
+    response = client.post("/api/v1/customers/predict", json=lead)
+    assert response.status_code == 200
+    assert aggregate_count() == before + 1
+
+
+def test_predict_aggregate_failure_is_not_swallowed(lead, prediction, monkeypatch):
+    def broken(session, predictions, sign=1):
+        raise RuntimeError("aggregate failed")
+
+    monkeypatch.setattr(customers_endpoint.prediction_batcher, "predict", lambda record, explain: prediction)
+    monkeypatch.setattr(customers_endpoint.feature_importance_service, "apply", broken)
+    before = customer_count()
+
+    with pytest.raises(RuntimeError, match="aggregate failed"):
+        client.post("/api/v1/customers/predict", json=lead)
+    # Lead tidak tersimpan tanpa agregatnya
+    assert customer_count() == before
+
+
+def test_lazy_explanation_counts_a_lead_once(lead, prediction, monkeypatch):
+    monkeypatch.setattr(
+        explain_service.ml_service, "predict_and_explain", lambda record, model_version=None: prediction
+    )
+
+    with Session(engine) as session:
+        never_explained = Customer(
+            **lead, prediction_score=0.8, prediction_label="Potential", model_version="test"
+        )
+        # Blob dari versi fitur yang tidak dikenal lagi: sudah masuk agregat
+        unreadable = Customer(
+            **lead, prediction_score=0.8, prediction_label="Potential", model_version="test",
+            shap_values_blob=b"\x00" * 8, shap_version="gone"
+        )
+        session.add(never_explained)
+        session.add(unreadable)
+        session.commit()
+        before = aggregate_count()
+
+        explain_service.ensure_explanation(session, unreadable)
+        assert aggregate_count() == before
+        assert shap_storage.decode(unreadable.shap_values_blob, unreadable.shap_version) is not None
+
+        explain_service.ensure_explanation(session, never_explained)
+        explain_service.ensure_explanation(session, never_explained)
+        assert aggregate_count() == before + 1
@@ -0,0 +1,109 @@
+"""
+Parity jalur native XGBoost terhadap jalur referensi, pada sampel tetap:
+- Booster.inplace_predict (ModelBundle.predict_scores) vs predict_proba
+- pred_contribs (BoosterExplainer) vs shap.TreeExplainer
+Dijalankan untuk model kecil yang dilatih di test (early stopping, jadi
+iteration_range ikut diuji) dan model ml_artifacts bila tersedia.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.explain_engine import BoosterExplainer
+from app.services.ml_service import ml_service
+from app.services.model_registry import MODEL_NAME, ModelRegistry
+
+TOLERANCE = 1e-5
+N_FEATURES = 12
+
+
+def sample_matrix(n_rows: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, N_FEATURES)).astype(np.float32)
+    # Sebagian kolom biner (seperti One-Hot)
+    X[:, N_FEATURES // 2:] = X[:, N_FEATURES // 2:] > 0.5
+    return X
+
+
+def train_model_version(folder):
+    """Model XGBoost kecil (binary:logistic + early stopping) sebagai versi registry"""
+    import xgboost as xgb
+
+    X = sample_matrix(2000, seed=1)
+    logits = X[:, 0] - 0.8 * X[:, 1] + 1.5 * X[:, 7] + 0.3 * X[:, 2] * X[:, 3]
+    y = (logits + np.random.default_rng(2).normal(scale=0.5, size=len(X)) > 0).astype(int)
+
+    model = xgb.XGBClassifier(
+        n_estimators=200, max_depth=4, learning_rate=0.1,
+        objective="binary:logistic", early_stopping_rounds=10, random_state=0
+    )
+    model.fit(X[:1500], y[:1500], eval_set=[(X[1500:], y[1500:])], verbose=False)
+
+    os.makedirs(folder)
+    model.save_model(os.path.join(folder, "model.ubj"))
+    with open(os.path.join(folder, "model_features.json"), "w") as f:
+        json.dump([f"f{index}" for index in range(N_FEATURES)], f)
+
+
+@pytest.fixture(scope="module", params=["trained", "artifacts"])
+def bundle_and_sample(request, tmp_path_factory):
+    if request.param == "trained":
+        root = tmp_path_factory.mktemp("artifacts")
+        train_model_version(str(root / "v1"))
+        bundle = ModelRegistry(str(root)).load("v1")
+        return bundle, sample_matrix(500, seed=3)
+
+    registry = ModelRegistry(ml_service.artifacts_path)
+    if MODEL_NAME not in registry.versions():
+        pytest.skip("ml_artifacts tidak tersedia")
+    bundle = registry.load(MODEL_NAME)
+
+    from benchmarks.synthetic_data import generate
+    from app.services.upload_service import normalize_columns
+
+    return bundle, bundle.encoder.encode_frame(normalize_columns(generate(500, seed=3)))
+
+
+def test_inplace_predict_matches_predict_proba(bundle_and_sample, monkeypatch):
+    bundle, X = bundle_and_sample
+    assert bundle.booster is not None
+
+    monkeypatch.setattr(settings, "INFERENCE_BACKEND", "native")
+    native = bundle.predict_scores(X)
+    monkeypatch.setattr(settings, "INFERENCE_BACKEND", "sklearn")
+    reference = bundle.predict_scores(X)
+
+    np.testing.assert_allclose(native, bundle.model.predict_proba(X)[:, 1], atol=TOLERANCE)
+    np.testing.assert_allclose(native, reference, atol=TOLERANCE)
+
+
+def test_pred_contribs_match_tree_explainer(bundle_and_sample):
+    shap = pytest.importorskip("shap")
+    bundle, X = bundle_and_sample
+
+    native = BoosterExplainer(bundle.model).shap_values(X)
+    reference = np.asarray(shap.TreeExplainer(bundle.model).shap_values(X))
+
+    assert native.shape == (len(X), len(bundle.feature_columns))
+    np.testing.assert_allclose(native, reference, atol=TOLERANCE)
+
+
+def test_pred_contribs_add_up_to_margin(bundle_and_sample):
+    """sigmoid(sum SHAP + bias) = skor (iteration_range sama dengan predict_proba)"""
+    import xgboost as xgb
+
+    bundle, X = bundle_and_sample
+    explainer = BoosterExplainer(bundle.model)
+    contribs = explainer.booster.predict(
+        xgb.DMatrix(X), pred_contribs=True, iteration_range=explainer.iteration_range,
+        validate_features=False
+    )
+    scores = bundle.model.predict_proba(X)[:, 1]
+
+    # Dibandingkan di ruang probabilitas (logit skor float32 dekat 0/1 tidak presisi)
+    np.testing.assert_allclose(
+        1 / (1 + np.exp(-contribs.sum(axis=1, dtype=np.float64))), scores, atol=TOLERANCE
+    )
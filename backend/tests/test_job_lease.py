@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session
+
+import app.main  # noqa: F401  semua model terdaftar di metadata
+from app.core.config import settings
+from app.db.session import create_db_and_tables, engine, write_with_retry
+from app.models.job import JOB_QUEUED, JOB_RUNNING, UploadJob
+from app.models.rescore import RescoreJob
+from app.services import job_lease
+from app.services.job_lease import LeaseLostError
+
+
+@pytest.fixture(autouse=True)
+def tables():
+    create_db_and_tables()
+
+
+def new_job(**fields) -> int:
+    with Session(engine) as session:
+        job = UploadJob(filename="leads.csv", file_path="/tmp/missing.csv", **fields)
+        session.add(job)
+        session.commit()
+        return job.id
+
+
+def claim(job_id: int) -> bool:
+    with Session(engine) as session:
+        return write_with_retry(session, lambda s: job_lease.claim(s, UploadJob, job_id))
+
+
+def test_only_one_worker_claims_a_queued_job():
+    job_id = new_job()
+
+    assert claim(job_id)
+    assert not claim(job_id)
+
+    with Session(engine) as session:
+        job = session.get(UploadJob, job_id)
+        assert job.status == JOB_RUNNING
+        assert job.owner == job_lease.OWNER_ID
+        assert job.started_at is not None
+
+
+def test_rescore_job_is_claimed_once():
+    with Session(engine) as session:
+        job = RescoreJob()
+        session.add(job)
+        session.commit()
+        job_id = job.id
+
+    with Session(engine) as session:
+        assert write_with_retry(session, lambda s: job_lease.claim(s, RescoreJob, job_id))
+        assert not write_with_retry(session, lambda s: job_lease.claim(s, RescoreJob, job_id))
+
+
+def test_running_job_is_claimable_only_after_lease_expires():
+    fresh = datetime.utcnow()
+    stale = fresh - timedelta(seconds=settings.JOB_LEASE_SECONDS + 1)
+
+    assert not claim(new_job(status=JOB_RUNNING, owner="other", heartbeat_at=fresh))
+    assert claim(new_job(status=JOB_RUNNING, owner="other", heartbeat_at=stale))
+    # Job RUNNING dari versi sebelum lease (tanpa heartbeat)
+    assert claim(new_job(status=JOB_RUNNING))
+
+
+def test_renew_fails_once_another_worker_took_over():
+    job_id = new_job(status=JOB_QUEUED)
+    assert claim(job_id)
+
+    with Session(engine) as session:
+        job_lease.renew(session, UploadJob, job_id)
+        session.commit()
+
+        job = session.get(UploadJob, job_id)
+        job.owner = "other"
+        session.add(job)
+        session.commit()
+
+        with pytest.raises(LeaseLostError):
+            job_lease.renew(session, UploadJob, job_id)
+        session.rollback()
+
+
+def test_expires_in():
+    job = UploadJob(filename="x", file_path="x", status=JOB_RUNNING, heartbeat_at=datetime.utcnow())
+    assert 0 < job_lease.expires_in(job) <= settings.JOB_LEASE_SECONDS
+
+    job.heartbeat_at -= timedelta(seconds=settings.JOB_LEASE_SECONDS + 1)
+    assert job_lease.expires_in(job) is None
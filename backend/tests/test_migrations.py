@@ -0,0 +1,112 @@
+from sqlalchemy import create_engine, inspect, text
+
+import app.main  # noqa: F401  semua model terdaftar di metadata
+from app.db.session import add_missing_columns, create_db_and_tables
+
+# Skema tabel customer sebelum kolom hasil model / shadow / SHAP blob ditambahkan
+BASELINE_CUSTOMER = """
+CREATE TABLE customer (
+    age INTEGER NOT NULL, job VARCHAR NOT NULL, marital VARCHAR NOT NULL,
+    education VARCHAR NOT NULL, "default" VARCHAR NOT NULL, housing VARCHAR NOT NULL,
+    loan VARCHAR NOT NULL, contact VARCHAR NOT NULL, month VARCHAR NOT NULL,
+    day_of_week VARCHAR NOT NULL, campaign INTEGER NOT NULL, pdays INTEGER NOT NULL,
+    previous INTEGER NOT NULL, poutcome VARCHAR NOT NULL, emp_var_rate FLOAT NOT NULL,
+    cons_price_idx FLOAT NOT NULL, cons_conf_idx FLOAT NOT NULL, euribor3m FLOAT NOT NULL,
+    nr_employed FLOAT NOT NULL, lead_status VARCHAR NOT NULL, sales_notes VARCHAR,
+    id INTEGER NOT NULL, created_at DATETIME NOT NULL,
+    prediction_score FLOAT, prediction_label VARCHAR, shap_values_json VARCHAR,
+    recommendation_script VARCHAR,
+    PRIMARY KEY (id)
+)
+"""
+
+BASELINE_ROW = """
+INSERT INTO customer VALUES (
+    41, 'admin.', 'married', 'university.degree', 'no', 'yes', 'no', 'cellular',
+    'may', 'mon', 1, 999, 0, 'nonexistent', 1.1, 93.994, -36.4, 4.857, 5191.0,
+    'NEW', NULL, 1, '2024-01-01 00:00:00', 0.42, 'Non-Potential', '{"age": 0.1}', 'Halo'
+)
+"""
+
+
+def baseline_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(BASELINE_CUSTOMER))
+        connection.execute(text(BASELINE_ROW))
+    return engine
+
+
+def columns(engine, table: str) -> set:
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+
+def test_baseline_database_gets_new_columns_and_indexes(tmp_path):
+    engine = baseline_engine(tmp_path)
+
+    create_db_and_tables(engine)
+
+    assert {"model_version", "shadow_score", "shadow_model_version"} <= columns(engine, "customer")
+    indexes = {index["name"] for index in inspect(engine).get_indexes("customer")}
+    assert "ix_customer_model_version" in indexes
+
+
+def test_migration_is_idempotent(tmp_path):
+    engine = baseline_engine(tmp_path)
+
+    create_db_and_tables(engine)
+    assert add_missing_columns(engine) == []
+    create_db_and_tables(engine)
+
+    with engine.connect() as connection:
+        row = connection.execute(
+            text("SELECT prediction_score, model_version FROM customer WHERE id = 1")
+        ).one()
+    assert row == (0.42, None)
+
+
+def test_baseline_rows_readable_with_shap_blob_columns(tmp_path):
+    from sqlmodel import Session
+    from app.models.customer import Customer
+
+    engine = baseline_engine(tmp_path)
+    create_db_and_tables(engine)
+
+    assert {"shap_values_blob", "shap_version"} <= columns(engine, "customer")
+    with Session(engine) as session:
+        customer = session.get(Customer, 1)
+    assert customer.shap_values_json == '{"age": 0.1}'
+    assert customer.shap_values_blob is None and customer.shap_version is None
+
+
+# Tabel job upload sebelum laporan error (error_report_id) ditambahkan
+UPLOAD_JOB_WITHOUT_REPORT = """
+CREATE TABLE uploadjob (
+    filename VARCHAR NOT NULL, status VARCHAR NOT NULL,
+    rows_done INTEGER NOT NULL, rows_failed INTEGER NOT NULL, potential INTEGER NOT NULL,
+    sample_error VARCHAR, error VARCHAR,
+    created_at DATETIME NOT NULL, started_at DATETIME, finished_at DATETIME,
+    id INTEGER NOT NULL, file_path VARCHAR NOT NULL,
+    PRIMARY KEY (id)
+)
+"""
+
+
+def test_upload_job_gets_error_report_id(tmp_path):
+    from sqlmodel import Session
+    from app.models.job import UploadJob
+
+    engine = baseline_engine(tmp_path)
+    with engine.begin() as connection:
+        connection.execute(text(UPLOAD_JOB_WITHOUT_REPORT))
+        connection.execute(text(
+            "INSERT INTO uploadjob VALUES ('a.csv', 'COMPLETED', 10, 0, 3, NULL, NULL, "
+            "'2024-01-01 00:00:00', NULL, NULL, 1, '/tmp/a.csv')"
+        ))
+
+    create_db_and_tables(engine)
+
+    assert "error_report_id" in columns(engine, "uploadjob")
+    with Session(engine) as session:
+        job = session.get(UploadJob, 1)
+    assert job.rows_done == 10 and job.error_report_id is None
@@ -0,0 +1,56 @@
+import pytest
+
+from app.services import ml_service as ml_module
+from app.services.ml_service import MLService
+
+
+class FakeBundle:
+    def __init__(self, version: str):
+        self.version = version
+
+
+class FakeRegistry:
+    def __init__(self, versions: list):
+        self.versions = versions
+        self.loaded = []
+
+    def load(self, version: str):
+        if version not in self.versions:
+            raise KeyError(version)
+        self.loaded.append(version)
+        return FakeBundle(version)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = MLService()
+    service.active = FakeBundle("v3")
+    service.registry = FakeRegistry(["v0", "v1", "v2", "v3"])
+    retired = []
+    monkeypatch.setattr(service, "_retire", retired.append)
+    service.retired = retired
+    return service
+
+
+def test_active_version_is_not_reloaded(service):
+    assert service.bundle_for("v3") is service.active
+    assert service.registry.loaded == []
+
+
+def test_archived_versions_are_cached_lru(service, monkeypatch):
+    monkeypatch.setattr(ml_module, "ARCHIVED_BUNDLE_LIMIT", 2)
+
+    first = service.bundle_for("v1")
+    service.bundle_for("v2")
+    assert service.bundle_for("v1") is first
+    service.bundle_for("v0")
+
+    # v2 paling lama tidak dipakai: dikeluarkan & di-shutdown setelah jeda
+    assert list(service._archived) == ["v1", "v0"]
+    assert [bundle.version for bundle in service.retired] == ["v2"]
+    assert service.registry.loaded == ["v1", "v2", "v0"]
+
+
+def test_removed_version_raises_key_error(service):
+    with pytest.raises(KeyError):
+        service.bundle_for("v9")
@@ -0,0 +1,31 @@
+import pytest
+
+from app.services import prediction_batcher as batcher_module
+from app.services.prediction_batcher import PredictionBatcher
+
+
+@pytest.fixture
+def batcher():
+    batcher = PredictionBatcher(max_size=8, max_wait_ms=1)
+    yield batcher
+    batcher.shutdown()
+
+
+def test_failure_outside_scoring_fails_every_future(batcher, monkeypatch):
+    def broken(*args, **kwargs):
+        raise ValueError("metrics broken")
+
+    monkeypatch.setattr(batcher_module.metrics, "observe_stage", broken)
+    futures = [batcher.submit({"age": 30}, explain) for explain in (False, True)]
+
+    for future in futures:
+        with pytest.raises(ValueError, match="metrics broken"):
+            future.result(timeout=5)
+
+
+def test_missing_results_fail_the_remaining_futures(batcher, monkeypatch):
+    monkeypatch.setattr(batcher_module.ml_service, "predict_records", lambda records: [])
+    future = batcher.submit({"age": 30}, False)
+
+    with pytest.raises(RuntimeError, match="no result"):
+        future.result(timeout=5)
@@ -0,0 +1,64 @@
+import numpy as np
+
+from app.services.prediction_cache import PredictionCache
+
+
+def entry(score: float, shap_values=None) -> dict:
+    return {"score": score, "label": "Potential", "shap_values": shap_values, "script": None}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_size=2)
+    cache.put(b"a", entry(0.1))
+    cache.put(b"b", entry(0.2))
+    cache.get(b"a")
+    cache.put(b"c", entry(0.3))
+
+    assert cache.get(b"b") is None
+    assert cache.get(b"a")["score"] == 0.1
+    assert cache.get(b"c")["score"] == 0.3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_hit_and_miss_counters():
+    cache = PredictionCache(max_size=4)
+    cache.put(b"a", entry(0.1))
+
+    cache.get(b"a")
+    cache.get(b"missing")
+    # Entry tanpa SHAP dihitung miss untuk explain
+    cache.get(b"a", need_shap=True)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 2, 1 / 3)
+
+
+def test_keys_include_model_version():
+    cache = PredictionCache(max_size=4)
+    X = np.array([[1.0, 2.0], [1.0, 2.0], [3.0, 4.0]])
+
+    old, same, other = cache.keys_for(X, "v1")
+    assert old == same != other
+
+    cache.put(old, entry(0.1))
+    # Setelah hot swap versi baru tidak memakai skor versi lama
+    (new,) = cache.keys_for(X[:1], "v2")
+    assert new != old
+    assert cache.get(new) is None
+
+
+def test_shap_row_does_not_keep_batch_matrix_alive():
+    cache = PredictionCache(max_size=4)
+    batch = np.arange(2000, dtype=np.float64).reshape(1000, 2)
+    cache.put(b"a", entry(0.1, batch[3]))
+
+    cached = cache.get(b"a", need_shap=True)["shap_values"]
+    assert cached.base is None
+    np.testing.assert_array_equal(cached, [6.0, 7.0])
+
+
+def test_disabled_cache():
+    cache = PredictionCache(max_size=0)
+    cache.put(b"a", entry(0.1))
+    assert cache.get(b"a") is None
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,161 @@
+import pytest
+from sqlmodel import Session, select
+
+import app.main  # noqa: F401  semua model terdaftar di metadata
+from app.core.config import settings
+from app.db.session import create_db_and_tables, engine
+from app.models.customer import Customer
+from app.models.feature_importance import FeatureImportance
+from app.models.job import JOB_COMPLETED, JOB_QUEUED
+from app.models.rescore import RescoreJob, RescoreRequest
+from app.services import rescore_service as rescore_module
+from app.services.feature_importance_service import feature_importance_service
+from app.services.rescore_service import RescoreService
+from app.services.shap_storage import shap_storage
+
+# Status lead khusus test: seleksi tidak menyentuh lead dari test lain
+STATUS = "RESCORE_TEST"
+
+
+class FakeModel:
+    """ml_service tiruan: skor tetap, SHAP [0.5, -0.25], mencatat lead yang di-score"""
+
+    model_version = "rescore_v2"
+    load_error = None
+
+    def __init__(self, version: str):
+        self.shap_version = version
+        self.scored = []
+
+    def ensure_loaded(self) -> bool:
+        return True
+
+    def predict_and_explain_batch(self, df):
+        self.scored.extend(df["age"].tolist())
+        return [
+            {
+                "score": 0.9, "label": "Potential", "model_version": self.model_version,
+                "shap_values": [0.5, -0.25], "shap_version": self.shap_version, "script": "Call"
+            }
+            for _ in range(len(df))
+        ]
+
+
+@pytest.fixture
+def model(monkeypatch):
+    create_db_and_tables()
+    with Session(engine) as session:
+        for customer in session.exec(select(Customer).where(Customer.lead_status == STATUS)):
+            session.delete(customer)
+        session.commit()
+
+    model = FakeModel(shap_storage.register(["rescore_a", "rescore_b"]))
+    monkeypatch.setattr(rescore_module, "ml_service", model)
+    monkeypatch.setattr(rescore_module, "is_lazy", lambda: False)
+    return model
+
+
+def add_leads(lead: dict, rows: list) -> list:
+    """rows: (age, euribor3m, model_version, status); SHAP lama [1, 1] label Non-Potential"""
+    version = shap_storage.register(["rescore_a", "rescore_b"])
+    old = [{"label": "Non-Potential", "shap_values": [1.0, 1.0], "shap_version": version}]
+    with Session(engine) as session:
+        customers = []
+        for age, euribor3m, model_version, status in rows:
+            customer = Customer(
+                **{**lead, "age": age, "euribor3m": euribor3m},
+                lead_status=status,
+                prediction_score=0.1,
+                prediction_label="Non-Potential",
+                model_version=model_version,
+                **shap_storage.to_columns([1.0, 1.0], version)
+            )
+            session.add(customer)
+            feature_importance_service.apply(session, old)
+            customers.append(customer)
+        session.commit()
+        return [customer.id for customer in customers]
+
+
+def aggregate(label: str) -> tuple:
+    with Session(engine) as session:
+        row = session.exec(
+            select(FeatureImportance)
+            .where(FeatureImportance.feature == "rescore_a")
+            .where(FeatureImportance.prediction_label == label)
+        ).first()
+        return (row.count, round(row.shap_sum, 6)) if row else (0, 0.0)
+
+
+def request(**fields) -> RescoreRequest:
+    return RescoreRequest(lead_statuses=[STATUS], **fields)
+
+
+def test_selection_only_changed_or_stale_open_leads(model, lead):
+    add_leads(lead, [
+        (30, 1.0, "rescore_v2", STATUS),     # makro berbeda
+        (31, 3.2, "rescore_v2", STATUS),     # tidak berubah
+        (32, 3.2, "rescore_v1", STATUS),     # model lain
+        (33, 1.0, "rescore_v2", "CLOSED"),   # status lain
+    ])
+    service = RescoreService(chunk_size=10, pause_ms=0)
+
+    with Session(engine) as session:
+        assert service.count_affected(session, request(euribor3m=3.2)) == 2
+        assert service.count_affected(session, request(euribor3m=3.2, include_stale_model=False)) == 1
+        assert service.count_affected(session, request()) == 1
+        assert service.count_affected(session, request(include_stale_model=False)) == 0
+
+
+def test_resume_continues_from_checkpoint(model, lead):
+    ids = add_leads(lead, [(40 + index, 1.0, "rescore_v2", STATUS) for index in range(5)])
+    service = RescoreService(chunk_size=2, pause_ms=0)
+
+    with Session(engine) as session:
+        job_id = service.create_job(session, request(euribor3m=3.2), enqueue=False).id
+
+    # Shutdown setelah chunk pertama: job kembali QUEUED dengan checkpoint
+    assert service.run_job(job_id, progress=lambda job: service._stop.set()) == JOB_QUEUED
+    with Session(engine) as session:
+        job = session.get(RescoreJob, job_id)
+        assert (job.last_id, job.rows_done) == (ids[1], 2)
+
+    service._stop.clear()
+    assert service.run_job(job_id) == JOB_COMPLETED
+    # Tiap lead di-score tepat sekali
+    assert sorted(model.scored) == [40, 41, 42, 43, 44]
+
+    with Session(engine) as session:
+        job = session.get(RescoreJob, job_id)
+        assert (job.rows_done, job.rows_label_changed) == (5, 5)
+        assert all(
+            customer.euribor3m == 3.2 and customer.prediction_label == "Potential"
+            for customer in session.exec(select(Customer).where(Customer.id.in_(ids)))
+        )
+
+    # Job selesai tidak bisa diklaim lagi
+    assert service.run_job(job_id) is None
+
+
+def test_old_shap_is_subtracted_from_aggregate(model, lead):
+    add_leads(lead, [(50 + index, 1.0, "rescore_v2", STATUS) for index in range(3)])
+    non_potential, potential = aggregate("Non-Potential"), aggregate("Potential")
+    service = RescoreService(chunk_size=2, pause_ms=0)
+
+    with Session(engine) as session:
+        job_id = service.create_job(session, request(euribor3m=3.2), enqueue=False).id
+    assert service.run_job(job_id) == JOB_COMPLETED
+
+    # SHAP lama (1.0, Non-Potential) keluar, SHAP baru (0.5, Potential) masuk
+    assert aggregate("Non-Potential") == (non_potential[0] - 3, round(non_potential[1] - 3.0, 6))
+    assert aggregate("Potential") == (potential[0] + 3, round(potential[1] + 1.5, 6))
+
+
+def test_locked_database_is_retried_in_process(monkeypatch):
+    service = RescoreService(chunk_size=2, pause_ms=0)
+    outcomes = [JOB_QUEUED, JOB_QUEUED, JOB_COMPLETED]
+    monkeypatch.setattr(service, "run_job", lambda job_id, progress=None: outcomes.pop(0))
+    monkeypatch.setattr(settings, "DB_LOCK_RETRY_DELAY", 0)
+
+    assert service.run_with_retry(1) == JOB_COMPLETED
+    assert outcomes == []
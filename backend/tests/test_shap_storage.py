@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import app.main  # noqa: F401  semua model terdaftar di metadata
+from app.db.session import create_db_and_tables
+from app.models.customer import Customer
+from app.services.shap_storage import ShapStorage, has_shap, shap_storage
+
+
+@pytest.fixture(autouse=True)
+def tables():
+    create_db_and_tables()
+
+
+def test_blob_decodes_in_process_that_never_loaded_the_model():
+    writer = ShapStorage()
+    version = writer.register(["age", "euribor3m", "contact_telephone"])
+    columns = writer.to_columns([0.5, -1.25, 0.0], version)
+
+    # Proses baru (cache kosong): daftar fitur dibaca dari shap_feature_set
+    reader = ShapStorage()
+    features, values = reader.decode(columns["shap_values_blob"], version)
+
+    assert features == ["age", "euribor3m", "contact_telephone"]
+    np.testing.assert_allclose(values, [0.5, -1.25, 0.0])
+    assert reader.features(version) == features
+
+
+def test_register_is_idempotent():
+    first = ShapStorage().register(["a", "b"])
+    second = ShapStorage().register(["a", "b"])
+    assert first == second
+
+
+def test_unknown_version_is_not_treated_as_explained():
+    blob = np.zeros(3, dtype=np.float32).tobytes()
+
+    assert shap_storage.decode(blob, "doesnotexist") is None
+    with pytest.raises(KeyError):
+        shap_storage.features("doesnotexist")
+
+    customer = Customer(shap_values_blob=blob, shap_version="doesnotexist")
+    assert not has_shap(customer)
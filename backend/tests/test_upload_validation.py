@@ -0,0 +1,134 @@
+import csv
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.db.session import create_db_and_tables, engine
+from app.models.job import JOB_COMPLETED, UploadJob
+from app.services import job_service as job_module
+from app.services.job_service import JobService
+from app.services.upload_validation import (
+    ErrorReport,
+    MissingColumnsError,
+    REPORT_COLUMNS,
+    report_path,
+    validate_chunk
+)
+
+
+def frame(lead: dict, *changes: dict) -> pd.DataFrame:
+    return pd.DataFrame([{**lead, **change} for change in changes])
+
+
+def test_valid_rows_are_coerced_to_field_types(lead):
+    valid, report = validate_chunk(frame(lead, {"age": "41"}, {"education": "high_school"}))
+
+    assert report.empty
+    assert len(valid) == 2
+    assert valid["age"].tolist() == [41, 41]
+
+
+def test_invalid_category_is_reported(lead):
+    valid, report = validate_chunk(frame(lead, {}, {"job": "astronaut"}, {"month": "May"}))
+
+    assert valid.index.tolist() == [0]
+    assert report[REPORT_COLUMNS].values.tolist() == [
+        [1, "job", "astronaut", "invalid category"],
+        [2, "month", "May", "invalid category"],
+    ]
+
+
+def test_numeric_range_violations_are_reported(lead):
+    valid, report = validate_chunk(frame(lead, {"age": 12}, {"campaign": 0}, {"euribor3m": 25.0}))
+
+    assert valid.empty
+    assert report[["row", "field", "error"]].values.tolist() == [
+        [0, "age", "out of range [17, 100]"],
+        [1, "campaign", "out of range [1, 100]"],
+        [2, "euribor3m", "out of range [-5, 20]"],
+    ]
+
+
+def test_type_errors_are_reported_per_field(lead):
+    valid, report = validate_chunk(frame(lead, {"age": "abc", "pdays": 1.5, "marital": " "}))
+
+    assert valid.empty
+    assert report[["field", "error"]].values.tolist() == [
+        ["age", "not a number"],
+        ["marital", "missing value"],
+        ["pdays", "must be an integer"],
+    ]
+
+
+def test_missing_columns_reject_the_file(lead):
+    df = frame(lead, {}).drop(columns=["age", "euribor3m"])
+
+    with pytest.raises(MissingColumnsError, match="age, euribor3m"):
+        validate_chunk(df)
+
+
+def test_report_is_not_duplicated_when_chunk_write_is_retried(lead, tmp_path, monkeypatch):
+    create_db_and_tables()
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DB_LOCK_RETRY_DELAY", 0)
+
+    csv_path = tmp_path / "leads.csv"
+    frame(lead, {"age": 5}, {}, {}, {"job": "astronaut"}).to_csv(csv_path, index=False)
+    monkeypatch.setattr(settings, "CSV_CHUNK_SIZE", 2)
+
+    # Chunk kedua gagal commit selama semua retry write (job kembali QUEUED),
+    # lalu berhasil saat job dilanjutkan dari checkpoint chunk pertama
+    attempts = []
+
+    def save_chunk(session, result):
+        attempts.append(1)
+        if 1 < len(attempts) <= settings.DB_LOCK_RETRIES + 2:
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    def score_chunk(chunk):
+        valid, report = validate_chunk(chunk)
+        return {
+            "processed": len(valid), "failed": report["row"].nunique(), "potential": 0,
+            "error_report": report, "sample_error": None, "rows": [], "predictions": [],
+            "shadow_batch": None
+        }
+
+    monkeypatch.setattr(job_module, "save_chunk", save_chunk)
+    monkeypatch.setattr(job_module, "score_chunk", score_chunk)
+
+    with Session(engine) as session:
+        job = UploadJob(filename="leads.csv", file_path=str(csv_path))
+        session.add(job)
+        session.commit()
+        job_id = job.id
+
+    service = JobService(max_workers=1, max_pending=1)
+    monkeypatch.setattr(service, "schedule_prewarm", lambda: None)
+    service._run_and_release(job_id)
+
+    with Session(engine) as session:
+        job = session.get(UploadJob, job_id)
+        assert job.status == JOB_COMPLETED
+        assert (job.rows_done, job.rows_failed) == (2, 2)
+
+    assert len(attempts) == settings.DB_LOCK_RETRIES + 3
+    with open(report_path(job.error_report_id)) as f:
+        assert list(csv.reader(f)) == [
+            REPORT_COLUMNS,
+            ["0", "age", "5", "out of range [17, 100]"],
+            ["3", "job", "astronaut", "invalid category"],
+        ]
+
+
+def test_reserve_does_not_create_the_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    report = ErrorReport()
+
+    assert report.reserve(pd.DataFrame(columns=REPORT_COLUMNS)) is None
+    report_id = report.reserve(pd.DataFrame([[0, "age", 5, "out of range"]], columns=REPORT_COLUMNS))
+    assert report_id is not None
+    assert not os.path.exists(report_path(report_id))
@@ -8,28 +8,36 @@ import {
 } from 'recharts';
 import Aside from "../components/Aside";
 
-interface Customer {
-  id: number;
-  job: string;
-  marital: string;
-  education: string;
-  age: number;
-  housing: string;
-  loan: string;
-  campaign: number;
-  prediction_score: number;
-  prediction_label: string;
+interface Bucket {
+  name: string;
+  count: number;
+}
+
+interface Breakdown {
+  name: string;
+  count: number;
+  average_score: number | null;
+  potential: number;
+}
+
+interface AnalyticsSummary {
+  total: number;
+  score_tiers: { high: number; medium: number; low: number };
+  score_histogram: Bucket[];
+  age_groups: Bucket[];
+  loan_profile: Record<string, number>;
+  breakdowns: Record<string, Breakdown[]>;
 }
 
 export default function AnalyticsPage() {
-  const [data, setData] = useState<Customer[]>([]);
+  const [data, setData] = useState<AnalyticsSummary | null>(null);
   const [loading, setLoading] = useState(true);
 
-  // Fetch Data (Ambil banyak sampel untuk statistik)
+  // Fetch ringkasan (agregat dihitung di server untuk seluruh lead)
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const res = await fetch("http://127.0.0.1:8000/api/v1/customers?limit=2000", { cache: "no-store" });
+        const res = await fetch("http://127.0.0.1:8000/api/v1/analytics/summary", { cache: "no-store" });
         const json = await res.json();
         setData(json);
       } catch (e) {
@@ -41,63 +49,34 @@ export default function AnalyticsPage() {
     fetchData();
   }, []);
 
-  // --- STAT CALCULATION LOGIC ---
+  // --- STAT MAPPING (summary -> format chart) ---
 
   const stats = useMemo(() => {
-    if (!data.length) return null;
+    if (!data || !data.total) return null;
 
     // 1. KPI Cards
-    const total = data.length;
-    const high = data.filter(c => c.prediction_score > 0.7).length;
-    const medium = data.filter(c => c.prediction_score >= 0.4 && c.prediction_score <= 0.7).length;
-    const low = data.filter(c => c.prediction_score < 0.4).length;
-
-    // 2. Job Distribution (Top 5 + Others)
-    const jobCounts: Record<string, number> = {};
-    data.forEach(c => { jobCounts[c.job] = (jobCounts[c.job] || 0) + 1 });
-    const jobData = Object.entries(jobCounts)
-      .map(([name, value]) => ({ name, value }))
-      .sort((a, b) => b.value - a.value);
-    
+    const total = data.total;
+    const { high, medium, low } = data.score_tiers;
+
+    // 2. Job Distribution (Top 5 + Others) — breakdown sudah urut dari server
+    const jobData = data.breakdowns.job.map((j) => ({ name: j.name, value: j.count }));
     const topJobs = jobData.slice(0, 5);
     const otherJobs = jobData.slice(5).reduce((acc, curr) => acc + curr.value, 0);
     if (otherJobs > 0) topJobs.push({ name: 'Others', value: otherJobs });
 
-    // 3. Score Distribution (Histogram like)
-    const scoreBins = [
-      { name: '0-20%', count: 0 },
-      { name: '21-40%', count: 0 },
-      { name: '41-60%', count: 0 },
-      { name: '61-80%', count: 0 },
-      { name: '81-100%', count: 0 },
-    ];
-    data.forEach(c => {
-      const score = c.prediction_score * 100;
-      if (score <= 20) scoreBins[0].count++;
-      else if (score <= 40) scoreBins[1].count++;
-      else if (score <= 60) scoreBins[2].count++;
-      else if (score <= 80) scoreBins[3].count++;
-      else scoreBins[4].count++;
-    });
+    // 3. Score Distribution (Histogram)
+    const scoreBins = data.score_histogram;
 
     // 4. Age Groups
-    const ageGroups = { '18-25': 0, '26-35': 0, '36-45': 0, '46-55': 0, '56-65': 0, '65+': 0 };
-    data.forEach(c => {
-      if (c.age <= 25) ageGroups['18-25']++;
-      else if (c.age <= 35) ageGroups['26-35']++;
-      else if (c.age <= 45) ageGroups['36-45']++;
-      else if (c.age <= 55) ageGroups['46-55']++;
-      else if (c.age <= 65) ageGroups['56-65']++;
-      else ageGroups['65+']++;
-    });
-    const ageData = Object.entries(ageGroups).map(([name, value]) => ({ name, value }));
-
-    // 5. Financial Profile (Loans)
+    const ageData = data.age_groups.map((g) => ({ name: g.name, value: g.count }));
+
+    // 5. Financial Profile (Loans) — key: "housing/loan"
+    const loans = data.loan_profile;
     const financialData = [
-      { name: 'No Loans', value: data.filter(c => c.housing === 'no' && c.loan === 'no').length },
-      { name: 'Housing Only', value: data.filter(c => c.housing === 'yes' && c.loan === 'no').length },
-      { name: 'Personal Only', value: data.filter(c => c.housing === 'no' && c.loan === 'yes').length },
-      { name: 'Double Loans', value: data.filter(c => c.housing === 'yes' && c.loan === 'yes').length },
+      { name: 'No Loans', value: loans['no/no'] ?? 0 },
+      { name: 'Housing Only', value: loans['yes/no'] ?? 0 },
+      { name: 'Personal Only', value: loans['no/yes'] ?? 0 },
+      { name: 'Double Loans', value: loans['yes/yes'] ?? 0 },
     ];
 
     return { total, high, medium, low, topJobs, scoreBins, ageData, financialData };